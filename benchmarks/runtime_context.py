@@ -0,0 +1,78 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Compare per-invocation context construction with and without deepcopy.
+
+Run with: python benchmarks/runtime_context.py
+"""
+import copy
+import logging
+import timeit
+
+from functions_framework.clients.dapr_client_pool import DaprClientPool
+from functions_framework.context.function_context import FunctionContext
+from functions_framework.context.runtime_context import RuntimeContext
+from functions_framework.context.user_context import UserContext
+
+FUNC_CONTEXT = {
+    "name": "bench",
+    "version": "v1",
+    "triggers": {
+        "http": {"port": 8080},
+        "dapr": [
+            {"name": "kafka-in", "type": "bindings.kafka"},
+            {"name": "pubsub", "type": "pubsub.redis", "topic": "events"},
+        ],
+    },
+    "inputs": {
+        "in%d" % i: {
+            "componentName": "in-%d" % i,
+            "componentType": "bindings.kafka",
+            "metadata": {"key%d" % j: "value%d" % j for j in range(8)},
+        }
+        for i in range(4)
+    },
+    "outputs": {
+        "out%d" % i: {
+            "componentName": "out-%d" % i,
+            "componentType": "pubsub.redis",
+            "topic": "topic-%d" % i,
+            "metadata": {"key%d" % j: "value%d" % j for j in range(8)},
+        }
+        for i in range(4)
+    },
+}
+
+
+def main(number=20000):
+    logger = logging.getLogger("bench")
+    pool = DaprClientPool()
+
+    mutable = RuntimeContext(FunctionContext.from_json(FUNC_CONTEXT), logger, pool)
+    frozen = RuntimeContext(
+        FunctionContext.from_json(FUNC_CONTEXT), logger, pool
+    ).freeze()
+
+    def with_deepcopy():
+        UserContext(runtime_context=copy.deepcopy(mutable), logger=logger)
+
+    def with_snapshot():
+        UserContext(runtime_context=frozen, logger=logger)
+
+    for name, func in (("deepcopy", with_deepcopy), ("snapshot", with_snapshot)):
+        seconds = min(timeit.repeat(func, number=number, repeat=5))
+        print("{:<10} {:>10.2f} us/invocation".format(name, seconds / number * 1e6))
+
+
+if __name__ == "__main__":
+    main()
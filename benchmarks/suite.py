@@ -0,0 +1,317 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmarks of the framework hot paths, checked against a stored baseline.
+
+Run with: python benchmarks/suite.py [--save] [--threads N] [benchmark ...]
+
+Every benchmark reports its throughput and p50/p99 latency, and its cost
+relative to the reference benchmark, a framework-free workload measured in
+the same run. The baseline recorded with --save holds these relative costs
+rather than the absolute numbers of the machine it was recorded on. The run
+fails when a benchmark became more than --tolerance costlier than in the
+baseline. With --require-baseline it also fails when a benchmark has no
+baseline.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+from dapr.proto.runtime.v1 import appcallback_pb2
+from runtime_context import FUNC_CONTEXT
+
+from functions_framework.context.function_context import DaprTrigger, FunctionContext
+from functions_framework.context.runtime_context import RuntimeContext
+from functions_framework.context.user_context import UserContext
+from functions_framework.testing.sidecar import FakeDaprSidecar
+from functions_framework.triggers.dapr_trigger.dapr import DaprTriggerHandler
+from functions_framework.triggers.http_trigger import create_app
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+SUCCESS = appcallback_pb2.TopicEventResponse.SUCCESS
+
+BENCHMARKS = {}
+REFERENCE = "reference"
+
+
+def benchmark(func):
+    """Register a benchmark, a context manager yielding the operation to time."""
+    BENCHMARKS[func.__name__] = contextlib.contextmanager(func)
+    return func
+
+
+def _http_environ(method="GET", body=b"", content_type=None):
+    environ = {
+        "REQUEST_METHOD": method,
+        "SCRIPT_NAME": "",
+        "PATH_INFO": "/",
+        "QUERY_STRING": "",
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "8080",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    if content_type:
+        environ["CONTENT_TYPE"] = content_type
+    return environ
+
+
+def _wsgi_call(app, environ, body):
+    def start_response(status, headers, exc_info=None):
+        if not status.startswith("200"):
+            raise RuntimeError("Unexpected response " + status)
+
+    environ = dict(environ, **{"wsgi.input": io.BytesIO(body)})
+    for _ in app(environ, start_response):
+        pass
+
+
+@benchmark
+def reference():
+    # Plain Python work the other benchmarks are measured against, so that
+    # the baseline does not depend on the speed of the machine
+    def op():
+        entries = {"key%d" % i: [i, str(i)] for i in range(32)}
+        return sorted(entries.items(), key=lambda item: item[1][1])
+
+    yield op
+
+
+@benchmark
+def function_context_parse():
+    yield lambda: FunctionContext.from_json(FUNC_CONTEXT)
+
+
+@benchmark
+def user_context():
+    logger = logging.getLogger("bench")
+    context = RuntimeContext(FunctionContext.from_json(FUNC_CONTEXT), logger)
+    context = context.freeze()
+    yield lambda: UserContext(runtime_context=context, logger=logger)
+
+
+@benchmark
+def http_dispatch():
+    app = create_app(None, "bench", "bench.py", function=lambda context: "OK")
+    environ = _http_environ()
+    yield lambda: _wsgi_call(app, environ, b"")
+
+
+@benchmark
+def http_dispatch_json():
+    def function(context):
+        return {"echo": context.get_json()}
+
+    app = create_app(None, "bench", "bench.py", function=function)
+    body = json.dumps({"key%d" % i: "value%d" % i for i in range(16)}).encode()
+    environ = _http_environ("POST", body, "application/json")
+    yield lambda: _wsgi_call(app, environ, body)
+
+
+@contextlib.contextmanager
+def _dapr_app(trigger):
+    handler = DaprTriggerHandler(0, [trigger], lambda context: None, workers=16)
+    with FakeDaprSidecar() as sidecar:
+        sidecar.serve_app(handler)
+        yield sidecar
+
+
+@benchmark
+def dapr_binding():
+    with _dapr_app(DaprTrigger("kafka", "bindings.kafka", None)) as app:
+        yield lambda: app.send_binding_event("kafka", b"payload")
+
+
+@benchmark
+def dapr_topic():
+    with _dapr_app(DaprTrigger("pubsub", "pubsub.redis", "events")) as app:
+
+        def op():
+            resp = app.publish_to_app("pubsub", "events", b'{"key": "value"}')
+            if resp.status != SUCCESS:
+                raise RuntimeError("Event not processed")
+
+        yield op
+
+
+@benchmark
+def send():
+    sidecar = FakeDaprSidecar().start()
+    context = sidecar.runtime_context(FunctionContext.from_json(FUNC_CONTEXT))
+
+    def op():
+        # Errors are logged rather than raised by send
+        if UserContext(runtime_context=context).send("out0", {"id": 1}) is None:
+            raise RuntimeError("Send failed")
+
+    try:
+        yield op
+    finally:
+        sidecar.stop()
+
+
+def _percentile(latencies, q):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+
+
+def run(name, duration, threads, warmup=0.2):
+    """Time the benchmark for duration seconds on threads threads."""
+    with BENCHMARKS[name]() as op:
+        deadline = time.perf_counter() + warmup
+        while time.perf_counter() < deadline:
+            op()
+
+        latencies = []
+        start = time.perf_counter()
+        deadline = start + duration
+
+        def worker():
+            timed = []
+            clock = time.perf_counter
+            while clock() < deadline:
+                before = clock()
+                op()
+                timed.append(clock() - before)
+            latencies.extend(timed)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "ops": len(latencies) / elapsed,
+        "p50_us": _percentile(latencies, 0.5) * 1e6,
+        "p99_us": _percentile(latencies, 0.99) * 1e6,
+    }
+
+
+def relative(result, reference):
+    """The cost of a result in units of the reference result."""
+    return {
+        "ops": round(reference["ops"] / result["ops"], 3),
+        "p50": round(result["p50_us"] / reference["p50_us"], 3),
+    }
+
+
+def regressions(costs, baseline, tolerance):
+    """Return the benchmarks costlier than the baseline by more than tolerance."""
+    slower = []
+    for name, cost in costs.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if any(cost[key] > base[key] * (1 + tolerance) for key in ("ops", "p50")):
+            slower.append(name)
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("benchmarks", nargs="*", help=", ".join(BENCHMARKS))
+    parser.add_argument("--duration", type=float, default=2.0)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument(
+        "--save", action="store_true", help="store the results as the baseline"
+    )
+    parser.add_argument(
+        "--require-baseline",
+        action="store_true",
+        help="fail when a benchmark has no baseline",
+    )
+    args = parser.parse_args(argv)
+    names = args.benchmarks or list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error("unknown benchmarks: " + ", ".join(sorted(unknown)))
+    # The reference always runs, it is not compared with the baseline
+    names = [name for name in names if name != REFERENCE]
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        baseline = baseline.get("threads=%d" % args.threads, {})
+    missing = [name for name in names if name not in baseline]
+    if args.require_baseline and not args.save and missing:
+        print(
+            "No baseline in {} with --threads {} for: {}, record one with "
+            "--save".format(args.baseline, args.threads, ", ".join(missing))
+        )
+        return 1
+
+    print(
+        "{:<24} {:>12} {:>10} {:>10} {:>8} {:>8}".format(
+            "", "ops/s", "p50 us", "p99 us", "cost", "Δ cost"
+        )
+    )
+    reference = run(REFERENCE, args.duration, args.threads)
+    costs = {}
+    for name in [REFERENCE] + names:
+        result = reference
+        if name != REFERENCE:
+            result = run(name, args.duration, args.threads)
+        costs[name] = cost = relative(result, reference)
+        change = ""
+        if name in baseline:
+            change = "{:+.0%}".format(cost["ops"] / baseline[name]["ops"] - 1)
+        print(
+            "{:<24} {:>12.0f} {:>10.1f} {:>10.1f} {:>8.2f} {:>8}".format(
+                name,
+                result["ops"],
+                result["p50_us"],
+                result["p99_us"],
+                cost["ops"],
+                change,
+            )
+        )
+    del costs[REFERENCE]
+
+    if args.save:
+        stored = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                stored = json.load(f)
+        stored.setdefault("threads=%d" % args.threads, {}).update(costs)
+        with open(args.baseline, "w") as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+        return 0
+
+    slower = regressions(costs, baseline, args.tolerance)
+    if slower:
+        print("Regressed against {}: {}".format(args.baseline, ", ".join(slower)))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
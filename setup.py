@@ -37,9 +37,6 @@ setup(
         "Intended Audience :: Developers",
         "License :: OSI Approved :: Apache Software License",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.5",
-        "Programming Language :: Python :: 3.6",
-        "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
@@ -47,7 +44,7 @@ setup(
     keywords="functions-framework",
     packages=find_packages(where="src"),
     package_dir={"": "src"},
-    python_requires=">=3.5, <4",
+    python_requires=">=3.8, <4",
     install_requires=[
         "grpcio==1.54.2",
         "flask>=1.0,<3.0",
@@ -57,9 +54,18 @@ setup(
         "cloudevents>=1.2.0,<2.0.0",
         "dapr>=1.10.0",
         "aiohttp==3.8.6",
-        "dapr-ext-grpc>=1.10.0",
+        # Bulk subscriptions are set on the servicer of dapr.ext.grpc.App
+        "dapr-ext-grpc>=1.10.0,<1.12",
         "dapr-ext-fastapi>=1.10.0",
     ],
+    extras_require={
+        "asgi": ["starlette>=0.26.0", "uvicorn>=0.22.0"],
+        "orjson": ["orjson>=3.0"],
+        "tracing": [
+            "opentelemetry-sdk>=1.20.0",
+            "opentelemetry-exporter-otlp-proto-http>=1.20.0",
+        ],
+    },
     entry_points={
         "console_scripts": [
             "ff=functions_framework._cli:_cli",
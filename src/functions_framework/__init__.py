@@ -11,3 +11,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import time
+
+# Taken first thing so that the startup timeline covers the framework imports.
+IMPORT_STARTED = time.perf_counter()
@@ -13,7 +13,8 @@
 # limitations under the License.
 import click
 
-from functions_framework import _function_registry
+from functions_framework import _function_registry, constants
+from functions_framework._startup import timeline
 from functions_framework.runner import Runner
 
 
@@ -24,11 +25,180 @@ from functions_framework.runner import Runner
 @click.option("--port", envvar="PORT", type=click.INT, default=8080)
 @click.option("--debug", envvar="DEBUG", is_flag=True)
 @click.option("--dry-run", envvar="DRY_RUN", is_flag=True)
-def _cli(target, source, host, port, debug, dry_run):
+@click.option(
+    "--dapr-client-pool-size",
+    envvar="DAPR_CLIENT_POOL_SIZE",
+    type=click.IntRange(min=1),
+    default=constants.DEFAULT_DAPR_CLIENT_POOL_SIZE,
+)
+@click.option(
+    "--dapr-client-idle-timeout",
+    envvar="DAPR_CLIENT_IDLE_TIMEOUT",
+    type=click.FLOAT,
+    default=constants.DEFAULT_DAPR_CLIENT_IDLE_TIMEOUT,
+)
+@click.option(
+    "--http-mode",
+    envvar="HTTP_MODE",
+    type=click.Choice(constants.HTTP_MODES),
+    default=None,
+)
+@click.option("--workers", envvar="HTTP_WORKERS", type=click.STRING, default=None)
+@click.option(
+    "--threads", envvar="HTTP_THREADS", type=click.IntRange(min=1), default=None
+)
+@click.option(
+    "--worker-class",
+    envvar="HTTP_WORKER_CLASS",
+    type=click.Choice(constants.HTTP_WORKER_CLASSES),
+    default=None,
+)
+@click.option(
+    "--keep-alive", envvar="HTTP_KEEP_ALIVE", type=click.IntRange(min=0), default=None
+)
+@click.option(
+    "--backlog", envvar="HTTP_BACKLOG", type=click.IntRange(min=1), default=None
+)
+@click.option(
+    "--max-requests",
+    envvar="HTTP_MAX_REQUESTS",
+    type=click.IntRange(min=0),
+    default=None,
+)
+@click.option(
+    "--max-requests-jitter",
+    envvar="HTTP_MAX_REQUESTS_JITTER",
+    type=click.IntRange(min=0),
+    default=None,
+)
+@click.option(
+    "--dapr-workers",
+    envvar="DAPR_WORKERS",
+    type=click.IntRange(min=1),
+    default=constants.DEFAULT_DAPR_WORKERS,
+)
+@click.option(
+    "--dapr-max-in-flight",
+    envvar="DAPR_MAX_IN_FLIGHT",
+    type=click.IntRange(min=0),
+    default=constants.DEFAULT_DAPR_MAX_IN_FLIGHT,
+)
+@click.option(
+    "--output-workers",
+    envvar="OUTPUT_WORKERS",
+    type=click.IntRange(min=1),
+    default=constants.DEFAULT_OUTPUT_WORKERS,
+)
+@click.option(
+    "--output-queue-size",
+    envvar="OUTPUT_QUEUE_SIZE",
+    type=click.IntRange(min=1),
+    default=constants.DEFAULT_OUTPUT_QUEUE_SIZE,
+)
+@click.option(
+    "--state-cache-size",
+    envvar="STATE_CACHE_SIZE",
+    type=click.IntRange(min=0),
+    default=constants.DEFAULT_STATE_CACHE_SIZE,
+)
+@click.option(
+    "--state-cache-ttl",
+    envvar="STATE_CACHE_TTL",
+    type=click.FloatRange(min=0),
+    default=constants.DEFAULT_STATE_CACHE_TTL,
+)
+@click.option("--prefetch-inputs", envvar="PREFETCH_INPUTS", is_flag=True)
+@click.option("--metrics", envvar="METRICS", is_flag=True)
+@click.option(
+    "--metrics-path",
+    envvar="METRICS_PATH",
+    type=click.STRING,
+    default=constants.DEFAULT_METRICS_PATH,
+)
+@click.option(
+    "--metrics-port",
+    envvar="METRICS_PORT",
+    type=click.IntRange(min=0),
+    default=None,
+)
+@click.option("--log-file", envvar="LOG_FILE", type=click.Path(), default=None)
+@click.option(
+    "--log-format",
+    envvar="LOG_FORMAT",
+    type=click.Choice([constants.LOG_FORMAT_TEXT, constants.LOG_FORMAT_JSON]),
+    default=constants.LOG_FORMAT_TEXT,
+)
+@click.option(
+    "--log-queue-size",
+    envvar="LOG_QUEUE_SIZE",
+    type=click.IntRange(min=1),
+    default=constants.DEFAULT_LOG_QUEUE_SIZE,
+)
+@click.option("--profile-startup", envvar="PROFILE_STARTUP", is_flag=True)
+@click.option(
+    "--startup-report", envvar="STARTUP_REPORT", type=click.Path(), default=None
+)
+def _cli(
+    target,
+    source,
+    host,
+    port,
+    debug,
+    dry_run,
+    dapr_client_pool_size,
+    dapr_client_idle_timeout,
+    http_mode,
+    dapr_workers,
+    dapr_max_in_flight,
+    output_workers,
+    output_queue_size,
+    state_cache_size,
+    state_cache_ttl,
+    prefetch_inputs,
+    metrics,
+    metrics_path,
+    metrics_port,
+    log_file,
+    log_format,
+    log_queue_size,
+    profile_startup,
+    startup_report,
+    **server_options
+):
+    if profile_startup:
+        timeline.enable(startup_report)
+        timeline.record("framework_import", timeline.origin)
+
     # fetch the context
-    context = _function_registry.get_openfunction_context("")
+    with timeline.phase("func_context_parse"):
+        context = _function_registry.get_openfunction_context("")
 
-    runner = Runner(context, target, source, host, port, debug, dry_run)
+    runner = Runner(
+        context,
+        target,
+        source,
+        host,
+        port,
+        debug,
+        dry_run,
+        dapr_client_pool_size,
+        dapr_client_idle_timeout,
+        http_mode,
+        {k: v for k, v in server_options.items() if v is not None},
+        output_workers,
+        output_queue_size,
+        metrics,
+        metrics_path,
+        metrics_port,
+        state_cache_size,
+        state_cache_ttl,
+        prefetch_inputs,
+        dapr_workers,
+        dapr_max_in_flight,
+        log_file,
+        log_format,
+        log_queue_size,
+    )
     runner.run()
 
 
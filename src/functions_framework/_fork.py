@@ -0,0 +1,38 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+
+
+class ForkAware(object):
+    """Base of the process-wide resources, which start over in a forked child.
+
+    Locks, threads and gRPC channels of the parent are not usable in a child
+    forked by gunicorn. Subclasses reset them in _after_fork(), which
+    _check_fork() calls the first time the resource is used in a new process.
+    """
+
+    def __init__(self):
+        self._pid = os.getpid()
+
+    def _forked(self):
+        """Whether this process is a child forked after the resource was built."""
+        return self._pid != os.getpid()
+
+    def _check_fork(self):
+        if self._forked():
+            self._after_fork()
+            self._pid = os.getpid()
+
+    def _after_fork(self):
+        raise NotImplementedError
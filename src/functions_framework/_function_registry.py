@@ -18,12 +18,14 @@ import os
 import sys
 import types
 
+from functions_framework._startup import timeline
 from functions_framework.context.function_context import FunctionContext
 from functions_framework.context.user_context import UserContext
 from functions_framework.exceptions import (
     InvalidConfigurationException,
     InvalidFunctionSignatureException,
     InvalidTargetTypeException,
+    MissingSourceException,
     MissingTargetException,
 )
 
@@ -39,6 +41,10 @@ BACKGROUNDEVENT_SIGNATURE_TYPE = "event"
 # Keys are user function names, values are user function signature types.
 REGISTRY_MAP = {}
 
+# LOADED_MODULES caches the executed user source modules, keyed by real path,
+# so that the user source is executed only once per process.
+LOADED_MODULES = {}
+
 
 # Default function signature rule.
 def __function_signature_rule__(context: UserContext):
@@ -94,12 +100,40 @@ def load_function_module(source):
     source_module = importlib.util.module_from_spec(spec)
     # 3. Add the directory of the source to sys.path to allow the function to
     # load modules relative to its location
-    sys.path.append(directory)
+    if directory not in sys.path:
+        sys.path.append(directory)
     # 4. Add the module to sys.modules
     sys.modules[name] = source_module
     return source_module, spec
 
 
+def load_user_function(source, target):
+    """Load and validate the user function.
+
+    The source module is executed on first use only, later calls for the same
+    source return the function from the cached module.
+    """
+    _target = get_function_target(target)
+    _source = get_function_source(source)
+
+    if not os.path.exists(_source):
+        raise MissingSourceException(
+            "File {source} that is expected to define function doesn't exist".format(
+                source=_source
+            )
+        )
+
+    realpath = os.path.realpath(_source)
+    source_module = LOADED_MODULES.get(realpath)
+    if source_module is None:
+        source_module, spec = load_function_module(_source)
+        with timeline.trace_imports():
+            spec.loader.exec_module(source_module)
+        LOADED_MODULES[realpath] = source_module
+
+    return get_user_function(_source, source_module, _target)
+
+
 def get_function_source(source):
     """Get the configured function source."""
     source = source or os.environ.get("FUNCTION_SOURCE", DEFAULT_SOURCE)
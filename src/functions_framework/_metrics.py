@@ -0,0 +1,462 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import bisect
+import threading
+import time
+
+from functions_framework import constants
+from functions_framework.triggers.trigger import TriggerHandler
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+OVERHEAD_BUCKETS = (
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.1,
+)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    return "{%s}" % ",".join(
+        '{}="{}"'.format(name, _escape(value)) for name, value in zip(names, values)
+    )
+
+
+def _merge(into, values):
+    for key, value in values.items():
+        if isinstance(value, list):
+            total = into.get(key)
+            if total is None:
+                into[key] = list(value)
+            else:
+                for i, v in enumerate(value):
+                    total[i] += v
+        else:
+            into[key] = into.get(key, 0) + value
+
+
+class Counter(object):
+    kind = "counter"
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def inc(self, labels=(), amount=1):
+        values = self.registry.shard()
+        key = (self.name, labels)
+        values[key] = values.get(key, 0) + amount
+
+    def render(self, labels, value, lines):
+        lines.append(
+            "{}{} {}".format(self.name, _format_labels(self.labelnames, labels), value)
+        )
+
+
+class Gauge(Counter):
+    """A gauge made of increments and decrements, which may come from any thread."""
+
+    kind = "gauge"
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+
+class Histogram(object):
+    kind = "histogram"
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets or LATENCY_BUCKETS)
+
+    def observe(self, value, labels=()):
+        values = self.registry.shard()
+        key = (self.name, labels)
+        state = values.get(key)
+        if state is None:
+            # One count per bucket, the +Inf bucket, then the sum.
+            state = values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def render(self, labels, value, lines):
+        names = self.labelnames + ("le",)
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), value):
+            cumulative += count
+            lines.append(
+                "{}_bucket{} {}".format(
+                    self.name, _format_labels(names, labels + (bound,)), cumulative
+                )
+            )
+        suffix = _format_labels(self.labelnames, labels)
+        lines.append("{}_sum{} {}".format(self.name, suffix, value[-1]))
+        lines.append("{}_count{} {}".format(self.name, suffix, cumulative))
+
+
+class Registry(object):
+    """Metric families whose values are sharded per thread.
+
+    Every thread updates its own shard without taking a lock, a scrape sums
+    the shards. Shards of threads that exited are folded into one retired
+    shard so that short-lived threads do not accumulate.
+    """
+
+    def __init__(self):
+        self.families = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+        self._retired = {}
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Gauge(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=()):
+        return self._add(Histogram(self, name, documentation, labelnames, buckets))
+
+    def _add(self, family):
+        if family.name in self.families:
+            raise ValueError("Duplicate metric {}".format(family.name))
+        self.families[family.name] = family
+        return family
+
+    def shard(self):
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), values))
+            return values
+
+    def collect(self):
+        """Return the values of every metric, keyed by (name, label values)."""
+        totals = {}
+        with self._lock:
+            live = []
+            for thread, values in self._shards:
+                if thread.is_alive():
+                    live.append((thread, values))
+                else:
+                    _merge(self._retired, values)
+            self._shards = live
+            _merge(totals, self._retired)
+            for _, values in live:
+                # dict() copies atomically, the owner may be adding keys
+                _merge(totals, dict(values))
+        return totals
+
+    def render(self):
+        """Render the metrics in the Prometheus text exposition format."""
+        by_family = {}
+        for (name, labels), value in self.collect().items():
+            by_family.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name, family in self.families.items():
+            lines.append("# HELP {} {}".format(name, family.documentation))
+            lines.append("# TYPE {} {}".format(name, family.kind))
+            for labels, value in sorted(by_family.get(name, ()), key=lambda v: v[0]):
+                family.render(labels, value, lines)
+        return "\n".join(lines) + "\n"
+
+
+class _NoopInvocation(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def call(self, function, *args):
+        return function(*args)
+
+    async def call_async(self, function, *args):
+        return await function(*args)
+
+
+_NOOP_INVOCATION = _NoopInvocation()
+
+
+class _Invocation(object):
+    """Times one invocation, split into user function and framework time."""
+
+    __slots__ = ("metrics", "labels", "started", "user_time")
+
+    def __init__(self, metrics, labels):
+        self.metrics = metrics
+        self.labels = labels
+        self.user_time = 0.0
+
+    def __enter__(self):
+        self.metrics.in_flight.inc(self.labels)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.started
+        metrics = self.metrics
+        metrics.in_flight.dec(self.labels)
+        metrics.invocations.inc(self.labels)
+        if exc_type is not None:
+            metrics.errors.inc(self.labels)
+        metrics.duration.observe(duration, self.labels)
+        metrics.user_duration.observe(self.user_time, self.labels)
+        metrics.overhead.observe(max(duration - self.user_time, 0.0), self.labels)
+        return False
+
+    def call(self, function, *args):
+        """Call the user function, counting its time as user time."""
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self.user_time += time.perf_counter() - start
+
+    async def call_async(self, function, *args):
+        start = time.perf_counter()
+        try:
+            return await function(*args)
+        finally:
+            self.user_time += time.perf_counter() - start
+
+
+class _NoopTimer(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+class _SendTimer(object):
+    __slots__ = ("metrics", "labels", "started")
+
+    def __init__(self, metrics, labels):
+        self.metrics = metrics
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.send_duration.observe(
+            time.perf_counter() - self.started, self.labels
+        )
+        if exc_type is not None:
+            self.metrics.send_errors.inc(self.labels)
+        return False
+
+
+class Metrics(object):
+    """Invocation and output metrics of this worker process.
+
+    Collection is a no-op until enable() is called. Each worker process
+    keeps its own metrics, so with several HTTP workers a scrape reports the
+    worker which served it.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.registry = registry = Registry()
+        labels = ("kind", "trigger")
+        self.invocations = registry.counter(
+            "function_invocations_total", "Invocations of the function.", labels
+        )
+        self.errors = registry.counter(
+            "function_invocation_errors_total",
+            "Invocations which raised an exception.",
+            labels,
+        )
+        self.rejected = registry.counter(
+            "function_invocations_rejected_total",
+            "Events rejected because the trigger had too many in flight.",
+            labels,
+        )
+        self.in_flight = registry.gauge(
+            "function_invocations_in_flight",
+            "Invocations currently being processed.",
+            labels,
+        )
+        self.duration = registry.histogram(
+            "function_invocation_duration_seconds",
+            "Time to process an invocation, framework and user function.",
+            labels,
+        )
+        self.user_duration = registry.histogram(
+            "function_user_duration_seconds",
+            "Time spent in the user function.",
+            labels,
+        )
+        self.overhead = registry.histogram(
+            "function_framework_overhead_seconds",
+            "Time spent in the framework, outside of the user function.",
+            labels,
+            OVERHEAD_BUCKETS,
+        )
+        self.send_duration = registry.histogram(
+            "function_output_send_duration_seconds",
+            "Time to send data to an output.",
+            ("output",),
+        )
+        self.send_errors = registry.counter(
+            "function_output_send_errors_total",
+            "Sends to an output which failed.",
+            ("output",),
+        )
+
+        self.state_cache_requests = registry.counter(
+            "function_state_cache_requests_total",
+            "State reads served by the cache (hit) or the state store (miss).",
+            ("store", "result"),
+        )
+        self.response_cache_requests = registry.counter(
+            "function_response_cache_requests_total",
+            "HTTP requests served by the response cache (hit), by waiting for an "
+            "identical request (coalesced) or by the function (miss).",
+            ("result",),
+        )
+
+    def enable(self):
+        self.enabled = True
+
+    def invocation(self, kind, trigger):
+        """Context manager measuring one invocation of a trigger."""
+        if not self.enabled:
+            return _NOOP_INVOCATION
+        return _Invocation(self, (kind, trigger))
+
+    def reject(self, kind, trigger):
+        """Count an event a saturated trigger did not process."""
+        if self.enabled:
+            self.rejected.inc((kind, trigger))
+
+    def send(self, output_name):
+        """Context manager measuring one send to an output."""
+        if not self.enabled:
+            return _NOOP_TIMER
+        return _SendTimer(self, (output_name,))
+
+    def state_cache(self, store, hits, misses):
+        """Count the reads of a state store answered by the cache or not."""
+        if not self.enabled:
+            return
+        if hits:
+            self.state_cache_requests.inc((store, "hit"), hits)
+        if misses:
+            self.state_cache_requests.inc((store, "miss"), misses)
+
+    def response_cache(self, result):
+        """Count a request looked up in the HTTP response cache."""
+        if self.enabled:
+            self.response_cache_requests.inc((result,))
+
+    def render(self):
+        return self.registry.render()
+
+
+metrics = Metrics()
+
+
+class MetricsServer(TriggerHandler):
+    """Serve the metrics on a port of their own, in a background thread."""
+
+    def __init__(
+        self, port=constants.DEFAULT_METRICS_PORT, path=constants.DEFAULT_METRICS_PATH
+    ):
+        self.port = port
+        self.path = path
+        self.server = None
+        self._stopped = threading.Event()
+
+    def start(self, context=None, logger=None):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        path = self.path
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != path:
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self.server = ThreadingHTTPServer(("0.0.0.0", self.port), Handler)
+        except OSError as e:
+            # Another worker process of this function already serves them.
+            if logger:
+                logger.warning(
+                    "Metrics not served on port %d by this worker: %s", self.port, e
+                )
+            # Returning would be taken for a failed trigger, wait instead.
+            self._stopped.wait()
+            return
+        self.server.daemon_threads = True
+        self.server.serve_forever()
+
+    def stop(self):
+        self._stopped.set()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
@@ -0,0 +1,134 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import builtins
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+import functions_framework
+
+
+class StartupTimeline:
+    """Records where cold-start time goes, from framework import to first request.
+
+    Phases are offsets in seconds from the import of functions_framework.
+    Recording is a no-op until enable() is called, the report is emitted as
+    a single JSON log line (and optionally written to a file) once the first
+    request has been served.
+    """
+
+    def __init__(self, origin):
+        self.origin = origin
+        self.enabled = False
+        self.report_path = None
+        self.logger = None
+        self.phases = []
+        self.imports = []
+        self._awaiting_first_request = False
+        self._lock = threading.Lock()
+
+    def enable(self, report_path=None):
+        self.enabled = True
+        self.report_path = report_path
+        self._awaiting_first_request = True
+
+    def record(self, name, start, end=None):
+        if not self.enabled:
+            return
+        end = time.perf_counter() if end is None else end
+        self.phases.append(
+            {
+                "name": name,
+                "start": round(start - self.origin, 6),
+                "duration": round(end - start, 6),
+            }
+        )
+
+    def mark(self, name):
+        """Record an instant event."""
+        now = time.perf_counter()
+        self.record(name, now, now)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start)
+
+    @contextlib.contextmanager
+    def trace_imports(self):
+        """Time each import not yet in sys.modules, nested imports included."""
+        if not self.enabled:
+            yield
+            return
+
+        original_import = builtins.__import__
+        state = threading.local()
+
+        def traced_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if getattr(state, "active", False) or (level == 0 and name in sys.modules):
+                return original_import(name, globals, locals, fromlist, level)
+            state.active = True
+            start = time.perf_counter()
+            try:
+                return original_import(name, globals, locals, fromlist, level)
+            finally:
+                state.active = False
+                self.imports.append(
+                    {"module": name, "duration": round(time.perf_counter() - start, 6)}
+                )
+
+        builtins.__import__ = traced_import
+        try:
+            yield
+        finally:
+            builtins.__import__ = original_import
+
+    def request_served(self):
+        """Called after every invocation, emits the report after the first one."""
+        if not self._awaiting_first_request:
+            return
+        with self._lock:
+            if not self._awaiting_first_request:
+                return
+            self._awaiting_first_request = False
+        self.mark("first_request_served")
+        self.emit()
+
+    def report(self):
+        return {
+            "event": "startup_timeline",
+            "pid": os.getpid(),
+            "elapsed": round(time.perf_counter() - self.origin, 6),
+            "phases": list(self.phases),
+            "imports": sorted(self.imports, key=lambda i: i["duration"], reverse=True),
+        }
+
+    def emit(self):
+        report = json.dumps(self.report())
+        if self.logger:
+            self.logger.info(report)
+        else:
+            sys.stderr.write(report + "\n")
+        if self.report_path:
+            with open(self.report_path, "a") as f:
+                f.write(report + "\n")
+
+
+timeline = StartupTimeline(functions_framework.IMPORT_STARTED)
@@ -0,0 +1,249 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import functools
+import inspect
+import logging
+import sys
+
+from functions_framework.exceptions import (
+    InvalidConfigurationException,
+    MissingDependencyException,
+)
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    from opentelemetry.trace.propagation.tracecontext import (
+        TraceContextTextMapPropagator,
+    )
+except ImportError:
+    trace = None
+
+# Span kinds, the names of OpenTelemetry's SpanKind
+INTERNAL = "INTERNAL"
+SERVER = "SERVER"
+CLIENT = "CLIENT"
+PRODUCER = "PRODUCER"
+CONSUMER = "CONSUMER"
+
+EXPORTERS = ("otlp", "console", "memory")
+OTLP_PROTOCOLS = ("http", "http/protobuf", "grpc")
+
+logger = logging.getLogger(__name__)
+
+
+class _NoopSpan(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _otlp_exporter(config):
+    protocol = config.get("protocol", "http")
+    if protocol not in OTLP_PROTOCOLS:
+        raise InvalidConfigurationException(
+            "Unknown OTLP protocol {}, expected one of {}".format(
+                protocol, ", ".join(OTLP_PROTOCOLS)
+            )
+        )
+    headers = config.get("headers")
+    if isinstance(headers, str):
+        # OpenFunction passes headers as "key1=value1,key2=value2"
+        headers = dict(h.split("=", 1) for h in headers.split(",") if "=" in h)
+    kwargs = {"headers": headers or None, "timeout": config.get("timeout", 10)}
+    endpoint = config.get("endpoint")
+    try:
+        if protocol == "grpc":
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import (
+                OTLPSpanExporter,
+            )
+
+            return OTLPSpanExporter(endpoint, **kwargs)
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+    except ImportError as e:
+        raise MissingDependencyException(
+            "The OTLP {} exporter is not installed: {}".format(protocol, e)
+        ) from e
+    if endpoint and not endpoint.rstrip("/").endswith("/v1/traces"):
+        # Unlike OTEL_EXPORTER_OTLP_ENDPOINT, an explicit endpoint is used as is
+        endpoint = endpoint.rstrip("/") + "/v1/traces"
+    return OTLPSpanExporter(endpoint, **kwargs)
+
+
+def create_exporter(config):
+    """Create the span exporter of the exporter section of the tracing provider."""
+    config = dict(config or {})
+    name = config.pop("name", "otlp")
+    if name not in EXPORTERS:
+        raise InvalidConfigurationException(
+            "Unknown tracing exporter {}, expected one of {}".format(
+                name, ", ".join(EXPORTERS)
+            )
+        )
+    if name == "console":
+        return ConsoleSpanExporter(out=sys.stderr)
+    if name == "memory":
+        return InMemorySpanExporter()
+    return _otlp_exporter(config)
+
+
+class Tracer(object):
+    """Thin wrapper of an OpenTelemetry tracer, shared by the triggers.
+
+    Tracing needs the OpenTelemetry SDK, installed with the tracing extra.
+    Every method is a no-op until configure() enables it, spans are then
+    sampled by the parent-based ratio sampler and propagated in W3C
+    traceparent headers.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.provider = None
+        self._tracer = None
+        self._propagator = None
+
+    def configure(self, config, service_name="", exporter=None):
+        """Configure from the tracing section of FUNC_CONTEXT.
+
+        Args:
+            config: A dict like {"enabled": true, "sampleRatio": 0.1,
+                "provider": {"name": "opentelemetry", "exporter": {"name":
+                "otlp", "endpoint": "http://collector:4318"}}, "tags": {}}.
+            service_name: The function name, reported as service.name.
+            exporter: Export spans to this exporter instead of the configured one.
+        """
+        config = config or {}
+        if not config.get("enabled"):
+            return self
+
+        provider = config.get("provider") or {}
+        if provider.get("name", "opentelemetry") != "opentelemetry":
+            raise InvalidConfigurationException(
+                "Unsupported tracing provider {}, expected opentelemetry".format(
+                    provider.get("name")
+                )
+            )
+        ratio = float(config.get("sampleRatio", 1.0))
+        if not 0.0 <= ratio <= 1.0:
+            raise InvalidConfigurationException(
+                "Tracing sampleRatio must be between 0 and 1, got {}".format(ratio)
+            )
+        if trace is None:
+            logger.warning(
+                "Tracing is enabled but the OpenTelemetry SDK is not installed, "
+                "install it with pip install ofn-functions-framework[tracing]"
+            )
+            return self
+
+        if exporter is None:
+            exporter = create_exporter(provider.get("exporter"))
+        self.provider = TracerProvider(
+            sampler=ParentBased(TraceIdRatioBased(ratio)),
+            resource=Resource.create(
+                {
+                    "service.name": service_name or "function",
+                    **(config.get("tags") or {}),
+                }
+            ),
+            # The runner shuts it down after the queued sends are drained
+            shutdown_on_exit=False,
+        )
+        self.provider.add_span_processor(BatchSpanProcessor(exporter))
+        self._tracer = self.provider.get_tracer("functions-framework")
+        self._propagator = TraceContextTextMapPropagator()
+        self.enabled = True
+        return self
+
+    def current_span_context(self):
+        """Return the SpanContext of the current span, None without one."""
+        if not self.enabled:
+            return None
+        context = trace.get_current_span().get_span_context()
+        return context if context.is_valid else None
+
+    def start_span(self, name, kind=INTERNAL, parent=None, attributes=None):
+        """Start a span, a child of the parent SpanContext or of the current span.
+
+        Use it as a context manager to make it the current span, it ends with
+        the with block and records the exception raised in it.
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        context = None
+        if parent is not None:
+            context = trace.set_span_in_context(trace.NonRecordingSpan(parent))
+        span = self._tracer.start_span(
+            name, context=context, kind=trace.SpanKind[kind], attributes=attributes
+        )
+        return trace.use_span(span, end_on_exit=True)
+
+    def extract(self, carrier):
+        """Return the SpanContext in a headers-like carrier, or None."""
+        if not self.enabled or not carrier:
+            return None
+        context = self._propagator.extract(carrier)
+        span_context = trace.get_current_span(context).get_span_context()
+        return span_context if span_context.is_valid else None
+
+    def inject(self, carrier):
+        """Add the traceparent of the current span to a dict-like carrier."""
+        if self.enabled:
+            self._propagator.inject(carrier)
+        return carrier
+
+    def instrument(self, function):
+        """Wrap the user function in a span, returns it as is when disabled."""
+        if not self.enabled:
+            return function
+        name = "function " + getattr(function, "__name__", "function")
+
+        if inspect.iscoroutinefunction(function):
+
+            @functools.wraps(function)
+            async def async_traced(context):
+                with self.start_span(name):
+                    return await function(context)
+
+            return async_traced
+
+        @functools.wraps(function)
+        def traced(context):
+            with self.start_span(name):
+                return function(context)
+
+        return traced
+
+    def force_flush(self):
+        if self.provider:
+            self.provider.force_flush()
+
+    def shutdown(self):
+        if self.provider:
+            self.provider.shutdown()
+
+
+tracer = Tracer()
@@ -0,0 +1,133 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import contextlib
+import itertools
+import threading
+import time
+
+from functions_framework import constants
+from functions_framework._fork import ForkAware
+from functions_framework._tracing import tracer
+
+
+def _default_client_factory():
+    from dapr.clients import DaprClient
+
+    if not tracer.enabled:
+        return DaprClient()
+
+    from functions_framework.clients.trace_interceptor import TraceContextInterceptor
+
+    return DaprClient(interceptors=[TraceContextInterceptor()])
+
+
+class _PooledClient(object):
+    """A pool slot holding one lazily created Dapr client."""
+
+    def __init__(self):
+        self.client = None
+        self.leases = 0
+        self.last_used = 0.0
+
+
+class DaprClientPool(ForkAware):
+    """Process-wide pool of Dapr clients shared by every invocation.
+
+    gRPC channels are thread-safe and multiplex concurrent calls, so the pool
+    hands out a small set of shared clients round-robin instead of giving
+    each caller an exclusive client. Clients are created lazily on first use,
+    closed again once they have been idle for ``idle_timeout`` seconds and
+    dropped (without being closed) in a forked child, so a pool built before
+    gunicorn forks its workers never shares a channel across processes.
+    """
+
+    def __init__(
+        self,
+        size=constants.DEFAULT_DAPR_CLIENT_POOL_SIZE,
+        idle_timeout=constants.DEFAULT_DAPR_CLIENT_IDLE_TIMEOUT,
+        client_factory=None,
+    ):
+        if size < 1:
+            raise ValueError("Dapr client pool size must be at least 1")
+        super().__init__()
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self._client_factory = client_factory or _default_client_factory
+        self._lock = threading.Lock()
+        self._slots = [_PooledClient() for _ in range(size)]
+        self._next = itertools.cycle(range(size))
+        self._closed = False
+
+    def _after_fork(self):
+        # Channels created by the parent are not usable in the child.
+        self._lock = threading.Lock()
+        self._slots = [_PooledClient() for _ in range(self.size)]
+
+    def _evict_idle(self, now):
+        if not self.idle_timeout:
+            return
+        for slot in self._slots:
+            if (
+                slot.client is not None
+                and slot.leases == 0
+                and now - slot.last_used > self.idle_timeout
+            ):
+                slot.client.close()
+                slot.client = None
+
+    def acquire(self):
+        """Lease a client from the pool, release it with :meth:`release`."""
+        self._check_fork()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Dapr client pool is closed")
+            now = time.monotonic()
+            self._evict_idle(now)
+            slot = self._slots[next(self._next)]
+            if slot.client is None:
+                slot.client = self._client_factory()
+            slot.leases += 1
+            slot.last_used = now
+            return slot
+
+    def release(self, slot):
+        with self._lock:
+            slot.leases -= 1
+            slot.last_used = time.monotonic()
+
+    def get(self):
+        """Return a pooled client without holding a lease on it."""
+        slot = self.acquire()
+        self.release(slot)
+        return slot.client
+
+    @contextlib.contextmanager
+    def client(self):
+        """Context manager yielding a pooled client for the duration of a call."""
+        slot = self.acquire()
+        try:
+            yield slot.client
+        finally:
+            self.release(slot)
+
+    def close(self):
+        """Close every client created by this process."""
+        with self._lock:
+            self._closed = True
+            if self._forked():
+                return
+            for slot in self._slots:
+                if slot.client is not None:
+                    slot.client.close()
+                    slot.client = None
@@ -0,0 +1,53 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+import time
+
+from functions_framework._fork import ForkAware
+
+_MISSING = object()
+
+
+class InputCache(ForkAware):
+    """Process-wide cache of fetched inputs, each kept for the TTL of its input.
+
+    Only a handful of inputs are declared per function, so entries are never
+    evicted, they expire.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def get(self, name, default=_MISSING):
+        """Return the cached value of an input, default if missing or expired."""
+        self._check_fork()
+        item = self._values.get(name)
+        if item is None or item[1] < time.monotonic():
+            return default
+        return item[0]
+
+    def put(self, name, value, ttl):
+        self._check_fork()
+        with self._lock:
+            self._values[name] = (value, time.monotonic() + ttl)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
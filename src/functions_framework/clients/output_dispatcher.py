@@ -0,0 +1,101 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import atexit
+import contextvars
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from functions_framework import constants
+from functions_framework._fork import ForkAware
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_dispatcher():
+    """The dispatcher shared by the contexts built without a runtime context."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = OutputDispatcher()
+            atexit.register(_default.close)
+        return _default
+
+
+class OutputDispatcher(ForkAware):
+    """Process-wide background executor for sends to outputs.
+
+    At most ``queue_size`` sends may be queued or running at once, submitting
+    more blocks the caller until one completes, so a function producing faster
+    than its outputs accept is slowed down instead of buffering without bound.
+    Worker threads are started on first use and restarted in forked children.
+    """
+
+    def __init__(
+        self,
+        workers=constants.DEFAULT_OUTPUT_WORKERS,
+        queue_size=constants.DEFAULT_OUTPUT_QUEUE_SIZE,
+    ):
+        if workers < 1 or queue_size < 1:
+            raise ValueError("Output dispatcher needs at least one worker and slot")
+        super().__init__()
+        self.workers = workers
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._closed = False
+
+    def _after_fork(self):
+        # Threads do not survive a fork, start over in the child.
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+
+    def _get_executor(self):
+        self._check_fork()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Output dispatcher is closed")
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="output"
+                )
+            return self._executor
+
+    def submit(self, fn, *args, **kwargs):
+        """Run fn in the background, returns a concurrent.futures.Future.
+
+        fn runs in a copy of the caller's context, e.g. the current span.
+        """
+        executor = self._get_executor()
+        context = contextvars.copy_context()
+        slots = self._slots
+        slots.acquire()
+        try:
+            future = executor.submit(context.run, fn, *args, **kwargs)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda f: slots.release())
+        return future
+
+    def close(self):
+        """Wait for queued sends to complete and stop the worker threads."""
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None and not self._forked():
+            executor.shutdown(wait=True)
@@ -0,0 +1,93 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import collections
+import threading
+import time
+
+from functions_framework import constants
+from functions_framework._fork import ForkAware
+
+
+class StateEntry(object):
+    """A state value with the ETag it was read with."""
+
+    __slots__ = ("key", "data", "etag")
+
+    def __init__(self, key, data, etag=None):
+        self.key = key
+        self.data = data
+        self.etag = etag
+
+    def __repr__(self):
+        return "StateEntry(key={!r}, data={!r}, etag={!r})".format(
+            self.key, self.data, self.etag
+        )
+
+
+class StateCache(ForkAware):
+    """Process-wide read-through cache of state store entries.
+
+    Holds at most ``size`` entries, evicting the least recently used, each for
+    at most ``ttl`` seconds. The cache only sees the writes of its own worker
+    process, so the TTL bounds how stale a value written by another worker
+    can be.
+    """
+
+    def __init__(self, size, ttl=constants.DEFAULT_STATE_CACHE_TTL):
+        if size < 1:
+            raise ValueError("State cache size must be at least 1")
+        super().__init__()
+        self.size = size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+
+    def get(self, store, key):
+        """Return the cached StateEntry, or None if missing or expired."""
+        self._check_fork()
+        with self._lock:
+            item = self._entries.get((store, key))
+            if item is None:
+                return None
+            entry, expires = item
+            if expires < time.monotonic():
+                del self._entries[(store, key)]
+                return None
+            self._entries.move_to_end((store, key))
+            return entry
+
+    def put(self, store, entry):
+        self._check_fork()
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[(store, entry.key)] = (entry, expires)
+            self._entries.move_to_end((store, entry.key))
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, store, key):
+        self._check_fork()
+        with self._lock:
+            self._entries.pop((store, key), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,38 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from dapr.clients.grpc._helpers import DaprClientInterceptor, _ClientCallDetails
+
+from functions_framework._tracing import tracer
+
+
+class TraceContextInterceptor(DaprClientInterceptor):
+    """Add the traceparent of the current span to every call to the sidecar."""
+
+    def __init__(self):
+        super().__init__([])
+
+    def _intercept_call(self, client_call_details):
+        headers = tracer.inject({})
+        if not headers:
+            return client_call_details
+        metadata = list(client_call_details.metadata or [])
+        metadata.extend(headers.items())
+        return _ClientCallDetails(
+            client_call_details.method,
+            client_call_details.timeout,
+            metadata,
+            client_call_details.credentials,
+            client_call_details.wait_for_ready,
+            client_call_details.compression,
+        )
@@ -14,7 +14,71 @@
 DEFAULT_DAPR_APP_PORT = 50051
 DEFAULT_HTTP_APP_PORT = 8080
 
+HTTP_MODE_WSGI = "wsgi"
+HTTP_MODE_ASGI = "asgi"
+HTTP_MODES = (HTTP_MODE_WSGI, HTTP_MODE_ASGI)
+
+DEFAULT_ASGI_MAX_THREADS = 40
+
+AUTO = "auto"
+
+HTTP_WORKER_CLASS_SYNC = "sync"
+HTTP_WORKER_CLASS_GTHREAD = "gthread"
+HTTP_WORKER_CLASS_UVICORN = "uvicorn"
+HTTP_WORKER_CLASSES = (
+    HTTP_WORKER_CLASS_SYNC,
+    HTTP_WORKER_CLASS_GTHREAD,
+    HTTP_WORKER_CLASS_UVICORN,
+)
+
+DEFAULT_SHUTDOWN_GRACE_PERIOD = 10
+
+DEFAULT_DAPR_CLIENT_POOL_SIZE = 4
+DEFAULT_DAPR_CLIENT_IDLE_TIMEOUT = 300
+
+# Threads of the Dapr app gRPC server, the default of dapr.ext.grpc.App
+DEFAULT_DAPR_WORKERS = 10
+# Events a Dapr trigger processes at once, 0 is only bounded by the workers
+DEFAULT_DAPR_MAX_IN_FLIGHT = 0
+# What a saturated Dapr trigger answers, Dapr redelivers retried events later
+DAPR_OVERFLOW_RETRY = "retry"
+DAPR_OVERFLOW_DROP = "drop"
+# The statuses of the events of a topic subscription
+DAPR_EVENT_SUCCESS = "success"
+DAPR_EVENT_RETRY = "retry"
+DAPR_EVENT_DROP = "drop"
+DAPR_EVENT_STATUSES = (DAPR_EVENT_SUCCESS, DAPR_EVENT_RETRY, DAPR_EVENT_DROP)
+
+DEFAULT_OUTPUT_WORKERS = 8
+DEFAULT_OUTPUT_QUEUE_SIZE = 1024
+
+# The state cache is disabled by default
+DEFAULT_STATE_CACHE_SIZE = 0
+DEFAULT_STATE_CACHE_TTL = 30
+# Responses cached at most by the HTTP response cache, and the methods cached
+DEFAULT_RESPONSE_CACHE_SIZE = 1024
+DEFAULT_RESPONSE_CACHE_METHODS = ("GET", "HEAD")
+
+# Records queued for the log writer thread at most, further ones are dropped
+DEFAULT_LOG_QUEUE_SIZE = 10000
+DEFAULT_LOG_FILE_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_LOG_FILE_BACKUP_COUNT = 5
+LOG_FORMAT_TEXT = "text"
+LOG_FORMAT_JSON = "json"
+# Buffering of the JSON entries printed in the legacy GCF logging mode
+DEFAULT_LOG_BUFFER_SIZE = 64 * 1024
+DEFAULT_LOG_FLUSH_INTERVAL = 1.0
+
+# Chunks of the request body read at once by UserContext.iter_body
+DEFAULT_BODY_CHUNK_SIZE = 64 * 1024
+
+DEFAULT_METRICS_PATH = "/metrics"
+DEFAULT_METRICS_PORT = 9464
+
 DAPR_BINDING_TYPE = "bindings"
 DAPR_PUBSUB_TYPE = "pubsub"
+DAPR_STATE_TYPE = "state"
+DAPR_SECRET_STORE_TYPE = "secretstores"
+DAPR_CONFIGURATION_TYPE = "configuration"
 
 DEFAULT_DATA_CONTENT_TYPE = "application/json"
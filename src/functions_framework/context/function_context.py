@@ -11,10 +11,74 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from functions_framework.constants import DAPR_BINDING_TYPE, DAPR_PUBSUB_TYPE
+import copy
 
+from types import MappingProxyType
 
-class FunctionContext(object):
+from functions_framework.constants import (
+    DAPR_BINDING_TYPE,
+    DAPR_CONFIGURATION_TYPE,
+    DAPR_PUBSUB_TYPE,
+    DAPR_SECRET_STORE_TYPE,
+    DAPR_STATE_TYPE,
+)
+
+COMPONENT_TYPES = (
+    DAPR_BINDING_TYPE,
+    DAPR_PUBSUB_TYPE,
+    DAPR_STATE_TYPE,
+    DAPR_SECRET_STORE_TYPE,
+    DAPR_CONFIGURATION_TYPE,
+)
+
+
+def _freeze_value(value):
+    if isinstance(value, Freezable):
+        return value.freeze()
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze_value(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze_value(v) for v in value)
+    return value
+
+
+class Freezable(object):
+    """Base for context objects that can be turned into read-only snapshots.
+
+    Once frozen, attributes can no longer be set, dicts become read-only
+    mappings and lists become tuples. A frozen object is shared as is instead
+    of being copied, so handing it to every invocation costs nothing.
+    """
+
+    _frozen = False
+
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError(
+                "cannot set {!r} on frozen {}".format(name, type(self).__name__)
+            )
+        super().__setattr__(name, value)
+
+    def __deepcopy__(self, memo):
+        if self._frozen:
+            return self
+        cls = type(self)
+        copied = cls.__new__(cls)
+        memo[id(self)] = copied
+        for name, value in vars(self).items():
+            object.__setattr__(copied, name, copy.deepcopy(value, memo))
+        return copied
+
+    def freeze(self):
+        """Freeze this object and everything it holds, returns self."""
+        if not self._frozen:
+            for name, value in vars(self).items():
+                object.__setattr__(self, name, _freeze_value(value))
+            object.__setattr__(self, "_frozen", True)
+        return self
+
+
+class FunctionContext(Freezable):
     """OpenFunction's serving context."""
 
     def __init__(
@@ -51,7 +115,7 @@ class FunctionContext(object):
         outputs_map = json_dct.get("outputs")
         _dapr_triggers = json_dct.get("triggers", {}).get("dapr", [])
         http_trigger = json_dct.get("triggers", {}).get("http", None)
-        states = json_dct.get("states", {})
+        states_map = json_dct.get("states")
         pre_hooks = json_dct.get("pre_hooks", [])
         post_hooks = json_dct.get("post_hooks", [])
         tracing = json_dct.get("tracing", {})
@@ -71,6 +135,12 @@ class FunctionContext(object):
                 output = Component.from_json(v)
                 outputs[k] = output
 
+        states = None
+        if states_map:
+            states = {}
+            for k, v in states_map.items():
+                states[k] = Component.from_json(v)
+
         dapr_triggers = []
         for trigger in _dapr_triggers:
             dapr_triggers.append(DaprTrigger.from_json(trigger))
@@ -93,7 +163,7 @@ class FunctionContext(object):
         )
 
 
-class Component(object):
+class Component(Freezable):
     """Components for inputs and outputs."""
 
     def __init__(
@@ -103,18 +173,24 @@ class Component(object):
         topic="",
         metadata=None,
         operation="",
+        key=None,
+        ttl=0,
     ):
         self.topic = topic
         self.component_name = component_name
         self.component_type = component_type
         self.metadata = metadata
         self.operation = operation
+        # What an input fetches: a state or secret key, or configuration keys
+        self.key = key
+        # Seconds a fetched input is reused by later invocations
+        self.ttl = ttl
 
     def get_type(self):
         type_split = self.component_type.split(".")
         if len(type_split) > 1:
             t = type_split[0]
-            if t == DAPR_BINDING_TYPE or t == DAPR_PUBSUB_TYPE:
+            if t in COMPONENT_TYPES:
                 return t
 
         return ""
@@ -138,29 +214,72 @@ class Component(object):
         metadata = json_dct.get("metadata")
         component_type = json_dct.get("componentType", "")
         operation = json_dct.get("operation", "")
-        return Component(component_name, component_type, topic, metadata, operation)
+        key = json_dct.get("key")
+        ttl = json_dct.get("ttl", 0)
+        return Component(
+            component_name, component_type, topic, metadata, operation, key, ttl
+        )
 
 
-class HTTPRoute(object):
+class HTTPRoute(Freezable):
     """HTTP route."""
 
-    def __init__(self, port=""):
+    # FUNC_CONTEXT keys of the HTTP server tuning options
+    SERVER_OPTIONS = {
+        "workers": "workers",
+        "threads": "threads",
+        "workerClass": "worker_class",
+        "keepAlive": "keep_alive",
+        "backlog": "backlog",
+        "maxRequests": "max_requests",
+        "maxRequestsJitter": "max_requests_jitter",
+    }
+
+    def __init__(self, port="", mode="", server_options=None, cache=None):
         self.port = port
+        self.mode = mode
+        self.server_options = server_options or {}
+        # The response cache configuration, see ResponseCache.from_config
+        self.cache = cache
 
     def __str__(self):
-        return "{port: %s}" % (self.port)
+        return "{port: %s, mode: %s, server_options: %s}" % (
+            self.port,
+            self.mode,
+            self.server_options,
+        )
 
     @staticmethod
     def from_json(json_dct):
         port = json_dct.get("port", "")
-        return HTTPRoute(port)
+        mode = json_dct.get("mode", "")
+        server_options = {
+            option: json_dct[key]
+            for key, option in HTTPRoute.SERVER_OPTIONS.items()
+            if json_dct.get(key) is not None
+        }
+        return HTTPRoute(port, mode, server_options, json_dct.get("cache"))
 
 
-class DaprTrigger(object):
-    def __init__(self, name, component_type, topic):
+class DaprTrigger(Freezable):
+    def __init__(
+        self,
+        name,
+        component_type,
+        topic,
+        max_in_flight=None,
+        overflow=None,
+        bulk_subscribe=None,
+    ):
         self.name = name
         self.component_type = component_type
         self.topic = topic
+        # Overrides the --dapr-max-in-flight of the function for this trigger
+        self.max_in_flight = max_in_flight
+        # "retry" or "drop" the events received while max_in_flight are running
+        self.overflow = overflow
+        # The bulkSubscribe of a pubsub trigger delivering events in batches
+        self.bulk_subscribe = bulk_subscribe
 
     def __str__(self):
         return "{name: %s, component_type: %s, topic: %s}" % (
@@ -174,4 +293,11 @@ class DaprTrigger(object):
         name = json_dct.get("name", "")
         component_type = json_dct.get("type", "")
         topic = json_dct.get("topic")
-        return DaprTrigger(name, component_type, topic)
+        max_in_flight = json_dct.get("maxInFlight")
+        overflow = json_dct.get("overflow")
+        bulk_subscribe = json_dct.get("bulkSubscribe")
+        if bulk_subscribe is not None and not bulk_subscribe.get("enabled"):
+            bulk_subscribe = None
+        return DaprTrigger(
+            name, component_type, topic, max_in_flight, overflow, bulk_subscribe
+        )
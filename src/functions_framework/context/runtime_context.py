@@ -11,20 +11,41 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from functions_framework.clients.dapr_client_pool import DaprClientPool
+from functions_framework.clients.input_cache import InputCache
+from functions_framework.clients.output_dispatcher import OutputDispatcher
+from functions_framework.clients.state_cache import StateCache
 from functions_framework.context.function_context import (
     Component,
     DaprTrigger,
+    Freezable,
     FunctionContext,
     HTTPRoute,
 )
 
 
-class RuntimeContext:
-    """Context for runtime."""
+class RuntimeContext(Freezable):
+    """Context for runtime.
 
-    def __init__(self, context: FunctionContext = None, logger=None):
+    The runtime context is built and frozen once at startup and shared by all
+    invocations, per-invocation state lives in the UserContext.
+    """
+
+    def __init__(
+        self,
+        context: FunctionContext = None,
+        logger=None,
+        dapr_client_pool: DaprClientPool = None,
+        output_dispatcher: OutputDispatcher = None,
+        state_cache: StateCache = None,
+        input_cache: InputCache = None,
+    ):
         self.context = context
         self.logger = logger
+        self.dapr_client_pool = dapr_client_pool
+        self.output_dispatcher = output_dispatcher
+        self.state_cache = state_cache
+        self.input_cache = input_cache
 
     def __init_logger(self):
         if self.logger:
@@ -48,8 +69,20 @@ class RuntimeContext:
         else:
             return None
 
+    def get_inputs(self) -> [Component]:
+        if self.context and self.context.inputs:
+            return self.context.inputs
+        else:
+            return []
+
     def get_outputs(self) -> [Component]:
         if self.context and self.context.outputs:
             return self.context.outputs
         else:
             return []
+
+    def get_states(self) -> [Component]:
+        if self.context and self.context.states:
+            return self.context.states
+        else:
+            return []
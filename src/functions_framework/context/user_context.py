@@ -11,15 +11,33 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import copy
+import contextvars
+import functools
+import inspect
 import json
 
-from dapr.clients import DaprClient
+from concurrent import futures
+from copy import deepcopy as _deepcopy
 
-from functions_framework import constants
+from functions_framework import _tracing, constants
+from functions_framework._metrics import metrics
+from functions_framework._tracing import tracer
+from functions_framework.clients.dapr_client_pool import DaprClientPool
+from functions_framework.clients.output_dispatcher import (
+    OutputDispatcher,
+    default_dispatcher,
+)
+from functions_framework.clients.state_cache import StateEntry
 from functions_framework.context.runtime_context import RuntimeContext
 from functions_framework.exceptions import exception_handler
+from functions_framework.openfunction import codec
 from functions_framework.openfunction.function_out import FunctionOut
+from functions_framework.openfunction.payload import Payload
+from functions_framework.openfunction.streaming import (
+    SSE_HEADERS,
+    StreamingBody,
+    sse_chunks,
+)
 
 
 class UserContext(object):
@@ -32,33 +50,552 @@ class UserContext(object):
         topic_event=None,
         http_request=None,
         logger=None,
+        topic_events=None,
+        http_body=None,
     ):
         self.runtime_context = runtime_context
         self.logger = logger
         self.out = FunctionOut(0, None, "", {})
-        self.dapr_client = None
         self.__binding_request = binding_request
         self.__topic_event = topic_event
         self.__http_request = http_request
-        self.__init_dapr_client()
+        # A file-like reader of the body of an ASGI request, for plain functions
+        self.__http_body = http_body
+        self.__topic_events = topic_events
+        self.__topic_event_statuses = None
+        self.__body = None
+        self.__decoded = {}
+        self.__dapr_client_pool = None
+        self.__dapr_client_lease = None
+        self.__pending = []
+        self.__inputs = {}
 
-    def __init_dapr_client(self):
-        if not self.dapr_client:
-            self.dapr_client = DaprClient()
+    def __get_dapr_client_pool(self) -> DaprClientPool:
+        pool = self.runtime_context and self.runtime_context.dapr_client_pool
+        if pool:
+            return pool
+        # Standalone contexts (e.g. in tests) get a single private client.
+        if not self.__dapr_client_pool:
+            self.__dapr_client_pool = DaprClientPool(size=1, idle_timeout=0)
+        return self.__dapr_client_pool
+
+    def __get_output_dispatcher(self) -> OutputDispatcher:
+        dispatcher = self.runtime_context and self.runtime_context.output_dispatcher
+        if dispatcher:
+            return dispatcher
+        # Standalone contexts (e.g. in tests) share one process-wide dispatcher
+        return default_dispatcher()
+
+    @property
+    def dapr_client(self):
+        """A Dapr client shared through the runtime's client pool.
+
+        The client is leased from the pool until the context is closed, which
+        the framework does once the invocation and its response are done, so
+        the pool does not evict it while the function uses it.
+        """
+        if self.__dapr_client_lease is None:
+            pool = self.__get_dapr_client_pool()
+            self.__dapr_client_lease = (pool, pool.acquire())
+        return self.__dapr_client_lease[1].client
+
+    def close(self):
+        """Release the resources held by the context, e.g. its Dapr client."""
+        lease, self.__dapr_client_lease = self.__dapr_client_lease, None
+        if lease is not None:
+            pool, slot = lease
+            pool.release(slot)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
 
     def __init_logger(self):
         if self.logger:
             self.logger.name = __name__
 
-    def get_binding_request(self):
-        return copy.deepcopy(self.__binding_request)
+    def get_function_out(self, rv=None):
+        """The FunctionOut of the invocation, given what the function returned.
+
+        The returned FunctionOut, else out if the function returned None and
+        set it, else None when the return value is the response itself.
+        """
+        if isinstance(rv, FunctionOut):
+            return rv
+        if rv is None and not self.out.is_empty():
+            return self.out
+        return None
+
+    def get_binding_request(self, copy=True):
+        """Get the binding request, a deep copy unless copy is False.
+
+        Without a copy the request of the invocation itself is returned, it
+        must not be modified. get_payload() is cheaper to only read the data.
+        """
+        if not copy:
+            return self.__binding_request
+        return _deepcopy(self.__binding_request)
+
+    def get_topic_event(self, copy=True):
+        """Get the topic event, a deep copy unless copy is False.
+
+        Without a copy the event of the invocation itself is returned, it
+        must not be modified. get_payload() is cheaper to only read the data.
+        """
+        if not copy:
+            return self.__topic_event
+        return _deepcopy(self.__topic_event)
+
+    def get_payload(self):
+        """Get a read-only view of the data of the binding request or topic event.
+
+        The data is not copied, see Payload. Returns None for HTTP invocations.
+        """
+        if self.__binding_request is not None:
+            return Payload(self.__binding_request.data)
+        if self.__topic_event is not None:
+            return _event_payload(self.__topic_event)
+        return None
+
+    def get_payloads(self):
+        """Get a read-only view of the data of each event of get_topic_events()."""
+        if self.__topic_events is None:
+            payload = self.get_payload()
+            return [payload] if self.__topic_event is not None else []
+        return [_event_payload(event) for event in self.__topic_events]
+
+    def __count_topic_events(self):
+        if self.__topic_events is None:
+            return 0 if self.__topic_event is None else 1
+        return len(self.__topic_events)
+
+    def get_topic_events(self, copy=True):
+        """Get the events of a bulk subscription delivered to this invocation.
 
-    def get_topic_event(self):
-        return copy.deepcopy(self.__topic_event)
+        A single event delivery is a batch of one event. The events are deep
+        copies unless copy is False, see get_topic_event().
+        """
+        if self.__topic_events is None:
+            if self.__topic_event is None:
+                return []
+            return [self.get_topic_event(copy)]
+        if not copy:
+            return list(self.__topic_events)
+        return _deepcopy(self.__topic_events)
+
+    def set_topic_event_status(self, index, status):
+        """Set the status Dapr gets for an event of get_topic_events().
+
+        Events default to "success", or to "retry" if the function raises.
+        Args:
+            index: The index of the event in get_topic_events().
+            status: "success", "retry" to have it redelivered, or "drop".
+        """
+        if status not in constants.DAPR_EVENT_STATUSES:
+            raise ValueError(
+                "Invalid status {}, expected one of {}".format(
+                    status, ", ".join(constants.DAPR_EVENT_STATUSES)
+                )
+            )
+        if not 0 <= index < self.__count_topic_events():
+            raise IndexError("No topic event at index {}".format(index))
+        if self.__topic_event_statuses is None:
+            self.__topic_event_statuses = {}
+        self.__topic_event_statuses[index] = status
+
+    def get_topic_event_statuses(self, default=constants.DAPR_EVENT_SUCCESS):
+        """The status of each event, default for the events without one."""
+        statuses = self.__topic_event_statuses or {}
+        return [statuses.get(i, default) for i in range(self.__count_topic_events())]
 
     def get_http_request(self):
         return self.__http_request
 
+    def __get_http_request(self):
+        if self.__http_request is None:
+            raise Exception("Not an HTTP invocation.")
+        return self.__http_request
+
+    def __is_asgi(self):
+        # Flask requests read their body synchronously, Starlette ones do not
+        return not hasattr(self.__get_http_request(), "get_data")
+
+    def __decode(self, name, decode):
+        if name not in self.__decoded:
+            self.__decoded[name] = decode()
+        return self.__decoded[name]
+
+    def get_body(self) -> bytes:
+        """Get the body of the HTTP request, read once and cached.
+
+        Coroutine functions served over ASGI must await read_body() first.
+        """
+        if self.__body is None:
+            request = self.__get_http_request()
+            if self.__http_body is not None:
+                self.__body = self.__http_body.read()
+            elif self.__is_asgi():
+                raise Exception(
+                    "The request body was not read, await context.read_body() first."
+                )
+            else:
+                self.__body = request.get_data()
+        return self.__body
+
+    async def read_body(self) -> bytes:
+        """Read the body of the HTTP request, see get_body()."""
+        if self.__body is None and self.__is_asgi():
+            self.__body = await self.__get_http_request().body()
+        return self.get_body()
+
+    def get_json(self):
+        """Get the body of the HTTP request parsed as JSON, parsed once.
+
+        Parsed with the decoder of the codec, see codec.set_json_decoder().
+        """
+        return self.__decode("json", lambda: codec.loads(self.get_body()))
+
+    async def read_json(self):
+        """Read the body of the HTTP request parsed as JSON, see get_json()."""
+        await self.read_body()
+        return self.get_json()
+
+    def get_form(self):
+        """Get the form fields of the HTTP request, parsed once.
+
+        Over ASGI, multipart forms must be read with await read_form() first.
+        """
+        request = self.__get_http_request()
+        if not self.__is_asgi():
+            return request.form
+        if "form" not in self.__decoded:
+            from urllib.parse import parse_qsl
+
+            from starlette.datastructures import FormData
+
+            content_type = request.headers.get("content-type", "")
+            if not content_type.startswith("application/x-www-form-urlencoded"):
+                raise Exception(
+                    "The form was not read, await context.read_form() first."
+                )
+            body = self.get_body().decode("latin-1")
+            self.__decoded["form"] = FormData(parse_qsl(body, keep_blank_values=True))
+        return self.__decoded["form"]
+
+    async def read_form(self):
+        """Read the form fields of the HTTP request, see get_form()."""
+        if self.__is_asgi() and "form" not in self.__decoded:
+            self.__decoded["form"] = await self.__get_http_request().form()
+        return self.get_form()
+
+    def get_cloud_event(self):
+        """Get the CloudEvent sent in the HTTP request, parsed once.
+
+        Both the structured and the binary content modes are supported.
+        Returns:
+            A cloudevents.http.CloudEvent, with JSON data parsed.
+        """
+        from cloudevents.http import from_http
+
+        request = self.__get_http_request()
+        return self.__decode(
+            "cloud_event",
+            lambda: from_http(
+                dict(request.headers),
+                self.get_body(),
+                data_unmarshaller=codec.loads_or_data,
+            ),
+        )
+
+    async def read_cloud_event(self):
+        """Read the CloudEvent sent in the HTTP request, see get_cloud_event()."""
+        await self.read_body()
+        return self.get_cloud_event()
+
+    def iter_body(self, chunk_size=constants.DEFAULT_BODY_CHUNK_SIZE):
+        """Iterate over the body of the HTTP request without buffering it.
+
+        Once iterated, the body cannot be read again. A body which was already
+        read is iterated from memory.
+        """
+        request = self.__get_http_request()
+        if self.__body is not None or (
+            self.__http_body is None
+            and (
+                self.__is_asgi()
+                # Already read by the framework, e.g. to key the response cache
+                or getattr(request, "_cached_data", None) is not None
+            )
+        ):
+            body = self.get_body()
+            for i in range(0, len(body), chunk_size):
+                yield body[i : i + chunk_size]
+            return
+        stream = self.__http_body or request.stream
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def stream(self, chunks, content_type=None, status=200, headers=None):
+        """Build a response streaming chunks to the client as they are produced.
+
+        Return it from the function. Returning a generator does the same with
+        the default content type.
+        Args:
+            chunks: An iterable or async iterable of bytes or str.
+            content_type: The content type of the response.
+            status: The status code of the response.
+            headers: A dict of additional headers.
+        """
+        return StreamingBody(chunks, content_type, status, headers)
+
+    def sse(self, events, status=200, headers=None):
+        """Build a text/event-stream response sending events as they are produced.
+
+        Args:
+            events: An iterable or async iterable of ServerSentEvent, or of
+                data sent as unnamed events, str as is, others as JSON.
+        """
+        return StreamingBody(
+            sse_chunks(events),
+            "text/event-stream",
+            status,
+            dict(SSE_HEADERS, **(headers or {})),
+        )
+
+    async def aiter_body(self):
+        """Iterate over the body of the HTTP request without buffering it, over ASGI."""
+        if self.__body is not None or not self.__is_asgi():
+            for chunk in self.iter_body():
+                yield chunk
+            return
+        async for chunk in self.__get_http_request().stream():
+            if chunk:
+                yield chunk
+
+    def __get_input_component(self, input_name):
+        inputs = self.runtime_context.get_inputs() if self.runtime_context else []
+
+        if not inputs:
+            raise Exception("No inputs found.")
+
+        if input_name not in inputs:
+            raise Exception("No input named {} found.".format(input_name))
+
+        return inputs[input_name]
+
+    def __fetch_input(self, input_name, target):
+        t = target.get_type()
+        metadata = dict(target.metadata or {})
+        pool = self.__get_dapr_client_pool()
+        span = tracer.start_span(
+            "input fetch " + input_name,
+            _tracing.CLIENT,
+            attributes={"dapr.component": target.component_name},
+        )
+        with span, pool.client() as dapr_client:
+            if t == constants.DAPR_STATE_TYPE:
+                return dapr_client.get_state(
+                    target.component_name, target.key, state_metadata=metadata
+                ).data
+            elif t == constants.DAPR_BINDING_TYPE:
+                return dapr_client.invoke_binding(
+                    target.component_name,
+                    target.operation or "get",
+                    b"",
+                    binding_metadata=metadata,
+                ).data
+            elif t == constants.DAPR_SECRET_STORE_TYPE:
+                return dapr_client.get_secret(
+                    target.component_name, target.key, secret_metadata=metadata
+                ).secret
+            elif t == constants.DAPR_CONFIGURATION_TYPE:
+                keys = target.key or []
+                if isinstance(keys, str):
+                    keys = [keys]
+                items = dapr_client.get_configuration(
+                    target.component_name, keys, config_metadata=metadata
+                ).items
+                return {key: item.value for key, item in items.items()}
+        raise Exception(
+            "Input {} has unsupported type {}.".format(
+                input_name, target.component_type
+            )
+        )
+
+    def __load_input(self, input_name, target):
+        cache = self.runtime_context.input_cache if self.runtime_context else None
+        if cache is not None and target.ttl:
+            value = cache.get(input_name, cache)
+            if value is not cache:
+                return value
+        value = self.__fetch_input(input_name, target)
+        if cache is not None and target.ttl:
+            cache.put(input_name, value, target.ttl)
+        return value
+
+    def get_input(self, input_name):
+        """Get the value of a declared input.
+
+        An input is fetched once per invocation, and reused by later
+        invocations for the ttl seconds declared in the input if any.
+        Args:
+            input_name: A string of designated input name.
+        Returns:
+            The data of a state or binding, the dict of a secret, or the dict
+            of configuration values.
+        """
+        if input_name not in self.__inputs:
+            target = self.__get_input_component(input_name)
+            self.__inputs[input_name] = (self.__load_input(input_name, target), None)
+        value, error = self.__inputs[input_name]
+        if error is not None:
+            raise error
+        return value
+
+    def get_inputs(self):
+        """Get the values of all declared inputs, as a dict by input name."""
+        self.prefetch_inputs()
+        inputs = self.runtime_context.get_inputs() if self.runtime_context else {}
+        return {name: self.get_input(name) for name in inputs or {}}
+
+    def prefetch_inputs(self, timeout=None):
+        """Fetch all declared inputs not fetched yet, concurrently.
+
+        A failed fetch does not fail the prefetch, its error is raised by
+        get_input() when the function asks for that input.
+        Args:
+            timeout: Seconds to wait at most, None waits until done.
+        """
+        inputs = self.runtime_context.get_inputs() if self.runtime_context else {}
+        missing = [name for name in inputs or {} if name not in self.__inputs]
+        if not missing:
+            return
+        if len(missing) == 1:
+            # Nothing to overlap with, fetched in the calling thread
+            name = missing[0]
+            try:
+                self.__inputs[name] = (self.__load_input(name, inputs[name]), None)
+            except Exception as e:
+                self.__inputs[name] = (None, e)
+            return
+        dispatcher = self.__get_output_dispatcher()
+        pending = {
+            name: dispatcher.submit(self.__load_input, name, inputs[name])
+            for name in missing
+        }
+        futures.wait(pending.values(), timeout)
+        for name, future in pending.items():
+            # Inputs still being fetched are fetched again by get_input()
+            if future.done():
+                error = future.exception()
+                self.__inputs[name] = (None if error else future.result(), error)
+
+    def __get_output(self, output_name):
+        outputs = self.runtime_context.get_outputs() if self.runtime_context else []
+
+        if not outputs:
+            raise Exception("No outputs found.")
+
+        if output_name not in outputs:
+            raise Exception("No output named {} found.".format(output_name))
+
+        return outputs[output_name]
+
+    def __send(self, output_name, data):
+        target = self.__get_output(output_name)
+        resp = None
+
+        pool = self.__get_dapr_client_pool()
+        span = tracer.start_span(
+            "send " + output_name,
+            _tracing.CLIENT,
+            attributes={"dapr.component": target.component_name},
+        )
+        with span, metrics.send(output_name), pool.client() as dapr_client:
+            if target.component_type.startswith(constants.DAPR_BINDING_TYPE):
+                resp = dapr_client.invoke_binding(
+                    target.component_name, target.operation, data, target.metadata
+                )
+            elif target.component_type.startswith(constants.DAPR_PUBSUB_TYPE):
+                data = json.dumps(data)
+                resp = dapr_client.publish_event(
+                    target.component_name,
+                    target.topic,
+                    data,
+                    data_content_type=constants.DEFAULT_DATA_CONTENT_TYPE,
+                    publish_metadata=target.metadata,
+                )
+
+        return resp
+
+    def __bulk_publish(self, output_name, target, payloads):
+        from dapr.proto import api_v1
+
+        request = api_v1.BulkPublishRequest(
+            pubsub_name=target.component_name,
+            topic=target.topic,
+            entries=[
+                api_v1.BulkPublishRequestEntry(
+                    entry_id=str(i),
+                    event=json.dumps(data).encode("utf-8"),
+                    content_type=constants.DEFAULT_DATA_CONTENT_TYPE,
+                )
+                for i, data in enumerate(payloads)
+            ],
+            metadata=target.metadata or {},
+        )
+        span = tracer.start_span(
+            "send " + output_name,
+            _tracing.CLIENT,
+            attributes={
+                "dapr.component": target.component_name,
+                "messaging.batch.message_count": len(payloads),
+            },
+        )
+        pool = self.__get_dapr_client_pool()
+        with span, metrics.send(output_name), pool.client() as dapr_client:
+            # The SDK has no bulk publish method, its stub has the call
+            resp = dapr_client._stub.BulkPublishEventAlpha1(request)
+        if resp.failedEntries:
+            raise Exception(
+                "Failed to publish {} of {} events to output {}: {}".format(
+                    len(resp.failedEntries),
+                    len(payloads),
+                    output_name,
+                    resp.failedEntries[0].error,
+                )
+            )
+        return resp
+
+    def __send_batch(self, output_names, payloads, concurrent):
+        results = {}
+        pending = {}
+        for output_name in output_names:
+            target = self.__get_output(output_name)
+            if target.component_type.startswith(constants.DAPR_PUBSUB_TYPE):
+                results[output_name] = self.__bulk_publish(
+                    output_name, target, payloads
+                )
+            elif concurrent:
+                dispatcher = self.__get_output_dispatcher()
+                pending[output_name] = [
+                    dispatcher.submit(self.__send, output_name, data)
+                    for data in payloads
+                ]
+            else:
+                results[output_name] = [
+                    self.__send(output_name, data) for data in payloads
+                ]
+        for output_name, output_futures in pending.items():
+            results[output_name] = [future.result() for future in output_futures]
+        return results
+
     @exception_handler
     def send(self, output_name, data):
         """Send data to specify output component.
@@ -68,28 +605,280 @@ class UserContext(object):
         Returns:
             Response from dapr.
         """
-        outputs = self.runtime_context.get_outputs()
-        resp = None
+        return self.__send(output_name, data)
 
-        if not outputs:
-            raise Exception("No outputs found.")
+    def send_nowait(self, output_name, data):
+        """Queue data for an output and return without waiting for dapr.
 
-        if output_name not in outputs:
-            raise Exception("No output named {} found.".format(output_name))
+        Sends still pending when the function returns are completed by the
+        framework before the invocation is acknowledged, see flush().
+        Args:
+            data: Bytes or str to send.
+            output_name: A string of designated output name.
+        Returns:
+            A concurrent.futures.Future of the response from dapr.
+        """
+        future = self.__get_output_dispatcher().submit(self.__send, output_name, data)
+        self.__pending.append(future)
+        return future
+
+    def send_batch(self, output_name, payloads, wait=True):
+        """Send several payloads to one or several outputs.
+
+        Pubsub outputs are published with one bulk publish request, other
+        payloads are sent concurrently.
+        Args:
+            output_name: An output name, or a list of output names which each
+                receive all payloads.
+            payloads: A list of bytes or str to send.
+            wait: Whether to wait for the sends, or queue them like send_nowait.
+        Returns:
+            A dict mapping output names to the bulk publish response or to the
+            list of responses per payload, or a Future of that dict if wait
+            is False. Raises if a send fails.
+        """
+        if isinstance(output_name, str):
+            output_name = [output_name]
+        payloads = list(payloads)
+        if wait:
+            return self.__send_batch(output_name, payloads, concurrent=True)
+
+        future = self.__get_output_dispatcher().submit(
+            self.__send_batch, output_name, payloads, False
+        )
+        self.__pending.append(future)
+        return future
 
-        target = outputs[output_name]
-        if target.component_type.startswith(constants.DAPR_BINDING_TYPE):
-            resp = self.dapr_client.invoke_binding(
-                target.component_name, target.operation, data, target.metadata
+    def has_pending_sends(self):
+        return bool(self.__pending)
+
+    def flush(self, timeout=None):
+        """Wait for the sends queued by send_nowait and send_batch.
+
+        Raises the first error of a failed send once all sends completed.
+        Args:
+            timeout: Seconds to wait at most, None waits until done.
+        Returns:
+            The results of the pending sends in the order they were queued.
+        """
+        if not self.__pending:
+            return []
+        pending, self.__pending = self.__pending, []
+        futures.wait(pending, timeout)
+        return [future.result(0) for future in pending]
+
+    async def send_async(self, output_name, data):
+        """Send data to specify output component without blocking the event loop.
+
+        The blocking Dapr call runs in the loop's default executor, which is the
+        bounded function thread pool when serving in ASGI mode.
+        Args:
+            data: Bytes or str to send.
+            output_name: A string of designated output name. Only send this output if designated.
+        Returns:
+            Response from dapr.
+        """
+        import asyncio
+
+        send = contextvars.copy_context().run
+        return await asyncio.get_running_loop().run_in_executor(
+            None, send, self.send, output_name, data
+        )
+
+    def __get_state_store(self, state_name):
+        states = self.runtime_context.get_states() if self.runtime_context else []
+
+        if not states:
+            raise Exception("No states found.")
+
+        if state_name not in states:
+            raise Exception("No state named {} found.".format(state_name))
+
+        return states[state_name]
+
+    def __get_state_cache(self):
+        return self.runtime_context.state_cache if self.runtime_context else None
+
+    def __state_span(self, operation, state_name, store):
+        return tracer.start_span(
+            "state {} {}".format(operation, state_name),
+            _tracing.CLIENT,
+            attributes={"dapr.component": store.component_name},
+        )
+
+    def get_state_entry(self, state_name, key):
+        """Get a state with the ETag it was stored with.
+
+        Served from the state cache when enabled and the key was read recently.
+        Args:
+            state_name: A string of designated state store name.
+            key: The key of the state.
+        Returns:
+            A StateEntry with the data and etag of the key, data is empty for
+            a missing key.
+        """
+        store = self.__get_state_store(state_name)
+        cache = self.__get_state_cache()
+        if cache is not None:
+            entry = cache.get(state_name, key)
+            metrics.state_cache(state_name, entry is not None, entry is None)
+            if entry is not None:
+                return entry
+
+        pool = self.__get_dapr_client_pool()
+        with self.__state_span("get", state_name, store), pool.client() as client:
+            resp = client.get_state(
+                store.component_name, key, state_metadata=dict(store.metadata or {})
             )
-        elif target.component_type.startswith(constants.DAPR_PUBSUB_TYPE):
-            data = json.dumps(data)
-            resp = self.dapr_client.publish_event(
-                target.component_name,
-                target.topic,
-                data,
-                data_content_type=constants.DEFAULT_DATA_CONTENT_TYPE,
-                publish_metadata=target.metadata,
+        entry = StateEntry(key, resp.data, resp.etag or None)
+        if cache is not None:
+            cache.put(state_name, entry)
+        return entry
+
+    def get_state(self, state_name, key):
+        """Get the data of a state, see get_state_entry()."""
+        return self.get_state_entry(state_name, key).data
+
+    def get_bulk_state(self, state_name, keys, parallelism=1):
+        """Get several states, with one request for the keys not in the cache.
+        Args:
+            state_name: A string of designated state store name.
+            keys: A list of keys.
+            parallelism: The number of parallel reads done by the sidecar.
+        Returns:
+            A dict mapping each key to its StateEntry.
+        """
+        store = self.__get_state_store(state_name)
+        cache = self.__get_state_cache()
+        entries, missing = {}, []
+        for key in keys:
+            entry = cache.get(state_name, key) if cache is not None else None
+            if entry is None:
+                missing.append(key)
+            else:
+                entries[key] = entry
+        if cache is not None:
+            metrics.state_cache(state_name, len(entries), len(missing))
+
+        if missing:
+            pool = self.__get_dapr_client_pool()
+            with self.__state_span("get", state_name, store), pool.client() as client:
+                resp = client.get_bulk_state(
+                    store.component_name,
+                    missing,
+                    parallelism,
+                    states_metadata=dict(store.metadata or {}),
+                )
+            for item in resp.items:
+                if item.error:
+                    raise Exception(
+                        "Failed to get state {} from {}: {}".format(
+                            item.key, state_name, item.error
+                        )
+                    )
+                entry = StateEntry(item.key, item.data, item.etag or None)
+                entries[item.key] = entry
+                if cache is not None:
+                    cache.put(state_name, entry)
+
+        return {key: entries[key] for key in keys if key in entries}
+
+    def save_state(self, state_name, key, value, etag=None):
+        """Save a state.
+
+        With an etag the state is only saved if it was not changed since it
+        was read with that etag. The key is dropped from the state cache
+        whatever the outcome, so that a failed write is retried with fresh data.
+        Args:
+            state_name: A string of designated state store name.
+            key: The key of the state.
+            value: Bytes or str to save.
+            etag: The etag of the entry the value was derived from.
+        """
+        store = self.__get_state_store(state_name)
+        pool = self.__get_dapr_client_pool()
+        try:
+            with self.__state_span("save", state_name, store), pool.client() as client:
+                client.save_state(
+                    store.component_name,
+                    key,
+                    value,
+                    etag=etag,
+                    state_metadata=dict(store.metadata or {}),
+                )
+        finally:
+            self.__invalidate_states(state_name, [key])
+
+    def save_bulk_state(self, state_name, states):
+        """Save several states with one request.
+        Args:
+            state_name: A string of designated state store name.
+            states: A dict mapping keys to bytes or str values, or a list of
+                StateEntry to save values along with their etag.
+        """
+        from dapr.clients.grpc._state import StateItem
+
+        store = self.__get_state_store(state_name)
+        if isinstance(states, dict):
+            states = [StateEntry(key, data) for key, data in states.items()]
+        metadata = dict(store.metadata or {})
+        items = [
+            StateItem(entry.key, entry.data, entry.etag, metadata=metadata)
+            for entry in states
+        ]
+        pool = self.__get_dapr_client_pool()
+        try:
+            with self.__state_span("save", state_name, store), pool.client() as client:
+                client.save_bulk_state(store.component_name, items)
+        finally:
+            self.__invalidate_states(state_name, [item.key for item in items])
+
+    def delete_state(self, state_name, key, etag=None):
+        """Delete a state, only if unchanged since read with etag if given."""
+        store = self.__get_state_store(state_name)
+        pool = self.__get_dapr_client_pool()
+        try:
+            span = self.__state_span("delete", state_name, store)
+            with span, pool.client() as client:
+                client.delete_state(
+                    store.component_name,
+                    key,
+                    etag=etag,
+                    state_metadata=dict(store.metadata or {}),
+                )
+        finally:
+            self.__invalidate_states(state_name, [key])
+
+    def __invalidate_states(self, state_name, keys):
+        cache = self.__get_state_cache()
+        if cache is not None:
+            for key in keys:
+                cache.invalidate(state_name, key)
+
+
+def _event_payload(event):
+    return Payload(event.Data(), event.ContentType())
+
+
+def wrap_prefetch_inputs(function):
+    """Wrap function to prefetch the declared inputs before each invocation."""
+    if inspect.iscoroutinefunction(function):
+        import asyncio
+
+        @functools.wraps(function)
+        async def async_invoke(context):
+            # The fetches block, they run in the function thread pool
+            prefetch = contextvars.copy_context().run
+            await asyncio.get_running_loop().run_in_executor(
+                None, prefetch, context.prefetch_inputs
             )
+            return await function(context)
 
-        return resp
+        return async_invoke
+
+    @functools.wraps(function)
+    def invoke(context):
+        context.prefetch_inputs()
+        return function(context)
+
+    return invoke
@@ -39,6 +39,10 @@ class InvalidFunctionSignatureException(FunctionsFrameworkException):
     pass
 
 
+class MissingDependencyException(FunctionsFrameworkException):
+    pass
+
+
 def exception_handler(func):
     def wrapper(*args, **kwargs):
         try:
@@ -11,40 +11,381 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import atexit
+import contextvars
+import copy
+import io
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+from functions_framework import constants
+from functions_framework._tracing import tracer
+
+FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Hand records over to the pipeline's writer thread, dropping them when full."""
+
+    def __init__(self, pipeline):
+        logging.handlers.QueueHandler.__init__(self, pipeline.queue)
+        self.pipeline = pipeline
+
+    def emit(self, record):
+        self.pipeline.emit(self, record)
+
+    def prepare(self, record):
+        # Only the message is merged here, so that arguments changed after the
+        # call are not seen. Formatting is left to the writer thread.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.pipeline.dropped += 1
+
+
+class _Listener(logging.handlers.QueueListener):
+    def __init__(self, pipeline):
+        logging.handlers.QueueListener.__init__(
+            self, pipeline.queue, *pipeline.outputs, respect_handler_level=True
+        )
+        self.pipeline = pipeline
+
+    def enqueue_sentinel(self):
+        # Waits for room in a full queue rather than failing
+        self.queue.put(self._sentinel)
+
+    def handle(self, record):
+        logging.handlers.QueueListener.handle(self, record)
+        dropped, self.pipeline.dropped = self.pipeline.dropped, 0
+        if dropped:
+            logging.handlers.QueueListener.handle(
+                self,
+                logging.makeLogRecord(
+                    {
+                        "name": __name__,
+                        "levelno": logging.WARNING,
+                        "levelname": "WARNING",
+                        "msg": "Dropped %d log records, the log queue was full",
+                        "args": (dropped,),
+                    }
+                ),
+            )
+
+
+class LogPipeline(object):
+    """Process-wide logging pipeline with a single background writer.
+
+    Loggers only put records on a bounded queue, formatting and writing them
+    to the console and the optional log file happen in the writer thread.
+    Records logged while the queue is full are dropped and counted. After a
+    fork the writer is restarted in the child, and after shutdown() records
+    are written synchronously.
+    """
+
+    def __init__(self):
+        self.queue_size = constants.DEFAULT_LOG_QUEUE_SIZE
+        self.queue = queue.Queue(self.queue_size)
+        self.outputs = []
+        self.settings = None
+        self.dropped = 0
+        self.handler = _QueueHandler(self)
+        self._lock = threading.Lock()
+        self._listener = None
+        self._pid = None
+        self._closed = False
+
+    def configure(
+        self,
+        log_file=None,
+        log_format=constants.LOG_FORMAT_TEXT,
+        queue_size=constants.DEFAULT_LOG_QUEUE_SIZE,
+        max_bytes=constants.DEFAULT_LOG_FILE_MAX_BYTES,
+        backup_count=constants.DEFAULT_LOG_FILE_BACKUP_COUNT,
+        stream=None,
+    ):
+        """Set the outputs of the pipeline, a no-op if they did not change.
+
+        Args:
+            log_file: A file to also write to, rotated once it reaches
+                max_bytes with backup_count rotated files kept.
+            log_format: "text" or "json".
+            queue_size: The number of records queued at most.
+            stream: The console stream, stderr by default.
+        """
+        settings = (log_file, log_format, queue_size, max_bytes, backup_count, stream)
+        if settings == self.settings:
+            return
+        with self._lock:
+            self._configure(*settings)
+
+    def _configure(
+        self, log_file, log_format, queue_size, max_bytes, backup_count, stream
+    ):
+        # The writer is started again by the next record
+        self._stop()
+        formatter = (
+            JSONFormatter()
+            if log_format == constants.LOG_FORMAT_JSON
+            else logging.Formatter(FORMAT)
+        )
+        outputs = [logging.StreamHandler(stream)]
+        if log_file:
+            outputs.append(
+                logging.handlers.RotatingFileHandler(
+                    log_file, maxBytes=max_bytes, backupCount=backup_count
+                )
+            )
+        for output in outputs:
+            output.setFormatter(formatter)
+        for output in self.outputs:
+            output.close()
+        self.outputs = outputs
+        self.queue_size = queue_size
+        self.queue = self.handler.queue = queue.Queue(queue_size)
+        self.settings = (
+            log_file,
+            log_format,
+            queue_size,
+            max_bytes,
+            backup_count,
+            stream,
+        )
+
+    def _start(self):
+        if self.settings is None:
+            self._configure(
+                None,
+                constants.LOG_FORMAT_TEXT,
+                self.queue_size,
+                constants.DEFAULT_LOG_FILE_MAX_BYTES,
+                constants.DEFAULT_LOG_FILE_BACKUP_COUNT,
+                None,
+            )
+        if self._pid is None:
+            atexit.register(self.shutdown)
+        elif self._pid != os.getpid():
+            # Forked, the writer thread of the parent process is gone
+            self.queue = self.handler.queue = queue.Queue(self.queue_size)
+        self._listener = _Listener(self)
+        self._listener.start()
+        self._pid = os.getpid()
+
+    def _stop(self):
+        if self._listener is not None and self._pid == os.getpid():
+            # Writes the records still queued
+            self._listener.stop()
+        self._listener = None
+
+    def emit(self, handler, record):
+        if self._closed:
+            # Shut down, write in the calling thread
+            for output in self.outputs:
+                if record.levelno >= output.level:
+                    output.handle(record)
+            return
+        if self._listener is None or self._pid != os.getpid():
+            with self._lock:
+                if self._listener is None or self._pid != os.getpid():
+                    self._start()
+        logging.handlers.QueueHandler.emit(handler, record)
+
+    def flush(self):
+        """Wait for the queued records to be written."""
+        with self._lock:
+            if self._listener is not None and self._pid == os.getpid():
+                self._listener.stop()
+                self._start()
+
+    def shutdown(self):
+        """Write the queued records and stop the writer thread."""
+        with self._lock:
+            self._stop()
+            self._closed = True
+        for output in self.outputs:
+            output.flush()
+
+
+pipeline = LogPipeline()
+
+
+def configure(**kwargs):
+    """Configure the outputs of the logging pipeline, see LogPipeline.configure."""
+    pipeline.configure(**kwargs)
 
 
 def initialize_logger(name=None, level=logging.DEBUG):
+    """Get a logger writing through the logging pipeline.
+
+    Calling it again for the same logger only updates its level.
+    """
     if not name:
         name = __name__
     _logger = logging.getLogger(name)
-
-    # set logger level
     _logger.setLevel(level)
+    if pipeline.handler not in _logger.handlers:
+        _logger.addHandler(pipeline.handler)
+    return _logger
 
-    # create file handler
-    file_handler = logging.FileHandler("function.log")
-    file_handler.setLevel(level)
 
-    # create console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(level)
+class _LoggingHandler(io.TextIOWrapper):
+    """Logging replacement for stdout and stderr in GCF Python 3.7.
 
-    # create formatter
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
+    Each line is written to stderr as a JSON entry with the severity and, when
+    known, the execution and trace IDs of the invocation. Entries below ERROR
+    are buffered and written at once when buffer_size characters are waiting,
+    by a background thread at most flush_interval seconds after they were
+    buffered, on flush(), at the end of each invocation and at exit.
+    """
 
-    # add formatter to handlers
-    file_handler.setFormatter(formatter)
-    console_handler.setFormatter(formatter)
+    def __init__(
+        self,
+        level,
+        stderr=sys.stderr,
+        buffer_size=constants.DEFAULT_LOG_BUFFER_SIZE,
+        flush_interval=constants.DEFAULT_LOG_FLUSH_INTERVAL,
+    ):
+        io.TextIOWrapper.__init__(self, io.StringIO(), encoding=stderr.encoding)
+        self.level = level
+        self.stderr = stderr
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._prefix = '{"severity": %s, "message": ' % _encode_string(level)
+        self._lock = threading.Lock()
+        self._buffered = logging.getLevelName(level) < logging.ERROR
+        self._wakeup = threading.Condition(self._lock)
+        self._partial = ""
+        self._entries = []
+        self._size = 0
+        self._oldest = 0.0
+        self._flusher_pid = None
 
-    # add handlers to logger
-    _logger.addHandler(file_handler)
-    _logger.addHandler(console_handler)
+    def _encode(self, line):
+        entry = self._prefix + _encode_string(line)
+        execution_id = _execution_id.get()
+        if execution_id is not None:
+            entry += ', "execution_id": ' + _encode_string(execution_id)
+        span = tracer.current_span_context()
+        if span is not None:
+            entry += ', "trace_id": "%032x", "span_id": "%016x"' % (
+                span.trace_id,
+                span.span_id,
+            )
+        return entry + "}\n"
 
-    return _logger
+    def write(self, out):
+        with self._lock:
+            lines = (self._partial + out).split("\n")
+            self._partial = lines.pop()
+            if not lines:
+                return len(out)
+            if not self._entries:
+                self._oldest = time.monotonic()
+                self._wakeup.notify()
+            for line in lines:
+                entry = self._encode(line)
+                self._entries.append(entry)
+                self._size += len(entry)
+            if not self._buffered or self._size >= self.buffer_size:
+                self._write()
+            elif self._flusher_pid != os.getpid():
+                self._start_flusher()
+        return len(out)
+
+    def _start_flusher(self):
+        # Started again in a forked worker, threads do not survive fork
+        self._flusher_pid = os.getpid()
+        threading.Thread(
+            target=self._flush_periodically, name="log-flusher", daemon=True
+        ).start()
+
+    def _flush_periodically(self):
+        with self._lock:
+            while not self.closed:
+                if not self._entries:
+                    self._wakeup.wait()
+                    continue
+                due = self._oldest + self.flush_interval - time.monotonic()
+                if due > 0:
+                    self._wakeup.wait(due)
+                else:
+                    self._write()
+
+    def _write(self):
+        entries, self._entries, self._size = self._entries, [], 0
+        if entries:
+            self.stderr.write("".join(entries))
+            self.stderr.flush()
+
+    def flush(self):
+        if hasattr(self, "_lock"):
+            with self._lock:
+                self._write()
+
+    def drain(self):
+        """Write the buffered entries, and the unterminated line if any."""
+        with self._lock:
+            if self._partial:
+                self._entries.append(self._encode(self._partial))
+                self._partial = ""
+            self._write()
+
+    def close(self):
+        if hasattr(self, "_lock") and not self.closed:
+            self.drain()
+        io.TextIOWrapper.close(self)
+        if hasattr(self, "_lock"):
+            with self._lock:
+                self._wakeup.notify()
+
+
+_encode_string = json.encoder.encode_basestring_ascii
+_execution_id = contextvars.ContextVar("functions_framework_execution_id", default=None)
+
+
+def _drain_logging_handlers():
+    for stream in (sys.stdout, sys.stderr):
+        if isinstance(stream, _LoggingHandler):
+            stream.drain()
+
+
+_logger = None
 
 
-# initialize logger
-logger = initialize_logger(__name__, logging.INFO)
+def __getattr__(name):
+    # The module logger is created on first use rather than at import time,
+    # so that importing the framework does not start the writer thread.
+    global _logger
+    if name == "logger":
+        if _logger is None:
+            _logger = initialize_logger(__name__, logging.INFO)
+        return _logger
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -0,0 +1,176 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+
+from functions_framework.exceptions import MissingDependencyException
+
+JSON = "application/json"
+
+_decoder = None
+_encoder = None
+
+
+def _orjson():
+    try:
+        import orjson
+    except ImportError as e:
+        raise MissingDependencyException(
+            "orjson is not installed, install it with "
+            "pip install ofn-functions-framework[orjson]: {}".format(e)
+        ) from e
+    return orjson
+
+
+def set_json_decoder(decoder):
+    """Use decoder(bytes) to parse JSON bodies and payloads, None for the default.
+
+    The default is the json module, see use_orjson().
+    """
+    global _decoder
+    _decoder = decoder
+
+
+def loads(data):
+    """Parse JSON from bytes or str with the configured decoder."""
+    return (_decoder or json.loads)(data)
+
+
+def loads_or_data(data):
+    """Parse JSON data, or return the data as is if it is not JSON."""
+    try:
+        return loads(data)
+    except ValueError:
+        return data
+
+
+def _json_encode(obj, default=None):
+    # The settings of Flask's default JSON provider
+    return json.dumps(
+        obj, default=default, sort_keys=True, separators=(",", ":")
+    ).encode()
+
+
+def orjson_encoder():
+    """Return an encoder(obj, default) -> bytes serializing with orjson.
+
+    Keys are sorted and datetimes are passed to default, like the json module
+    does. The values orjson rejects, like integers over 64 bits, are
+    serialized with the json module instead.
+    """
+    orjson = _orjson()
+    option = (
+        orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    )
+
+    def encode(obj, default=None):
+        try:
+            # Serialized straight to bytes, without an intermediate str
+            return orjson.dumps(obj, default=default, option=option)
+        except TypeError:
+            # orjson.JSONEncodeError is a TypeError
+            return _json_encode(obj, default)
+
+    return encode
+
+
+def set_json_encoder(encoder):
+    """Use encoder(obj, default) -> bytes to serialize JSON, None for the default.
+
+    default is called with the objects the encoder does not know, like json's
+    default. Dict and list responses are serialized by Flask's JSON provider
+    unless an encoder is set.
+    """
+    global _encoder
+    _encoder = encoder
+
+
+def json_encoder():
+    """The encoder set with set_json_encoder(), None if unset."""
+    return _encoder
+
+
+def use_orjson():
+    """Parse and serialize JSON with orjson, installed with the orjson extra.
+
+    Unlike the json module, orjson parses integers over 64 bits as floats.
+    """
+    set_json_decoder(_orjson().loads)
+    set_json_encoder(orjson_encoder())
+
+
+def dumps(obj, default=None) -> bytes:
+    """Serialize obj to JSON bytes with the configured encoder."""
+    return (_encoder or _json_encode)(obj, default)
+
+
+ENCODERS = {JSON: lambda obj, default=None: dumps(obj, default)}
+
+
+def register_encoder(mimetype, encoder):
+    """Serialize dict and list responses with encoder(obj, default) -> bytes
+    when the client accepts mimetype better than the other encoders."""
+    ENCODERS[mimetype] = encoder
+
+
+def _parse_accept(accept):
+    for i, item in enumerate(accept.split(",")):
+        mimetype, _, params = item.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        # More specific types win at equal quality, then the first listed
+        yield q, mimetype.strip().count("*") * -1, -i, mimetype.strip().lower()
+
+
+def negotiate(accept):
+    """The mimetype of ENCODERS the Accept header prefers, JSON by default."""
+    if not accept:
+        return JSON
+    for q, _, _, mimetype in sorted(_parse_accept(accept), reverse=True):
+        if q <= 0:
+            break
+        if mimetype in ENCODERS:
+            return mimetype
+        major = mimetype.partition("/")[0]
+        if mimetype == "*/*" or mimetype.endswith("/*"):
+            if major == "*" or major == "application":
+                return JSON
+            for candidate in ENCODERS:
+                if candidate.startswith(major + "/"):
+                    return candidate
+    # Nothing acceptable, JSON is still better than an error
+    return JSON
+
+
+def encode(data, accept=None, default=None):
+    """Encode response data to (bytes, content type).
+
+    Bytes are sent as is, str as UTF-8 text, other data with the encoder
+    negotiated from the Accept header, None for no preference.
+    """
+    if data is None:
+        return b"", None
+    if isinstance(data, bytes):
+        return data, "application/octet-stream"
+    if isinstance(data, (bytearray, memoryview)):
+        return bytes(data), "application/octet-stream"
+    if isinstance(data, str):
+        return data.encode(), "text/plain; charset=utf-8"
+    mimetype = negotiate(accept)
+    return ENCODERS[mimetype](data, default), mimetype
@@ -11,7 +11,17 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from functions_framework.openfunction import codec
+from functions_framework.openfunction.streaming import StreamingBody, is_stream
+
+
 class FunctionOut:
+    """The output of an invocation: a status code, an error, data and metadata.
+
+    Returned by the function, or set on UserContext.out by a function which
+    returns None, it is turned into the response of every kind of trigger.
+    """
+
     def __init__(self, code: int, error, data, metadata):
         self.__code = code
         self.__error = error
@@ -47,3 +57,45 @@ class FunctionOut:
 
     def get_metadata(self):
         return self.__metadata
+
+    def is_empty(self) -> bool:
+        """Whether nothing was set since the FunctionOut was created empty."""
+        return not (
+            self.__code
+            or self.__error is not None
+            or self.__data not in (None, "")
+            or self.__metadata
+        )
+
+    def is_success(self) -> bool:
+        """No error, and no code or a 2xx code."""
+        return self.__error is None and (not self.__code or 200 <= self.__code < 300)
+
+    def get_status(self) -> int:
+        """The code, or 200 or 500 depending on the error if no code was set."""
+        if self.__code:
+            return self.__code
+        return 500 if self.__error is not None else 200
+
+    def to_http_response(self, accept=None, default=None):
+        """Build the HTTP response of the output.
+
+        The metadata are the response headers. Dict and list data is
+        serialized with the encoder negotiated from accept unless the
+        metadata set a Content-Type.
+        Returns:
+            A (body, status, headers) tuple, or a StreamingBody for streamed data.
+        """
+        status = self.get_status()
+        headers = {str(k): str(v) for k, v in (self.__metadata or {}).items()}
+        data = self.__data
+        if data in (None, "") and self.__error is not None:
+            data = str(self.__error)
+        if is_stream(data):
+            content_type = headers.pop("Content-Type", None)
+            return StreamingBody(data, content_type, status, headers)
+
+        body, content_type = codec.encode(data, accept, default)
+        if content_type and not any(k.lower() == "content-type" for k in headers):
+            headers["Content-Type"] = content_type
+        return body, status, headers
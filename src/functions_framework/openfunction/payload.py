@@ -0,0 +1,70 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from functions_framework.openfunction import codec
+
+_UNSET = object()
+
+
+class Payload(object):
+    """Read-only view of the data of a binding request or topic event.
+
+    The data is not copied, and is decoded lazily: text and json() decode it
+    on first use and cache the result for the invocation.
+    """
+
+    __slots__ = ("_data", "content_type", "_text", "_json")
+
+    def __init__(self, data, content_type=None):
+        if data is None:
+            data = b""
+        elif isinstance(data, str):
+            data = data.encode()
+        self._data = data
+        self.content_type = content_type
+        self._text = None
+        self._json = _UNSET
+
+    @property
+    def view(self) -> memoryview:
+        """A read-only memoryview of the data."""
+        return memoryview(self._data).toreadonly()
+
+    def tobytes(self) -> bytes:
+        """The data as bytes, only copied if not bytes already."""
+        if isinstance(self._data, bytes):
+            return self._data
+        return bytes(self._data)
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = str(self._data, "utf-8")
+        return self._text
+
+    def json(self):
+        """The data parsed as JSON, parsed once and shared by every call."""
+        if self._json is _UNSET:
+            self._json = codec.loads(self._data)
+        return self._json
+
+    def __bytes__(self):
+        return self.tobytes()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return "Payload({} bytes, content_type={!r})".format(
+            len(self._data), self.content_type
+        )
@@ -0,0 +1,167 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import functools
+import importlib
+import inspect
+import logging
+import time
+
+from functions_framework.exceptions import InvalidConfigurationException
+
+PLUGINS = {}
+
+
+def register_plugin(cls):
+    """Class decorator making a plugin available under its name in FUNC_CONTEXT."""
+    PLUGINS[cls.name] = cls
+    return cls
+
+
+class Plugin(object):
+    """Base class of the plugins run by pre_hooks and post_hooks.
+
+    A plugin is instantiated once at startup and shared by every invocation,
+    concurrently when the function is served by several threads. Hooks a
+    plugin does not override are not called at all.
+    """
+
+    name = ""
+
+    def pre_hook(self, context):
+        """Called before the function, the return value is given to post_hook."""
+        return None
+
+    def post_hook(self, context, state, error):
+        """Called after the function.
+
+        Args:
+            context: The UserContext of the invocation.
+            state: What pre_hook returned, None if not listed in pre_hooks.
+            error: The exception raised by the function, or None.
+        """
+        pass
+
+
+@register_plugin
+class TimingPlugin(Plugin):
+    """Log how long each invocation of the function takes."""
+
+    name = "timing"
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+
+    def pre_hook(self, context):
+        return time.perf_counter()
+
+    def post_hook(self, context, state, error):
+        if state is None:
+            return
+        logger = getattr(context, "logger", None) or self.logger
+        logger.info(
+            "Function %s in %.3fms",
+            "failed" if error else "completed",
+            (time.perf_counter() - state) * 1000,
+        )
+
+
+def _overrides(plugin, hook):
+    method = getattr(type(plugin), hook, None)
+    return method is not None and method is not getattr(Plugin, hook)
+
+
+def load_plugin(name):
+    """Resolve a plugin by registered name, or import it from "module:attr"."""
+    if name in PLUGINS:
+        return PLUGINS[name]()
+    if ":" not in name:
+        raise InvalidConfigurationException(
+            "Unknown plugin {}, expected one of {} or module:attribute".format(
+                name, ", ".join(sorted(PLUGINS))
+            )
+        )
+    module_name, _, attr = name.partition(":")
+    try:
+        plugin = getattr(importlib.import_module(module_name), attr)
+    except (ImportError, AttributeError) as e:
+        raise InvalidConfigurationException(
+            "Failed to load plugin {}: {}".format(name, e)
+        )
+    return plugin() if inspect.isclass(plugin) else plugin
+
+
+class HookPipeline(object):
+    """The pre and post hooks run around every invocation of the function.
+
+    Plugins are resolved once, a plugin listed in both pre_hooks and
+    post_hooks is a single instance. Hooks run in the order they are listed.
+    """
+
+    def __init__(self, pre_hooks=(), post_hooks=()):
+        plugins = {}
+        for name in list(pre_hooks or ()) + list(post_hooks or ()):
+            if name not in plugins:
+                plugins[name] = load_plugin(name)
+        self.plugins = plugins
+
+        pre_names = [n for n in pre_hooks or () if _overrides(plugins[n], "pre_hook")]
+        self._pre = tuple(plugins[n].pre_hook for n in pre_names)
+        # Each post hook gets the state returned by its plugin's pre hook
+        self._post = tuple(
+            (plugins[n].post_hook, pre_names.index(n) if n in pre_names else None)
+            for n in post_hooks or ()
+            if _overrides(plugins[n], "post_hook")
+        )
+
+    def __bool__(self):
+        return bool(self._pre or self._post)
+
+    def _run_post(self, context, states, error):
+        for hook, index in self._post:
+            hook(context, None if index is None else states[index], error)
+
+    def wrap(self, function):
+        """Return function with the hooks around it, function itself without hooks."""
+        if not self:
+            return function
+
+        pre, run_post = self._pre, self._run_post
+
+        if inspect.iscoroutinefunction(function):
+
+            @functools.wraps(function)
+            async def async_invoke(context):
+                states = [hook(context) for hook in pre]
+                try:
+                    rv = await function(context)
+                except Exception as e:
+                    run_post(context, states, e)
+                    raise
+                run_post(context, states, None)
+                return rv
+
+            return async_invoke
+
+        @functools.wraps(function)
+        def invoke(context):
+            states = [hook(context) for hook in pre]
+            try:
+                rv = function(context)
+            except Exception as e:
+                run_post(context, states, e)
+                raise
+            run_post(context, states, None)
+            return rv
+
+        return invoke
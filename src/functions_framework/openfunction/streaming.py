@@ -0,0 +1,115 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import inspect
+import json
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # Keep reverse proxies such as nginx from buffering the events
+    "X-Accel-Buffering": "no",
+}
+
+
+class StreamingBody(object):
+    """A response whose body is sent chunk by chunk as chunks are produced.
+
+    Only the chunk being sent is held in memory. chunks is an iterable or an
+    async iterable of bytes or str.
+    """
+
+    def __init__(self, chunks, content_type=None, status=200, headers=None):
+        self.chunks = chunks
+        self.content_type = content_type
+        self.status = status
+        self.headers = dict(headers or {})
+
+    @property
+    def is_async(self):
+        return is_async_iterable(self.chunks)
+
+
+class ServerSentEvent(object):
+    """An event of a text/event-stream response."""
+
+    __slots__ = ("data", "event", "id", "retry")
+
+    def __init__(self, data=None, event=None, id=None, retry=None):
+        self.data = data
+        self.event = event
+        self.id = id
+        self.retry = retry
+
+    def encode(self) -> bytes:
+        lines = []
+        if self.event is not None:
+            lines.append("event: {}".format(self.event))
+        if self.id is not None:
+            lines.append("id: {}".format(self.id))
+        if self.retry is not None:
+            lines.append("retry: {}".format(int(self.retry)))
+        data = self.data
+        if data is not None:
+            if isinstance(data, bytes):
+                data = data.decode()
+            elif not isinstance(data, str):
+                data = json.dumps(data)
+            lines.extend("data: " + line for line in data.splitlines() or [""])
+        return ("\n".join(lines) + "\n\n").encode()
+
+
+def is_async_iterable(value):
+    return hasattr(value, "__aiter__")
+
+
+def is_stream(rv):
+    """Whether a function's return value is a body to stream."""
+    return (
+        isinstance(rv, StreamingBody)
+        or inspect.isgenerator(rv)
+        or inspect.isasyncgen(rv)
+    )
+
+
+def encode_event(event) -> bytes:
+    if not isinstance(event, ServerSentEvent):
+        event = ServerSentEvent(event)
+    return event.encode()
+
+
+def sse_chunks(events):
+    """Encode an iterable or async iterable of events as text/event-stream."""
+    if is_async_iterable(events):
+
+        async def encode_async():
+            async for event in events:
+                yield encode_event(event)
+
+        return encode_async()
+    return (encode_event(event) for event in events)
+
+
+def iterate_async(chunks):
+    """Iterate an async iterable from synchronous code, on an event loop of its own."""
+    iterator = chunks.__aiter__()
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(iterator.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
@@ -11,17 +11,22 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import atexit
 import logging
-import os
 
-from dapr.ext.grpc import App
-
-from functions_framework import _function_registry, log
+from functions_framework import _function_registry, constants, log
+from functions_framework._metrics import MetricsServer, metrics
+from functions_framework._startup import timeline
+from functions_framework._tracing import tracer
+from functions_framework.clients.dapr_client_pool import DaprClientPool
+from functions_framework.clients.input_cache import InputCache
+from functions_framework.clients.output_dispatcher import OutputDispatcher
+from functions_framework.clients.state_cache import StateCache
 from functions_framework.context.function_context import FunctionContext
 from functions_framework.context.runtime_context import RuntimeContext
-from functions_framework.exceptions import MissingSourceException
-from functions_framework.triggers.dapr_trigger.dapr import DaprTriggerHandler
-from functions_framework.triggers.http_trigger.http import HTTPTriggerHandler
+from functions_framework.context.user_context import wrap_prefetch_inputs
+from functions_framework.openfunction.plugin import HookPipeline
+from functions_framework.triggers.supervisor import TriggerSupervisor
 
 
 class Runner:
@@ -34,62 +39,181 @@ class Runner:
         port=None,
         debug=None,
         dry_run=None,
+        dapr_client_pool_size=constants.DEFAULT_DAPR_CLIENT_POOL_SIZE,
+        dapr_client_idle_timeout=constants.DEFAULT_DAPR_CLIENT_IDLE_TIMEOUT,
+        http_mode=None,
+        http_server_options=None,
+        output_workers=constants.DEFAULT_OUTPUT_WORKERS,
+        output_queue_size=constants.DEFAULT_OUTPUT_QUEUE_SIZE,
+        enable_metrics=False,
+        metrics_path=constants.DEFAULT_METRICS_PATH,
+        metrics_port=None,
+        state_cache_size=constants.DEFAULT_STATE_CACHE_SIZE,
+        state_cache_ttl=constants.DEFAULT_STATE_CACHE_TTL,
+        prefetch_inputs=False,
+        dapr_workers=constants.DEFAULT_DAPR_WORKERS,
+        dapr_max_in_flight=constants.DEFAULT_DAPR_MAX_IN_FLIGHT,
+        log_file=None,
+        log_format=constants.LOG_FORMAT_TEXT,
+        log_queue_size=constants.DEFAULT_LOG_QUEUE_SIZE,
     ):
         self.target = target
         self.source = source
         self.context = context
         self.user_function = None
+        self.http_app = None
         self.request = None
         self.host = host
         self.port = port
         self.debug = debug
         self.dry_run = dry_run
+        self.http_mode = http_mode
+        self.http_server_options = http_server_options
+        self.enable_metrics = enable_metrics
+        self.metrics_path = metrics_path
+        self.metrics_port = metrics_port
+        self.prefetch_inputs = prefetch_inputs
+        self.dapr_workers = dapr_workers
+        self.dapr_max_in_flight = dapr_max_in_flight
+        self.log_file = log_file
+        self.log_format = log_format
+        self.log_queue_size = log_queue_size
         self.logger = None
+        self.dapr_client_pool = DaprClientPool(
+            dapr_client_pool_size, dapr_client_idle_timeout
+        )
+        self.output_dispatcher = OutputDispatcher(output_workers, output_queue_size)
+        self.state_cache = None
+        if state_cache_size:
+            self.state_cache = StateCache(state_cache_size, state_cache_ttl)
+        self.input_cache = None
+        inputs = context.inputs if context and context.inputs else {}
+        if any(i.ttl for i in inputs.values()):
+            self.input_cache = InputCache()
+        # atexit runs in reverse order: drain queued sends, close the clients,
+        # then export the remaining spans
+        atexit.register(tracer.shutdown)
+        atexit.register(self.dapr_client_pool.close)
+        atexit.register(self.output_dispatcher.close)
         self.load_user_function()
         self.init_logger()
+        self.init_tracing()
+        self.init_inputs()
+        self.init_hooks()
 
     def load_user_function(self):
-        _target = _function_registry.get_function_target(self.target)
-        _source = _function_registry.get_function_source(self.source)
-
-        if not os.path.exists(_source):
-            raise MissingSourceException(
-                "File {source} that is expected to define function doesn't exist".format(
-                    source=_source
+        trigger = self.context.http_trigger if self.context else None
+        mode = self.http_mode or (trigger.mode if trigger else None)
+        if not trigger or mode == constants.HTTP_MODE_ASGI:
+            with timeline.phase("user_module_import"):
+                self.user_function = _function_registry.load_user_function(
+                    self.source, self.target
                 )
+            return
+
+        # The module may register Flask error handlers or use current_app at
+        # import time, load it within the app which will serve it
+        from functions_framework.triggers.http_trigger import new_app
+
+        with timeline.phase("http_app_creation"):
+            self.http_app = new_app(self.target, self.source)
+        with timeline.phase("user_module_import"), self.http_app.app_context():
+            self.user_function = _function_registry.load_user_function(
+                self.source, self.target
             )
 
-        source_module, spec = _function_registry.load_function_module(_source)
-        spec.loader.exec_module(source_module)
+    def init_tracing(self):
+        context = self.context or FunctionContext()
+        tracer.configure(context.tracing, context.name)
+        self.user_function = tracer.instrument(self.user_function)
 
-        self.user_function = _function_registry.get_user_function(
-            _source, source_module, _target
-        )
+    def init_inputs(self):
+        if self.prefetch_inputs and self.context and self.context.inputs:
+            self.user_function = wrap_prefetch_inputs(self.user_function)
+
+    def init_hooks(self):
+        # Resolved once here, after the user module which may register plugins
+        context = self.context or FunctionContext()
+        with timeline.phase("hooks_init"):
+            pipeline = HookPipeline(context.pre_hooks, context.post_hooks)
+        self.user_function = pipeline.wrap(self.user_function)
 
     def init_logger(self):
         level = logging.INFO
         if self.debug:
             level = logging.DEBUG
+        log.configure(
+            log_file=self.log_file,
+            log_format=self.log_format,
+            queue_size=self.log_queue_size,
+        )
         self.logger = log.initialize_logger(__name__, level)
+        timeline.logger = self.logger
 
     def run(self):
-        # convert to runtime context
-        runtime_context = RuntimeContext(self.context, self.logger)
+        # convert to runtime context, frozen so that every invocation can
+        # share it instead of copying it
+        runtime_context = RuntimeContext(
+            self.context,
+            self.logger,
+            self.dapr_client_pool,
+            self.output_dispatcher,
+            self.state_cache,
+            self.input_cache,
+        ).freeze()
 
+        handlers = []
+        # Trigger handlers are imported only when configured, so that a function
+        # does not pay for importing the dependencies of triggers it lacks.
         _trigger = runtime_context.get_http_trigger()
+
+        # Metrics are served by the HTTP trigger unless given a port of their own
+        http_metrics_path = None
+        if self.enable_metrics:
+            metrics.enable()
+            if _trigger and not self.metrics_port:
+                http_metrics_path = self.metrics_path
+            else:
+                handlers.append(
+                    MetricsServer(
+                        self.metrics_port or constants.DEFAULT_METRICS_PORT,
+                        self.metrics_path,
+                    )
+                )
+
         if _trigger:
-            http_trigger = HTTPTriggerHandler(
-                self.context.port,
-                _trigger,
-                self.source,
-                self.target,
-                self.user_function,
+            from functions_framework.triggers.http_trigger.http import (
+                HTTPTriggerHandler,
+            )
+
+            handlers.append(
+                HTTPTriggerHandler(
+                    self.context.port,
+                    _trigger,
+                    self.source,
+                    self.target,
+                    self.user_function,
+                    mode=self.http_mode,
+                    server_options=self.http_server_options,
+                    metrics_path=http_metrics_path,
+                    app=self.http_app,
+                )
             )
-            http_trigger.start(runtime_context, logger=self.logger)
 
         _triggers = runtime_context.get_dapr_triggers()
         if _triggers:
-            dapr_trigger = DaprTriggerHandler(
-                self.context.port, _triggers, self.user_function
+            from functions_framework.triggers.dapr_trigger.dapr import (
+                DaprTriggerHandler,
             )
-            dapr_trigger.start(runtime_context, logger=self.logger)
+
+            handlers.append(
+                DaprTriggerHandler(
+                    self.context.port,
+                    _triggers,
+                    self.user_function,
+                    workers=self.dapr_workers,
+                    max_in_flight=self.dapr_max_in_flight,
+                )
+            )
+
+        TriggerSupervisor(runtime_context, handlers, logger=self.logger).run()
@@ -0,0 +1,375 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import collections
+import itertools
+import socket
+import threading
+import time
+import uuid
+
+from concurrent import futures
+
+import grpc
+
+from dapr.clients import DaprClient
+from dapr.proto.common.v1 import common_pb2
+from dapr.proto.runtime.v1 import (
+    appcallback_pb2,
+    appcallback_pb2_grpc,
+    dapr_pb2,
+    dapr_pb2_grpc,
+)
+from google.protobuf import empty_pb2
+
+from functions_framework import constants
+from functions_framework.clients.dapr_client_pool import DaprClientPool
+from functions_framework.context.function_context import FunctionContext
+from functions_framework.context.runtime_context import RuntimeContext
+
+BindingCall = collections.namedtuple(
+    "BindingCall", ["name", "operation", "data", "metadata"]
+)
+PublishedEvent = collections.namedtuple(
+    "PublishedEvent", ["pubsub_name", "topic", "data", "content_type", "metadata"]
+)
+
+_UPSERT = "upsert"
+_DELETE = "delete"
+
+_APP_START_TIMEOUT = 10
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class FakeDaprSidecar(dapr_pb2_grpc.DaprServicer):
+    """In-process stand-in for the Dapr sidecar of a function.
+
+    Serves the parts of the Dapr API the framework calls on a local port:
+    output bindings and publishes are recorded in ``bindings`` and
+    ``published``, states are kept in ``states`` with an ETag per write,
+    secrets and configuration items are read from ``secrets`` and
+    ``configuration``. Like the sidecar, it also delivers binding and topic
+    events to a DaprTriggerHandler over the app callback API, see serve_app().
+
+    Use it as a context manager, or call start() and stop().
+    """
+
+    def __init__(self, workers=16):
+        self.workers = workers
+        self.bindings = []
+        self.published = []
+        # (store, key): (data, etag)
+        self.states = {}
+        # (store, key): {name: value}
+        self.secrets = {}
+        # (store, key): value
+        self.configuration = {}
+        # binding name: data returned by invoke_binding
+        self.binding_responses = {}
+        self.port = None
+        self._lock = threading.Lock()
+        self._versions = itertools.count(1)
+        self._server = None
+        self._pools = []
+        self._handler = None
+        self._handler_thread = None
+        self._channel = None
+        self._app = None
+        self._app_alpha = None
+
+    @property
+    def address(self):
+        return "127.0.0.1:{}".format(self.port)
+
+    def start(self):
+        self._server = grpc.server(futures.ThreadPoolExecutor(self.workers))
+        dapr_pb2_grpc.add_DaprServicer_to_server(self, self._server)
+        self.port = self._server.add_insecure_port("127.0.0.1:0")
+        self._server.start()
+        return self
+
+    def stop(self):
+        for pool in self._pools:
+            pool.close()
+        del self._pools[:]
+        if self._channel is not None:
+            self._channel.close()
+            self._channel = None
+        if self._handler is not None:
+            self._handler.stop(0)
+            self._handler_thread.join()
+            self._handler = None
+        if self._server is not None:
+            self._server.stop(0)
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def client(self):
+        """Return a Dapr client connected to the sidecar."""
+        return DaprClient(address=self.address)
+
+    def client_pool(self, size=1):
+        """Return a DaprClientPool of clients connected to the sidecar.
+
+        The pool is closed when the sidecar is stopped.
+        """
+        pool = DaprClientPool(size=size, client_factory=self.client)
+        self._pools.append(pool)
+        return pool
+
+    def runtime_context(self, context=None, logger=None, **kwargs):
+        """Return a frozen RuntimeContext sending to the sidecar."""
+        return RuntimeContext(
+            context or FunctionContext(), logger, self.client_pool(), **kwargs
+        ).freeze()
+
+    def reset(self):
+        """Forget the recorded calls and the stored states."""
+        with self._lock:
+            del self.bindings[:]
+            del self.published[:]
+            self.states.clear()
+
+    # App callback client
+
+    def serve_app(self, handler, runtime_context=None, logger=None):
+        """Serve the triggers of a DaprTriggerHandler on a free local port.
+
+        The handler is started in a thread with start() like the function
+        runner does, events are then delivered to it with
+        send_binding_event(), publish_to_app() and publish_bulk_to_app(). It
+        is stopped with stop() along with the sidecar.
+        """
+        handler.port = _free_port()
+        self._handler = handler
+        self._handler_thread = threading.Thread(
+            target=handler.start,
+            args=(runtime_context or self.runtime_context(), logger),
+            name="dapr-app",
+            daemon=True,
+        )
+        self._handler_thread.start()
+        self._channel = grpc.insecure_channel("127.0.0.1:{}".format(handler.port))
+        ready = grpc.channel_ready_future(self._channel)
+        deadline = time.monotonic() + _APP_START_TIMEOUT
+        while True:
+            try:
+                ready.result(timeout=0.05)
+                break
+            except grpc.FutureTimeoutError:
+                if not self._handler_thread.is_alive():
+                    raise Exception("The Dapr app failed to start")
+                if time.monotonic() > deadline:
+                    raise Exception(
+                        "The Dapr app did not start in {}s".format(_APP_START_TIMEOUT)
+                    )
+        self._app = appcallback_pb2_grpc.AppCallbackStub(self._channel)
+        self._app_alpha = appcallback_pb2_grpc.AppCallbackAlphaStub(self._channel)
+        return handler.port
+
+    def list_subscriptions(self):
+        """Return the TopicSubscriptions the app registered."""
+        return list(self._app.ListTopicSubscriptions(empty_pb2.Empty()).subscriptions)
+
+    def list_input_bindings(self):
+        return list(self._app.ListInputBindings(empty_pb2.Empty()).bindings)
+
+    def send_binding_event(self, name, data=b"", metadata=None):
+        """Deliver an input binding event, returns the BindingEventResponse."""
+        return self._app.OnBindingEvent(
+            appcallback_pb2.BindingEventRequest(
+                name=name, data=data, metadata=metadata or {}
+            )
+        )
+
+    def publish_to_app(
+        self,
+        pubsub_name,
+        topic,
+        data=b"",
+        content_type=constants.DEFAULT_DATA_CONTENT_TYPE,
+        event_id=None,
+    ):
+        """Deliver a topic event, returns the TopicEventResponse."""
+        return self._app.OnTopicEvent(
+            appcallback_pb2.TopicEventRequest(
+                id=event_id or str(uuid.uuid4()),
+                source="dapr",
+                type="com.dapr.event.sent",
+                spec_version="1.0",
+                data_content_type=content_type,
+                data=data,
+                topic=topic,
+                pubsub_name=pubsub_name,
+            )
+        )
+
+    def publish_bulk_to_app(
+        self,
+        pubsub_name,
+        topic,
+        payloads,
+        content_type=constants.DEFAULT_DATA_CONTENT_TYPE,
+    ):
+        """Deliver events in one bulk request, returns the TopicEventBulkResponse."""
+        entries = [
+            appcallback_pb2.TopicEventBulkRequestEntry(
+                entry_id=str(i),
+                cloud_event=appcallback_pb2.TopicEventCERequest(
+                    id=str(uuid.uuid4()),
+                    source="dapr",
+                    type="com.dapr.event.sent",
+                    spec_version="1.0",
+                    data_content_type=content_type,
+                    data=data,
+                ),
+            )
+            for i, data in enumerate(payloads)
+        ]
+        return self._app_alpha.OnBulkTopicEventAlpha1(
+            appcallback_pb2.TopicEventBulkRequest(
+                id=str(uuid.uuid4()),
+                entries=entries,
+                pubsub_name=pubsub_name,
+                topic=topic,
+                type="com.dapr.event.sent",
+            )
+        )
+
+    # Dapr API
+
+    def InvokeBinding(self, request, context):
+        with self._lock:
+            self.bindings.append(
+                BindingCall(
+                    request.name,
+                    request.operation,
+                    request.data,
+                    dict(request.metadata),
+                )
+            )
+        return dapr_pb2.InvokeBindingResponse(
+            data=self.binding_responses.get(request.name, b"")
+        )
+
+    def PublishEvent(self, request, context):
+        with self._lock:
+            self.published.append(
+                PublishedEvent(
+                    request.pubsub_name,
+                    request.topic,
+                    request.data,
+                    request.data_content_type,
+                    dict(request.metadata),
+                )
+            )
+        return empty_pb2.Empty()
+
+    def BulkPublishEventAlpha1(self, request, context):
+        with self._lock:
+            for entry in request.entries:
+                metadata = dict(request.metadata)
+                metadata.update(entry.metadata)
+                self.published.append(
+                    PublishedEvent(
+                        request.pubsub_name,
+                        request.topic,
+                        entry.event,
+                        entry.content_type,
+                        metadata,
+                    )
+                )
+        return dapr_pb2.BulkPublishResponse()
+
+    def _check_etag(self, context, store, key, etag):
+        current = self.states.get((store, key))
+        if etag and (current is None or current[1] != etag):
+            context.abort(
+                grpc.StatusCode.ABORTED,
+                "possible etag mismatch. error from state store",
+            )
+
+    def _apply(self, store, operation, item):
+        if operation == _UPSERT:
+            self.states[store, item.key] = (item.value, str(next(self._versions)))
+        else:
+            self.states.pop((store, item.key), None)
+
+    def _write(self, context, store, operations):
+        with self._lock:
+            for _, item in operations:
+                self._check_etag(context, store, item.key, item.etag.value)
+            for operation, item in operations:
+                self._apply(store, operation, item)
+        return empty_pb2.Empty()
+
+    def GetState(self, request, context):
+        data, etag = self.states.get((request.store_name, request.key), (b"", ""))
+        return dapr_pb2.GetStateResponse(data=data, etag=etag)
+
+    def GetBulkState(self, request, context):
+        items = []
+        for key in request.keys:
+            data, etag = self.states.get((request.store_name, key), (b"", ""))
+            items.append(dapr_pb2.BulkStateItem(key=key, data=data, etag=etag))
+        return dapr_pb2.GetBulkStateResponse(items=items)
+
+    def SaveState(self, request, context):
+        operations = [(_UPSERT, item) for item in request.states]
+        return self._write(context, request.store_name, operations)
+
+    def DeleteState(self, request, context):
+        item = common_pb2.StateItem(key=request.key, etag=request.etag)
+        return self._write(context, request.store_name, [(_DELETE, item)])
+
+    def DeleteBulkState(self, request, context):
+        operations = [(_DELETE, item) for item in request.states]
+        return self._write(context, request.store_name, operations)
+
+    def ExecuteStateTransaction(self, request, context):
+        operations = [
+            (operation.operationType, operation.request)
+            for operation in request.operations
+        ]
+        return self._write(context, request.storeName, operations)
+
+    def GetSecret(self, request, context):
+        secret = self.secrets.get((request.store_name, request.key))
+        if secret is None:
+            context.abort(
+                grpc.StatusCode.NOT_FOUND,
+                "secret {} not found in {}".format(request.key, request.store_name),
+            )
+        return dapr_pb2.GetSecretResponse(data=secret)
+
+    def GetConfiguration(self, request, context):
+        items = {}
+        for (store, key), value in self.configuration.items():
+            if store == request.store_name and (
+                not request.keys or key in request.keys
+            ):
+                items[key] = common_pb2.ConfigurationItem(value=value, version="1")
+        return dapr_pb2.GetConfigurationResponse(items=items)
+
+    GetConfigurationAlpha1 = GetConfiguration
@@ -0,0 +1,99 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import grpc
+
+from cloudevents.sdk.event import v1
+from dapr.proto.runtime.v1 import appcallback_pb2 as appcallback_v1
+from dapr.proto.runtime.v1.appcallback_pb2_grpc import (
+    AppCallbackAlphaServicer,
+    add_AppCallbackAlphaServicer_to_server,
+)
+
+from functions_framework import constants
+
+_STATUSES = {
+    constants.DAPR_EVENT_SUCCESS: appcallback_v1.TopicEventResponse.SUCCESS,
+    constants.DAPR_EVENT_RETRY: appcallback_v1.TopicEventResponse.RETRY,
+    constants.DAPR_EVENT_DROP: appcallback_v1.TopicEventResponse.DROP,
+}
+
+
+def bulk_subscribe_config(config):
+    """Convert the bulkSubscribe of a trigger to the subscription's config."""
+    return appcallback_v1.BulkSubscribeConfig(
+        enabled=True,
+        max_messages_count=config.get("maxMessagesCount") or 0,
+        max_await_duration_ms=config.get("maxAwaitDurationMs") or 0,
+    )
+
+
+def to_event(entry, topic):
+    """Convert a bulk request entry to the v1.Event of a single delivery."""
+    event = v1.Event()
+    if entry.WhichOneof("event") == "cloud_event":
+        ce = entry.cloud_event
+        event.SetEventType(ce.type)
+        event.SetEventID(ce.id)
+        event.SetSource(ce.source)
+        event.SetData(ce.data)
+        event.SetContentType(ce.data_content_type)
+        extensions = dict(ce.extensions.items())
+    else:
+        event.SetEventID(entry.entry_id)
+        event.SetData(entry.bytes)
+        event.SetContentType(entry.content_type)
+        extensions = {}
+    event.SetSubject(topic)
+    for k, v in entry.metadata.items():
+        extensions["_metadata_" + k] = v
+    event.SetExtensions(extensions)
+    return event
+
+
+class BulkTopicServicer(AppCallbackAlphaServicer):
+    """Serve the bulk topic subscriptions of the Dapr app.
+
+    Dapr falls back to one OnTopicEvent call per event for the topics this
+    servicer does not implement, so a bulk subscription is always also
+    registered as a regular one.
+    """
+
+    def __init__(self):
+        self._topic_map = {}
+
+    def register(self, pubsub_name, topic, callback):
+        """Register callback(events) returning the list of per-event statuses."""
+        self._topic_map[pubsub_name, topic] = callback
+
+    def add_to(self, app):
+        app.add_external_service(add_AppCallbackAlphaServicer_to_server, self)
+
+    def OnBulkTopicEventAlpha1(self, request, context):
+        callback = self._topic_map.get((request.pubsub_name, request.topic))
+        if callback is None:
+            context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+            raise NotImplementedError(
+                "bulk topic {} is not implemented!".format(request.topic)
+            )
+
+        events = [to_event(entry, request.topic) for entry in request.entries]
+        statuses = callback(events)
+        return appcallback_v1.TopicEventBulkResponse(
+            statuses=[
+                appcallback_v1.TopicEventBulkResponseEntry(
+                    entry_id=entry.entry_id, status=_STATUSES[status]
+                )
+                for entry, status in zip(request.entries, statuses)
+            ]
+        )
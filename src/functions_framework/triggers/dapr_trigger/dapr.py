@@ -11,52 +11,281 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from copy import deepcopy
+import threading
+
+from concurrent import futures
 
 from cloudevents.sdk.event import v1
+from dapr.clients.grpc._response import TopicEventResponse
 from dapr.ext.grpc import App, BindingRequest
 
-from functions_framework import constants
+from functions_framework import _tracing, constants
+from functions_framework._metrics import metrics
+from functions_framework._startup import timeline
+from functions_framework._tracing import tracer
 from functions_framework.context.function_context import DaprTrigger
 from functions_framework.context.runtime_context import RuntimeContext
 from functions_framework.context.user_context import UserContext
+from functions_framework.exceptions import InvalidConfigurationException
+from functions_framework.log import _drain_logging_handlers
+from functions_framework.triggers.dapr_trigger.bulk import (
+    BulkTopicServicer,
+    bulk_subscribe_config,
+)
 from functions_framework.triggers.trigger import TriggerHandler
 
 
+class InFlightLimit(object):
+    """Admits at most limit concurrent events of a trigger, without waiting.
+
+    An event over the limit is answered at once instead of queueing behind
+    the running ones, so that Dapr redelivers it when there is room and the
+    latency of the admitted events stays bounded.
+    """
+
+    def __init__(self, limit, overflow=constants.DAPR_OVERFLOW_RETRY):
+        if overflow not in (
+            constants.DAPR_OVERFLOW_RETRY,
+            constants.DAPR_OVERFLOW_DROP,
+        ):
+            raise InvalidConfigurationException(
+                "Invalid overflow {}, expected {} or {}".format(
+                    overflow,
+                    constants.DAPR_OVERFLOW_RETRY,
+                    constants.DAPR_OVERFLOW_DROP,
+                )
+            )
+        self.limit = limit
+        self.overflow = overflow
+        self._slots = threading.BoundedSemaphore(limit)
+
+    def acquire(self):
+        return self._slots.acquire(blocking=False)
+
+    def release(self):
+        self._slots.release()
+
+    @property
+    def status(self):
+        """The status of the topic events answered over the limit."""
+        if self.overflow == constants.DAPR_OVERFLOW_DROP:
+            return constants.DAPR_EVENT_DROP
+        return constants.DAPR_EVENT_RETRY
+
+
+def event_status(out):
+    """The status of the events of an invocation without a status of their own.
+
+    A failed FunctionOut retries them, unless its code is a 4xx client error
+    which a redelivery would not fix.
+    """
+    if out is None or out.is_success():
+        return constants.DAPR_EVENT_SUCCESS
+    if 400 <= out.get_status() < 500:
+        return constants.DAPR_EVENT_DROP
+    return constants.DAPR_EVENT_RETRY
+
+
 class DaprTriggerHandler(TriggerHandler):
     """Handle dapr trigger."""
 
-    def __init__(self, port, triggers: [DaprTrigger] = None, user_function=None):
+    def __init__(
+        self,
+        port,
+        triggers: [DaprTrigger] = None,
+        user_function=None,
+        workers=constants.DEFAULT_DAPR_WORKERS,
+        max_in_flight=constants.DEFAULT_DAPR_MAX_IN_FLIGHT,
+    ):
         self.port = port
         self.triggers = triggers
-        self.app = App()
         self.user_function = user_function
+        self.limits = {}
+        for trigger in triggers or ():
+            limit = trigger.max_in_flight
+            if limit is None:
+                limit = max_in_flight
+            if limit:
+                self.limits[trigger.name, trigger.topic] = InFlightLimit(
+                    limit, trigger.overflow or constants.DAPR_OVERFLOW_RETRY
+                )
+        # Every trigger can reach its limit with a thread left to answer
+        # the events over it
+        limited = sum(limit.limit for limit in self.limits.values())
+        workers = max(workers, limited + len(self.limits))
+        self.bulk_servicer = None
+        self.app = App(thread_pool=futures.ThreadPoolExecutor(max_workers=workers))
+        self._in_flight = 0
+        self._idle = threading.Condition()
         if self.port == 0:
             self.port = constants.DEFAULT_DAPR_APP_PORT
 
-    def start(self, context: RuntimeContext, logger=None):
+    def _admit(self, limit, kind, name):
+        """Take an in-flight slot of limit, False if there is none left.
+
+        The slot of an admitted event is given back with _release().
+        """
+        if limit and not limit.acquire():
+            metrics.reject(kind, name)
+            return False
+        return True
+
+    @staticmethod
+    def _release(limit):
+        if limit:
+            limit.release()
+
+    def _invoke(self, kind, name, span, user_ctx):
+        """Run the user function for an event admitted by _admit().
+
+        Returns the FunctionOut of the invocation, None if none was set.
+        """
+        with self._idle:
+            self._in_flight += 1
+        try:
+            with span, metrics.invocation(kind, name) as invocation:
+                rv = invocation.call(self.user_function, user_ctx)
+                user_ctx.flush()
+        finally:
+            user_ctx.close()
+            _drain_logging_handlers()
+            with self._idle:
+                self._in_flight -= 1
+                self._idle.notify_all()
+        timeline.request_served()
+        return user_ctx.get_function_out(rv)
+
+    def register(self, context: RuntimeContext, logger=None):
+        """Register the triggers on the gRPC app, without serving it."""
         if not self.triggers:
             raise Exception("No triggers specified for DaprTriggerHandler")
 
         for trigger in self.triggers:
+            limit = self.limits.get((trigger.name, trigger.topic))
             if trigger.component_type.startswith("bindings"):
 
                 @self.app.binding(trigger.name)
-                def binding_handler(request: BindingRequest):
-                    rt_ctx = deepcopy(context)
-                    user_ctx = UserContext(
-                        runtime_context=rt_ctx, binding_request=request, logger=logger
-                    )
-                    self.user_function(user_ctx)
+                def binding_handler(
+                    request: BindingRequest, name=trigger.name, limit=limit
+                ):
+                    if not self._admit(limit, "binding", name):
+                        # Bindings have no retry status, an error makes Dapr
+                        # redeliver the event for the bindings which support it
+                        if limit.overflow == constants.DAPR_OVERFLOW_RETRY:
+                            raise Exception(
+                                "Binding {} has {} events in flight".format(
+                                    name, limit.limit
+                                )
+                            )
+                        return
+                    try:
+                        span = tracer.start_span(
+                            "binding " + name,
+                            _tracing.CONSUMER,
+                            tracer.extract(request.metadata),
+                            {"dapr.component": name},
+                        )
+                        user_ctx = UserContext(
+                            runtime_context=context,
+                            binding_request=request,
+                            logger=logger,
+                        )
+                        out = self._invoke("binding", name, span, user_ctx)
+                    finally:
+                        self._release(limit)
+                    # The SDK acknowledges bindings with an empty response,
+                    # only a failure can be reported, as an error
+                    if out is not None and not out.is_success():
+                        raise Exception(
+                            "Function failed with code {}: {}".format(
+                                out.get_status(), out.get_error() or out.get_data()
+                            )
+                        )
 
             if trigger.component_type.startswith("pubsub"):
 
                 @self.app.subscribe(pubsub_name=trigger.name, topic=trigger.topic)
-                def topic_handler(event: v1.Event):
-                    rt_ctx = deepcopy(context)
-                    user_ctx = UserContext(
-                        runtime_context=rt_ctx, topic_event=event, logger=logger
-                    )
-                    self.user_function(user_ctx)
+                def topic_handler(
+                    event: v1.Event, name=trigger.name, topic=trigger.topic, limit=limit
+                ):
+                    if not self._admit(limit, "pubsub", name):
+                        return TopicEventResponse(limit.status)
+                    try:
+                        span = tracer.start_span(
+                            "pubsub " + name,
+                            _tracing.CONSUMER,
+                            tracer.extract(event.Extensions()),
+                            {"dapr.component": name, "messaging.destination": topic},
+                        )
+                        user_ctx = UserContext(
+                            runtime_context=context, topic_event=event, logger=logger
+                        )
+                        out = self._invoke("pubsub", name, span, user_ctx)
+                    finally:
+                        self._release(limit)
+                    status = user_ctx.get_topic_event_statuses(event_status(out))[0]
+                    if status != constants.DAPR_EVENT_SUCCESS:
+                        return TopicEventResponse(status)
+
+                if trigger.bulk_subscribe:
+                    self._register_bulk(context, logger, trigger, limit)
+
+        if self.bulk_servicer:
+            self.bulk_servicer.add_to(self.app)
 
+    def _register_bulk(self, context, logger, trigger, limit):
+        # The SDK servicer answers ListTopicSubscriptions and has no way to
+        # mark a subscription bulk, dapr-ext-grpc is pinned to the versions
+        # keeping its subscriptions in _registered_topics.
+        for subscription in self.app._servicer._registered_topics:
+            if (subscription.pubsub_name, subscription.topic) == (
+                trigger.name,
+                trigger.topic,
+            ):
+                subscription.bulk_subscribe.CopyFrom(
+                    bulk_subscribe_config(trigger.bulk_subscribe)
+                )
+        if not self.bulk_servicer:
+            self.bulk_servicer = BulkTopicServicer()
+
+        def bulk_handler(events, name=trigger.name, topic=trigger.topic):
+            if not self._admit(limit, "pubsub", name):
+                return [limit.status] * len(events)
+            try:
+                span = tracer.start_span(
+                    "pubsub " + name,
+                    _tracing.CONSUMER,
+                    attributes={
+                        "dapr.component": name,
+                        "messaging.destination": topic,
+                        "messaging.batch.message_count": len(events),
+                    },
+                )
+                user_ctx = UserContext(
+                    runtime_context=context, topic_events=events, logger=logger
+                )
+                try:
+                    out = self._invoke("pubsub", name, span, user_ctx)
+                except Exception:
+                    if logger:
+                        logger.exception("Failed to process events of %s", name)
+                    # Events the function marked as processed are not redelivered
+                    return user_ctx.get_topic_event_statuses(constants.DAPR_EVENT_RETRY)
+            finally:
+                self._release(limit)
+            return user_ctx.get_topic_event_statuses(event_status(out))
+
+        self.bulk_servicer.register(trigger.name, trigger.topic, bulk_handler)
+
+    def start(self, context: RuntimeContext, logger=None):
+        with timeline.phase("dapr_app_construction"):
+            self.register(context, logger)
+
+        timeline.mark("dapr_server_starting")
         self.app.run(self.port)
+
+    def stop(self, grace=constants.DEFAULT_SHUTDOWN_GRACE_PERIOD):
+        # App.stop() aborts in-flight events, let them finish within grace.
+        with self._idle:
+            self._idle.wait_for(lambda: not self._in_flight, grace)
+        self.app.stop()
@@ -12,39 +12,37 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import atexit
 import functools
-import io
-import json
 import logging
 import os.path
 import pathlib
 import sys
 
-from copy import deepcopy
-
 import flask
 import werkzeug
 
-from functions_framework import _function_registry
+from functions_framework import _function_registry, _tracing
+from functions_framework._metrics import CONTENT_TYPE, metrics
+from functions_framework._startup import timeline
+from functions_framework._tracing import tracer
 from functions_framework.context.runtime_context import RuntimeContext
 from functions_framework.context.user_context import UserContext
-from functions_framework.exceptions import MissingSourceException
+from functions_framework.log import (
+    _drain_logging_handlers,
+    _execution_id,
+    _LoggingHandler,
+)
+from functions_framework.openfunction import codec
+from functions_framework.openfunction.streaming import (
+    StreamingBody,
+    is_stream,
+    iterate_async,
+)
 
 _FUNCTION_STATUS_HEADER_FIELD = "X-OpenFunction-Status"
 _CRASH = "crash"
-
-
-class _LoggingHandler(io.TextIOWrapper):
-    """Logging replacement for stdout and stderr in GCF Python 3.7."""
-
-    def __init__(self, level, stderr=sys.stderr):
-        io.TextIOWrapper.__init__(self, io.StringIO(), encoding=stderr.encoding)
-        self.level = level
-        self.stderr = stderr
-
-    def write(self, out):
-        payload = dict(severity=self.level, message=out.rstrip("\n"))
-        return self.stderr.write(json.dumps(payload) + "\n")
+_EXECUTION_ID_HEADER_FIELD = "Function-Execution-Id"
 
 
 def cloud_event(func):
@@ -85,19 +83,132 @@ def setup_logging():
     logging.getLogger().addHandler(warn_handler)
 
 
-def _http_view_func_wrapper(function, runtime_context: RuntimeContext, request, logger):
+def _http_view_func_wrapper(
+    function, runtime_context: RuntimeContext, request, logger, cache=None
+):
     @functools.wraps(function)
     def view_func(path):
-        rt_ctx = deepcopy(runtime_context)
+        span = tracer.start_span(
+            "http " + request.method,
+            _tracing.SERVER,
+            tracer.extract(request.headers),
+            {"http.method": request.method, "http.target": request.path},
+        )
         user_ctx = UserContext(
-            runtime_context=rt_ctx, http_request=request, logger=logger
+            runtime_context=runtime_context, http_request=request, logger=logger
+        )
+        token = _execution_id.set(request.headers.get(_EXECUTION_ID_HEADER_FIELD))
+        streamed = False
+        try:
+            try:
+                with span, metrics.invocation("http", "http") as invocation:
+                    rv = invocation.call(function, user_ctx)
+                    user_ctx.flush()
+            finally:
+                _execution_id.reset(token)
+                _drain_logging_handlers()
+            timeline.request_served()
+            out = user_ctx.get_function_out(rv)
+            if out is not None:
+                json_default = getattr(flask.current_app.json, "default", None)
+                rv = out.to_http_response(request.headers.get("Accept"), json_default)
+            if is_stream(rv):
+                # The chunks may still use the context, close it after them
+                response = _streaming_response(rv)
+                response.call_on_close(user_ctx.close)
+                streamed = True
+                return response
+            return rv
+        finally:
+            if not streamed:
+                user_ctx.close()
+
+    if cache is None:
+        return view_func
+
+    @functools.wraps(function)
+    def cached_view_func(path):
+        if not cache.accepts(request.method, request.headers):
+            return view_func(path)
+        return _cached_response(cache, request, lambda: view_func(path))
+
+    return cached_view_func
+
+
+def _cached_response(cache, request, view):
+    key = cache.key(
+        request.method,
+        request.path,
+        request.query_string,
+        request.headers,
+        request.get_data(),
+    )
+
+    def compute():
+        response = flask.current_app.make_response(view())
+        if response.is_streamed:
+            return None, response
+        entry = cache.entry(
+            response.status_code, response.headers.items(), response.get_data()
         )
-        return function(user_ctx)
+        return entry, response
+
+    entry, response = cache.get_or_compute(key, compute)
+    if entry is None:
+        return response
+    if entry.not_modified(request.headers.get("If-None-Match")):
+        return flask.Response(status=304, headers={"ETag": entry.etag})
+    return flask.Response(entry.body, entry.status, entry.headers)
+
+
+def _streaming_response(rv):
+    if not isinstance(rv, StreamingBody):
+        rv = StreamingBody(rv)
+    chunks = iterate_async(rv.chunks) if rv.is_async else rv.chunks
+    # The request context is kept for the chunks produced after returning
+    return flask.Response(
+        flask.stream_with_context(chunks),
+        status=rv.status,
+        headers=rv.headers,
+        content_type=rv.content_type,
+    )
+
+
+if hasattr(flask.json, "provider"):
+
+    class _JSONProvider(flask.json.provider.DefaultJSONProvider):
+        """Serialize dict and list responses with the encoder set in the codec.
+
+        Without one, or in debug mode, Flask serializes them as usual.
+        """
+
+        def response(self, *args, **kwargs):
+            if codec.json_encoder() is None or (
+                self._app.debug and self.compact is not False
+            ):
+                return super().response(*args, **kwargs)
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(
+                codec.dumps(obj, self.default), mimetype=self.mimetype
+            )
 
-    return view_func
+else:
+    _JSONProvider = None
 
 
-def _configure_app(wsgi_app, runtime_context: RuntimeContext, function, logger):
+def _configure_app(
+    wsgi_app,
+    runtime_context: RuntimeContext,
+    function,
+    logger,
+    metrics_path=None,
+    response_cache=None,
+):
+    if metrics_path:
+        wsgi_app.url_map.add(werkzeug.routing.Rule(metrics_path, endpoint="metrics"))
+        wsgi_app.view_functions["metrics"] = lambda: flask.Response(
+            metrics.render(), content_type=CONTENT_TYPE
+        )
     wsgi_app.url_map.add(
         werkzeug.routing.Rule("/", defaults={"path": ""}, endpoint="run")
     )
@@ -105,10 +216,12 @@ def _configure_app(wsgi_app, runtime_context: RuntimeContext, function, logger):
     wsgi_app.url_map.add(werkzeug.routing.Rule("/favicon.ico", endpoint="error"))
     wsgi_app.url_map.add(werkzeug.routing.Rule("/<path:path>", endpoint="run"))
     wsgi_app.view_functions["run"] = _http_view_func_wrapper(
-        function, runtime_context, flask.request, logger
+        function, runtime_context, flask.request, logger, response_cache
     )
     wsgi_app.view_functions["error"] = lambda: flask.abort(404, description="Not Found")
     wsgi_app.after_request(read_request)
+    if _JSONProvider is not None:
+        wsgi_app.json = _JSONProvider(wsgi_app)
 
 
 def read_request(response):
@@ -116,10 +229,15 @@ def read_request(response):
     Force the framework to read the entire request before responding, to avoid
     connection errors when returning prematurely. Skipped on streaming responses
     as these may continue to operate on the request after they are returned.
+    The unread rest of the body is discarded instead of buffered.
     """
 
     if not response.is_streamed:
-        flask.request.get_data()
+        exhaust = getattr(flask.request.stream, "exhaust", None)
+        if exhaust:
+            exhaust()
+        else:
+            flask.request.get_data()
 
     return response
 
@@ -131,9 +249,12 @@ def crash_handler(e):
     return str(e), 500, {_FUNCTION_STATUS_HEADER_FIELD: _CRASH}
 
 
-def create_app(
-    runtime_context: RuntimeContext = None, target=None, source=None, logger=None
-):
+def new_app(target=None, source=None):
+    """Create the Flask app of the user function, and bind errorhandler to it.
+
+    Load the user module within its application context, so that the error
+    handlers the module registers at import time end up on the app.
+    """
     _target = _function_registry.get_function_target(target)
     _source = _function_registry.get_function_source(source)
 
@@ -141,20 +262,36 @@ def create_app(
     # Python 3.5: join does not support PosixPath
     template_folder = str(pathlib.Path(_source).parent / "templates")
 
-    if not os.path.exists(_source):
-        raise MissingSourceException(
-            "File {source} that is expected to define function doesn't exist".format(
-                source=_source
-            )
-        )
-
-    source_module, spec = _function_registry.load_function_module(_source)
-
     # Create the application
     _app = flask.Flask(_target, template_folder=template_folder)
     _app.register_error_handler(500, crash_handler)
     global errorhandler
     errorhandler = _app.errorhandler
+    return _app
+
+
+def create_app(
+    runtime_context: RuntimeContext = None,
+    target=None,
+    source=None,
+    logger=None,
+    function=None,
+    metrics_path=None,
+    response_cache=None,
+    app=None,
+):
+    """Create the WSGI app serving the user function.
+
+    The function loaded by the runner is served as is, without one the user
+    source is loaded, or taken from the cache if it was loaded before. The
+    function is served by app when given, the app from new_app in which the
+    runner loaded it. The metrics are served on metrics_path when given,
+    responses are cached in response_cache when given.
+    """
+    _target = _function_registry.get_function_target(target)
+    _source = _function_registry.get_function_source(source)
+
+    _app = app or new_app(_target, _source)
 
     # Handle legacy GCF Python 3.7 behavior
     if os.environ.get("ENTRY_POINT"):
@@ -171,16 +308,17 @@ def create_app(
         # Handle log severity backwards compatibility
         sys.stdout = _LoggingHandler("INFO", sys.stderr)
         sys.stderr = _LoggingHandler("ERROR", sys.stderr)
+        atexit.register(_drain_logging_handlers)
         setup_logging()
 
-    # Execute the module, within the application context
-    with _app.app_context():
-        spec.loader.exec_module(source_module)
+    if function is None:
+        # Load the module, within the application context
+        with _app.app_context():
+            function = _function_registry.load_user_function(_source, _target)
 
-    # Get the configured function signature type
-    function = _function_registry.get_user_function(_source, source_module, _target)
-
-    _configure_app(_app, runtime_context, function, logger)
+    _configure_app(
+        _app, runtime_context, function, logger, metrics_path, response_cache
+    )
 
     return _app
 
@@ -0,0 +1,279 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import contextlib
+import contextvars
+import inspect
+
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.background import BackgroundTasks
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+from functions_framework import _tracing, constants
+from functions_framework._metrics import CONTENT_TYPE, metrics
+from functions_framework._startup import timeline
+from functions_framework._tracing import tracer
+from functions_framework.context.runtime_context import RuntimeContext
+from functions_framework.context.user_context import UserContext
+from functions_framework.log import _drain_logging_handlers
+from functions_framework.openfunction import codec
+from functions_framework.openfunction.streaming import StreamingBody, is_stream
+
+_FUNCTION_STATUS_HEADER_FIELD = "X-OpenFunction-Status"
+_CRASH = "crash"
+
+
+def _make_response(rv):
+    """Convert a function's return value into a response, like Flask does."""
+    if isinstance(rv, Response):
+        return rv
+    if is_stream(rv):
+        if not isinstance(rv, StreamingBody):
+            rv = StreamingBody(rv)
+        return StreamingResponse(
+            rv.chunks,
+            status_code=rv.status,
+            headers=rv.headers,
+            media_type=rv.content_type,
+        )
+
+    status, headers = 200, None
+    if isinstance(rv, tuple):
+        if len(rv) == 3:
+            rv, status, headers = rv
+        elif len(rv) == 2:
+            if isinstance(rv[1], (dict, list)):
+                rv, headers = rv
+            else:
+                rv, status = rv
+        else:
+            raise TypeError(
+                "The function returned a tuple of {} items, expected (body, "
+                "status, headers), (body, status) or (body, headers)".format(len(rv))
+            )
+        if isinstance(rv, Response):
+            rv.status_code = status
+            if headers:
+                rv.headers.update(dict(headers))
+            return rv
+
+    if isinstance(rv, (dict, list)):
+        return Response(
+            codec.dumps(rv),
+            status_code=status,
+            headers=dict(headers or {}),
+            media_type=codec.JSON,
+        )
+    if isinstance(rv, (str, bytes)):
+        return Response(
+            rv, status_code=status, headers=dict(headers or {}), media_type="text/html"
+        )
+    raise TypeError(
+        "The function did not return a valid response, got {}".format(type(rv))
+    )
+
+
+class _BodyReader(object):
+    """Read the body of an ASGI request from the thread of a plain function.
+
+    Each read pulls the chunks it needs from the request stream on the event
+    loop, so that at most one chunk received from the client is buffered.
+    """
+
+    def __init__(self, request, loop):
+        self._chunks = request.stream()
+        self._loop = loop
+        self._buffer = b""
+        self._done = False
+
+    def _receive(self):
+        try:
+            return asyncio.run_coroutine_threadsafe(
+                self._chunks.__anext__(), self._loop
+            ).result()
+        except StopAsyncIteration:
+            self._done = True
+            return b""
+
+    def read(self, size=-1):
+        """Read up to size bytes, all the rest of the body if size is negative."""
+        chunks = [self._buffer]
+        length = len(self._buffer)
+        while not self._done and (size < 0 or length < size):
+            chunk = self._receive()
+            chunks.append(chunk)
+            length += len(chunk)
+        data = b"".join(chunks)
+        if size < 0:
+            size = len(data)
+        self._buffer = data[size:]
+        return data[:size]
+
+    async def aclose(self):
+        await self._chunks.aclose()
+
+
+def _crash_response(e):
+    return Response(
+        str(e), status_code=500, headers={_FUNCTION_STATUS_HEADER_FIELD: _CRASH}
+    )
+
+
+def create_asgi_app(
+    runtime_context: RuntimeContext,
+    function,
+    logger=None,
+    max_threads=constants.DEFAULT_ASGI_MAX_THREADS,
+    metrics_path=None,
+    response_cache=None,
+):
+    """Create an ASGI app serving the user function.
+
+    Coroutine functions are awaited on the event loop. Plain functions run in
+    a bounded thread pool which also becomes the loop's default executor, so
+    UserContext.send_async shares the same bound. The metrics are served on
+    metrics_path when given, responses are cached in response_cache when given.
+    """
+    is_coroutine = inspect.iscoroutinefunction(function)
+    executor = ThreadPoolExecutor(
+        max_workers=max_threads, thread_name_prefix="function"
+    )
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        asyncio.get_running_loop().set_default_executor(executor)
+        yield
+        executor.shutdown(wait=True)
+
+    async def call(invocation, request):
+        loop = asyncio.get_running_loop()
+        # Plain functions cannot await the body, they read it from their thread
+        body = None if is_coroutine else _BodyReader(request, loop)
+        user_ctx = UserContext(
+            runtime_context=runtime_context,
+            http_request=request,
+            logger=logger,
+            http_body=body,
+        )
+
+        async def close():
+            if body is not None:
+                await body.aclose()
+            user_ctx.close()
+
+        try:
+            if is_coroutine:
+                rv = await invocation.call_async(function, user_ctx)
+            else:
+                # run_in_executor does not carry the context over, e.g. the span
+                context = contextvars.copy_context()
+                rv = await loop.run_in_executor(
+                    executor, context.run, invocation.call, function, user_ctx
+                )
+            if user_ctx.has_pending_sends():
+                await loop.run_in_executor(executor, user_ctx.flush)
+            out = user_ctx.get_function_out(rv)
+            if out is not None:
+                rv = out.to_http_response(request.headers.get("accept"))
+            response = _make_response(rv)
+        except BaseException:
+            await close()
+            raise
+        if isinstance(response, StreamingResponse):
+            # The chunks may still use the context and the body, close them
+            # after the chunks
+            tasks = BackgroundTasks(
+                [response.background] if response.background else []
+            )
+            tasks.add_task(close)
+            response.background = tasks
+        else:
+            await close()
+        return response
+
+    async def invoke(request):
+        span = tracer.start_span(
+            "http " + request.method,
+            _tracing.SERVER,
+            tracer.extract(request.headers),
+            {"http.method": request.method, "http.target": request.url.path},
+        )
+        try:
+            with span, metrics.invocation("http", "http") as invocation:
+                response = await call(invocation, request)
+        finally:
+            _drain_logging_handlers()
+        timeline.request_served()
+        return response
+
+    async def cached(request):
+        key = response_cache.key(
+            request.method,
+            request.url.path,
+            request.scope["query_string"],
+            request.headers,
+            await request.body(),
+        )
+
+        async def compute():
+            response = await invoke(request)
+            if isinstance(response, StreamingResponse):
+                return None, response
+            entry = response_cache.entry(
+                response.status_code, response.headers.items(), response.body
+            )
+            return entry, response
+
+        entry, response = await response_cache.get_or_compute_async(key, compute)
+        if entry is None:
+            return response
+        if entry.not_modified(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers={"ETag": entry.etag})
+        response = Response(entry.body, status_code=entry.status)
+        for name, value in entry.headers:
+            response.headers.append(name, value)
+        return response
+
+    async def run(request):
+        try:
+            if response_cache is not None and response_cache.accepts(
+                request.method, request.headers
+            ):
+                return await cached(request)
+            return await invoke(request)
+        except Exception as e:
+            if logger:
+                logger.exception(
+                    "Exception on %s [%s]", request.url.path, request.method
+                )
+            return _crash_response(e)
+
+    async def not_found(request):
+        return Response("Not Found", status_code=404)
+
+    async def render_metrics(request):
+        return Response(metrics.render(), media_type=CONTENT_TYPE)
+
+    methods = ["GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"]
+    routes = [Route(metrics_path, render_metrics)] if metrics_path else []
+    routes += [
+        Route("/robots.txt", not_found),
+        Route("/favicon.ico", not_found),
+        Route("/", run, methods=methods),
+        Route("/{path:path}", run, methods=methods),
+    ]
+    return Starlette(routes=routes, lifespan=lifespan)
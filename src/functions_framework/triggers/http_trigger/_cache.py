@@ -0,0 +1,285 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import collections
+import hashlib
+import threading
+import time
+
+from collections.abc import Mapping
+
+from functions_framework import constants
+from functions_framework._fork import ForkAware
+from functions_framework._metrics import metrics
+from functions_framework.exceptions import InvalidConfigurationException
+
+# Requests carrying these are only cached when they are part of the key
+_CREDENTIAL_HEADERS = ("authorization", "cookie")
+_UNCACHEABLE_DIRECTIVES = ("no-store", "private")
+# FunctionOut responses are negotiated on it, it is always part of the key
+_ACCEPT = "accept"
+
+
+def _etag(body):
+    return '"{}"'.format(hashlib.blake2b(body, digest_size=16).hexdigest())
+
+
+def _strip_weak(tag):
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+class CachedResponse(object):
+    """A response served from the cache, with its ETag."""
+
+    __slots__ = ("status", "headers", "body", "etag", "expires")
+
+    def __init__(self, status, headers, body, etag, expires):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+        self.expires = expires
+
+    def not_modified(self, if_none_match):
+        """Whether a request with this If-None-Match can be answered with 304."""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        etag = _strip_weak(self.etag)
+        return any(_strip_weak(tag) == etag for tag in if_none_match.split(","))
+
+
+class _Flight(object):
+    """A miss being computed, which identical requests wait for."""
+
+    __slots__ = ("done", "entry")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry = None
+
+
+class ResponseCache(ForkAware):
+    """Process-wide LRU cache of the responses of an idempotent HTTP function.
+
+    Responses are keyed on the method, path, query string, the Accept header,
+    the values of the configured headers and a hash of the body. Only 200
+    responses which are not streamed, set no cookie, are not marked no-store
+    or private and only Vary on headers of the key are cached, for ttl
+    seconds, at most size of them. Concurrent identical
+    requests missing the cache wait for the first one to compute the
+    response instead of calling the function each.
+    """
+
+    def __init__(
+        self,
+        ttl,
+        size=constants.DEFAULT_RESPONSE_CACHE_SIZE,
+        headers=(),
+        methods=constants.DEFAULT_RESPONSE_CACHE_METHODS,
+    ):
+        if not ttl or ttl <= 0:
+            raise InvalidConfigurationException("Response cache ttl must be positive")
+        if size < 1:
+            raise InvalidConfigurationException(
+                "Response cache size must be at least 1"
+            )
+        super().__init__()
+        self.ttl = ttl
+        self.size = size
+        self.headers = tuple(h.lower() for h in headers)
+        self._key_headers = self.headers
+        if _ACCEPT not in self.headers:
+            self._key_headers += (_ACCEPT,)
+        self.methods = frozenset(m.upper() for m in methods)
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._flights = {}
+        self._async_flights = {}
+
+    @staticmethod
+    def from_config(config):
+        """Build the cache of the cache section of an HTTP trigger, None without."""
+        if not config:
+            return None
+        if not isinstance(config, Mapping):
+            raise InvalidConfigurationException(
+                "The HTTP trigger cache must be an object, got {!r}".format(config)
+            )
+        return ResponseCache(
+            config.get("ttl"),
+            config.get("size") or constants.DEFAULT_RESPONSE_CACHE_SIZE,
+            config.get("headers") or (),
+            config.get("methods") or constants.DEFAULT_RESPONSE_CACHE_METHODS,
+        )
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._flights = {}
+        self._async_flights = {}
+
+    def accepts(self, method, headers):
+        """Whether a request may be served from the cache.
+
+        Requests with credentials are only cached when the credential
+        headers are part of the key, so that users never share responses.
+        """
+        if method not in self.methods:
+            return False
+        return not any(
+            headers.get(h) is not None
+            for h in _CREDENTIAL_HEADERS
+            if h not in self.headers
+        )
+
+    def key(self, method, path, query, headers, body=b""):
+        return (
+            method,
+            path,
+            query,
+            tuple(headers.get(h) for h in self._key_headers),
+            hashlib.blake2b(body, digest_size=16).digest() if body else b"",
+        )
+
+    def entry(self, status, headers, body):
+        """Return the CachedResponse of a response, None if it is not cacheable."""
+        if status != 200:
+            return None
+        kept, etag = [], None
+        for name, value in headers:
+            lower = name.lower()
+            if lower == "set-cookie":
+                return None
+            if lower == "cache-control" and any(
+                d in value.lower() for d in _UNCACHEABLE_DIRECTIVES
+            ):
+                return None
+            if lower == "vary" and any(
+                h.strip().lower() not in self._key_headers for h in value.split(",")
+            ):
+                # Also rejects Vary: *
+                return None
+            if lower == "etag":
+                etag = value
+            if lower != "content-length":
+                kept.append((name, value))
+        if etag is None:
+            etag = _etag(body)
+            kept.append(("ETag", etag))
+        return CachedResponse(
+            status, kept, bytes(body), etag, time.monotonic() + self.ttl
+        )
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key):
+        """Return the CachedResponse of key, None if missing or expired."""
+        self._check_fork()
+        with self._lock:
+            return self._get(key)
+
+    def put(self, key, entry):
+        self._check_fork()
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """Return the cached response of key, or compute it.
+
+        compute() returns an (entry, response) pair, where entry is the
+        CachedResponse of response or None if it is not cacheable. Returns
+        (entry, None) when served from the cache, else what compute returned.
+        """
+        self._check_fork()
+        with self._lock:
+            entry = self._get(key)
+            flight = self._flights.get(key) if entry is None else None
+            leader = entry is None and flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if entry is not None:
+            metrics.response_cache("hit")
+            return entry, None
+        if not leader:
+            flight.done.wait()
+            if flight.entry is not None:
+                metrics.response_cache("coalesced")
+                return flight.entry, None
+            # The first response was not cacheable, this one may differ
+            return self._compute(key, compute)
+        try:
+            entry, response = self._compute(key, compute)
+            flight.entry = entry
+            return entry, response
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _compute(self, key, compute):
+        metrics.response_cache("miss")
+        entry, response = compute()
+        if entry is not None:
+            self.put(key, entry)
+        return entry, response
+
+    async def get_or_compute_async(self, key, compute):
+        """Like get_or_compute() for a coroutine function compute."""
+        self._check_fork()
+        entry = self.get(key)
+        if entry is not None:
+            metrics.response_cache("hit")
+            return entry, None
+        flight = self._async_flights.get(key)
+        if flight is not None:
+            entry = await asyncio.shield(flight)
+            if entry is not None:
+                metrics.response_cache("coalesced")
+                return entry, None
+            return await self._compute_async(key, compute)
+        flight = self._async_flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            entry, response = await self._compute_async(key, compute)
+            return entry, response
+        finally:
+            self._async_flights.pop(key, None)
+            flight.set_result(entry)
+
+    async def _compute_async(self, key, compute):
+        metrics.response_cache("miss")
+        entry, response = await compute()
+        if entry is not None:
+            self.put(key, entry)
+        return entry, response
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -11,14 +11,101 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import math
+import os
+
+from functions_framework import constants
+from functions_framework.exceptions import InvalidConfigurationException
 from functions_framework.triggers.http_trigger._http.flask import FlaskApplication
 
 
+def _cgroup_cpu_quota():
+    """Return the cgroup CPU quota in CPUs, None if there is no limit."""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota == "max":
+            return None
+        return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota <= 0 or period <= 0:
+            return None
+        return quota / period
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus():
+    """Number of CPUs this process can use, honouring the cgroup CPU quota."""
+    if hasattr(os, "sched_getaffinity"):
+        count = len(os.sched_getaffinity(0))
+    else:
+        count = os.cpu_count() or 1
+    quota = _cgroup_cpu_quota()
+    if quota:
+        count = min(count, max(1, math.ceil(quota)))
+    return count
+
+
+def resolve_workers(workers):
+    """Resolve a worker count which may be "auto"."""
+    if workers == constants.AUTO:
+        return available_cpus()
+    try:
+        workers = int(workers)
+    except (TypeError, ValueError):
+        workers = 0
+    if workers < 1:
+        raise InvalidConfigurationException(
+            "Invalid worker count, expected a positive number or {}".format(
+                constants.AUTO
+            )
+        )
+    return workers
+
+
 class HTTPServer:
-    def __init__(self, app, debug, **options):
+    def __init__(self, app, debug, on_ready=None, on_exit=None, asgi=False, **options):
         self.app = app
         self.debug = debug
+        self.on_ready = on_ready
+        self.on_exit = on_exit
         self.options = options
+        if "workers" in options:
+            self.options["workers"] = resolve_workers(options["workers"])
+
+        worker_class = options.get("worker_class")
+        if worker_class and worker_class not in constants.HTTP_WORKER_CLASSES:
+            raise InvalidConfigurationException(
+                "Unknown worker class {}, expected one of {}".format(
+                    worker_class, ", ".join(constants.HTTP_WORKER_CLASSES)
+                )
+            )
+        if (
+            asgi and worker_class not in (None, constants.HTTP_WORKER_CLASS_UVICORN)
+        ) or (not asgi and worker_class == constants.HTTP_WORKER_CLASS_UVICORN):
+            raise InvalidConfigurationException(
+                "Worker class {} cannot serve in {} mode".format(
+                    worker_class,
+                    constants.HTTP_MODE_ASGI if asgi else constants.HTTP_MODE_WSGI,
+                )
+            )
+        if (
+            worker_class == constants.HTTP_WORKER_CLASS_SYNC
+            and options.get("threads", 1) > 1
+        ):
+            raise InvalidConfigurationException(
+                "Worker class {} serves one request at a time, it cannot run "
+                "{} threads".format(worker_class, options["threads"])
+            )
 
         if self.debug:
             self.server_class = FlaskApplication
@@ -32,12 +119,43 @@ class HTTPServer:
             except ImportError as e:
                 self.server_class = FlaskApplication
 
+        if asgi:
+            # A single uvicorn process is enough unless several workers are
+            # asked for, which gunicorn then manages with uvicorn workers.
+            if self.server_class is FlaskApplication or (
+                worker_class is None and self.options.get("workers", 1) == 1
+            ):
+                from functions_framework.triggers.http_trigger._http.uvicorn import (
+                    UvicornApplication,
+                )
+
+                self.server_class = UvicornApplication
+            else:
+                self.options["worker_class"] = constants.HTTP_WORKER_CLASS_UVICORN
+
     def run(self, host, port):
         http_server = self.server_class(
-            self.app, host, port, self.debug, **self.options
+            self.app,
+            host,
+            port,
+            self.debug,
+            on_ready=self.on_ready,
+            on_exit=self.on_exit,
+            **self.options
         )
         http_server.run()
 
 
-def create_server(wsgi_app, debug, **options):
-    return HTTPServer(wsgi_app, debug, **options)
+def create_server(wsgi_app, debug, on_ready=None, on_exit=None, asgi=False, **options):
+    """Create an HTTP server for the app, served by uvicorn if asgi is set.
+
+    options are the server tuning options (workers, threads, worker_class,
+    keep_alive, backlog, max_requests, max_requests_jitter), each server
+    applies those it supports.
+
+    on_ready is called in the process that serves requests once it is about
+    to serve them (i.e. in every gunicorn worker after the fork), on_exit when
+    that process stops serving. on_ready gets a halt callable, which stops the
+    server from that process and makes it exit with a non-zero status.
+    """
+    return HTTPServer(wsgi_app, debug, on_ready, on_exit, asgi, **options)
@@ -11,15 +11,41 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import _thread
+import sys
+
+from werkzeug.serving import is_running_from_reloader
 
 
 class FlaskApplication:
-    def __init__(self, app, host, port, debug, **options):
+    def __init__(self, app, host, port, debug, on_ready=None, on_exit=None, **options):
         self.app = app
         self.host = host
         self.port = port
         self.debug = debug
-        self.options = options
+        self.on_ready = on_ready
+        self.on_exit = on_exit
+        # The development server serves every request in a thread of its own,
+        # server tuning options do not apply to it.
+        self.options = {}
+        self.halted = False
+
+    def halt(self):
+        """Stop serving, run() then exits with a non-zero status."""
+        self.halted = True
+        # The development server stops on KeyboardInterrupt
+        _thread.interrupt_main()
 
     def run(self):
-        self.app.run(self.host, self.port, debug=self.debug, **self.options)
+        # With the debug reloader the parent process only watches files and
+        # the server runs in a restarted child.
+        serving = not self.debug or is_running_from_reloader()
+        if serving and self.on_ready:
+            self.on_ready(self.halt)
+        try:
+            self.app.run(self.host, self.port, debug=self.debug, **self.options)
+        finally:
+            if serving and self.on_exit:
+                self.on_exit()
+        if self.halted:
+            sys.exit(1)
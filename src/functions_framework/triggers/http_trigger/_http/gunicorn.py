@@ -12,11 +12,36 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import signal
+import sys
+
+from multiprocessing.sharedctypes import RawValue
+
 import gunicorn.app.base
 
+from functions_framework import constants
+
+# Server options as named by the framework, mapped to gunicorn settings
+_SETTINGS = {
+    "workers": "workers",
+    "threads": "threads",
+    "worker_class": "worker_class",
+    "keep_alive": "keepalive",
+    "backlog": "backlog",
+    "max_requests": "max_requests",
+    "max_requests_jitter": "max_requests_jitter",
+}
+
+_WORKER_CLASSES = {
+    constants.HTTP_WORKER_CLASS_SYNC: "sync",
+    constants.HTTP_WORKER_CLASS_GTHREAD: "gthread",
+    constants.HTTP_WORKER_CLASS_UVICORN: "uvicorn.workers.UvicornWorker",
+}
+
 
 class GunicornApplication(gunicorn.app.base.BaseApplication):
-    def __init__(self, app, host, port, debug, **options):
+    def __init__(self, app, host, port, debug, on_ready=None, on_exit=None, **options):
         self.options = {
             "bind": "%s:%s" % (host, port),
             "workers": 1,
@@ -24,11 +49,47 @@ class GunicornApplication(gunicorn.app.base.BaseApplication):
             "timeout": 0,
             "loglevel": "error",
             "limit_request_line": 0,
+            # The user function is imported before gunicorn starts, share it
+            # copy-on-write with the workers.
+            "preload_app": True,
         }
-        self.options.update(options)
+        self.on_ready = on_ready
+        self.on_exit = on_exit
+        # Set by a worker, read by the arbiter once every worker stopped
+        self.halted = RawValue("b", 0)
+        self.options["post_worker_init"] = self._post_worker_init
+        self.options["worker_exit"] = self._worker_exit
+        self.options["on_exit"] = self._arbiter_exit
+        for key, value in options.items():
+            if key == "worker_class":
+                value = _WORKER_CLASSES.get(value, value)
+            self.options[_SETTINGS.get(key, key)] = value
+        if options.get("worker_class") == constants.HTTP_WORKER_CLASS_SYNC:
+            # gunicorn runs a sync worker with several threads as gthread
+            self.options["threads"] = 1
         self.app = app
         super().__init__()
 
+    def _post_worker_init(self, worker):
+        if self.on_ready:
+            self.on_ready(self.halt)
+
+    def halt(self):
+        """Stop every worker and the arbiter, which exits with a non-zero status.
+
+        Called from a worker, e.g. when a trigger served next to HTTP died.
+        """
+        self.halted.value = 1
+        os.kill(os.getppid(), signal.SIGTERM)
+
+    def _worker_exit(self, server, worker):
+        if self.on_exit:
+            self.on_exit()
+
+    def _arbiter_exit(self, server):
+        if self.halted.value:
+            sys.exit(1)
+
     def load_config(self):
         for key, value in self.options.items():
             self.cfg.set(key, value)
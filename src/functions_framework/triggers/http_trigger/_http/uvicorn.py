@@ -0,0 +1,70 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import signal
+import sys
+import threading
+
+import uvicorn
+
+# Server options as named by the framework, mapped to uvicorn settings. The
+# remaining options only apply to gunicorn managed workers.
+_SETTINGS = {
+    "keep_alive": "timeout_keep_alive",
+    "backlog": "backlog",
+}
+
+
+def _exit(signum, frame):
+    sys.exit(0)
+
+
+class UvicornApplication:
+    def __init__(self, app, host, port, debug, on_ready=None, on_exit=None, **options):
+        self.options = {
+            "host": host,
+            "port": port,
+            "log_level": "debug" if debug else "error",
+            "lifespan": "on",
+        }
+        for key, value in options.items():
+            if key in _SETTINGS:
+                self.options[_SETTINGS[key]] = value
+        self.app = app
+        self.on_ready = on_ready
+        self.on_exit = on_exit
+        self.server = None
+        self.halted = False
+
+    def halt(self):
+        """Stop serving, run() then exits with a non-zero status."""
+        self.halted = True
+        self.server.should_exit = True
+
+    def run(self):
+        # Once shut down, uvicorn re-raises the signal which stopped it with the
+        # handler installed before it started. Exit normally instead of being
+        # killed by the signal, so that on_exit and atexit handlers run.
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, _exit)
+        self.server = uvicorn.Server(uvicorn.Config(self.app, **self.options))
+        if self.on_ready:
+            self.on_ready(self.halt)
+        try:
+            self.server.run()
+        finally:
+            if self.on_exit:
+                self.on_exit()
+        if self.halted:
+            sys.exit(1)
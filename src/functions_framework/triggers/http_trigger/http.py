@@ -11,19 +11,41 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import uvicorn
-
 from functions_framework import constants
+from functions_framework._startup import timeline
 from functions_framework.context.function_context import HTTPRoute
 from functions_framework.context.runtime_context import RuntimeContext
+from functions_framework.exceptions import (
+    InvalidConfigurationException,
+    MissingDependencyException,
+)
 from functions_framework.triggers.http_trigger import create_app
+from functions_framework.triggers.http_trigger._cache import ResponseCache
 from functions_framework.triggers.http_trigger._http import create_server
 from functions_framework.triggers.trigger import TriggerHandler
 
 
+def _import_asgi():
+    """Return create_asgi_app, which needs the asgi extra."""
+    try:
+        import uvicorn  # noqa: F401
+
+        from functions_framework.triggers.http_trigger._asgi import create_asgi_app
+    except ImportError as e:
+        raise MissingDependencyException(
+            "The {} HTTP mode needs starlette and uvicorn, install them with "
+            "pip install ofn-functions-framework[asgi]: {}".format(
+                constants.HTTP_MODE_ASGI, e
+            )
+        ) from e
+    return create_asgi_app
+
+
 class HTTPTriggerHandler(TriggerHandler):
     """Handle http trigger."""
 
+    foreground = True
+
     def __init__(
         self,
         port,
@@ -32,6 +54,10 @@ class HTTPTriggerHandler(TriggerHandler):
         target=None,
         user_function=None,
         debug=False,
+        mode=None,
+        server_options=None,
+        metrics_path=None,
+        app=None,
     ):
         self.port = trigger.port if trigger.port else port
         self.source = source
@@ -39,12 +65,58 @@ class HTTPTriggerHandler(TriggerHandler):
         self.trigger = trigger
         self.user_function = user_function
         self.debug = debug
+        self.mode = mode or trigger.mode or constants.HTTP_MODE_WSGI
+        self.metrics_path = metrics_path
+        self.app = app
+        # Options given on the command line override FUNC_CONTEXT
+        self.server_options = dict(trigger.server_options)
+        self.server_options.update(server_options or {})
         if self.port == 0:
             self.port = constants.DEFAULT_HTTP_APP_PORT
 
-    def start(self, context: RuntimeContext, logger=None):
+    def start(self, context: RuntimeContext, logger=None, on_ready=None, on_exit=None):
         if not self.trigger:
             raise Exception("No trigger specified for HTTPTriggerHandler")
+        if self.mode not in constants.HTTP_MODES:
+            raise InvalidConfigurationException(
+                "Unknown HTTP mode {}, expected one of {}".format(
+                    self.mode, ", ".join(constants.HTTP_MODES)
+                )
+            )
+
+        asgi = self.mode == constants.HTTP_MODE_ASGI
+        response_cache = ResponseCache.from_config(self.trigger.cache)
+        with timeline.phase("http_app_construction"):
+            if asgi:
+                app = _import_asgi()(
+                    context,
+                    self.user_function,
+                    logger,
+                    metrics_path=self.metrics_path,
+                    response_cache=response_cache,
+                )
+            else:
+                app = create_app(
+                    context,
+                    self.target,
+                    self.source,
+                    logger,
+                    self.user_function,
+                    self.metrics_path,
+                    response_cache,
+                    app=self.app,
+                )
+
+        def server_ready(halt):
+            timeline.mark("http_server_ready")
+            if on_ready:
+                on_ready(halt)
 
-        app = create_app(context, self.target, self.source, logger)
-        create_server(app, self.debug).run("0.0.0.0", self.port)
+        create_server(
+            app,
+            self.debug,
+            on_ready=server_ready,
+            on_exit=on_exit,
+            asgi=asgi,
+            **self.server_options
+        ).run("0.0.0.0", self.port)
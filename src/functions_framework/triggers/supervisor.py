@@ -0,0 +1,178 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import logging
+import signal
+import sys
+import threading
+
+from functions_framework import constants
+from functions_framework._tracing import tracer
+from functions_framework.context.runtime_context import RuntimeContext
+from functions_framework.exceptions import InvalidConfigurationException
+from functions_framework.triggers.trigger import TriggerHandler
+
+
+def _check_ports(handlers):
+    """Raise if two handlers would listen on the same port.
+
+    The HTTP and the Dapr triggers both default to the port of the function
+    context, only one of them can bind it.
+    """
+    listening = {}
+    for handler in handlers:
+        port = getattr(handler, "port", None)
+        if not port:
+            continue
+        if port in listening:
+            raise InvalidConfigurationException(
+                "{} and {} both listen on port {}, give the HTTP trigger a port "
+                "of its own".format(
+                    type(listening[port]).__name__, type(handler).__name__, port
+                )
+            )
+        listening[port] = handler
+
+
+class TriggerSupervisor:
+    """Run several trigger handlers concurrently in one process.
+
+    Every handler shares the same runtime context, hence the same user
+    function and pooled resources. A foreground handler (the HTTP server)
+    keeps the main thread and the remaining handlers are started in
+    background threads of the process that serves HTTP requests, i.e. inside
+    the gunicorn worker after the fork. Without a foreground handler the main
+    thread waits for SIGTERM/SIGINT, or for a handler to exit, and then stops
+    every handler.
+
+    A background handler exiting on its own is a failure: the foreground
+    server is halted as well and the process exits with a non-zero status,
+    so that the function is restarted instead of serving some triggers only.
+    """
+
+    def __init__(
+        self,
+        context: RuntimeContext,
+        handlers: [TriggerHandler],
+        logger=None,
+        grace=constants.DEFAULT_SHUTDOWN_GRACE_PERIOD,
+    ):
+        foreground = [h for h in handlers if h.foreground]
+        if len(foreground) > 1:
+            raise Exception("Only one foreground trigger handler can be supervised")
+        _check_ports(handlers)
+
+        self.context = context
+        self.logger = logger or logging.getLogger(__name__)
+        self.grace = grace
+        self.foreground = foreground[0] if foreground else None
+        self.background = [h for h in handlers if not h.foreground]
+        self._threads = []
+        self._shutdown = threading.Event()
+        self._halt = None
+        self.failed = False
+
+    def _run_background(self, handler):
+        try:
+            handler.start(self.context, logger=self.logger)
+        except Exception:
+            self.logger.exception("Trigger handler %s failed", type(handler).__name__)
+        finally:
+            if not self._shutdown.is_set():
+                self._fail(handler)
+
+    def _fail(self, handler):
+        self.logger.error(
+            "Trigger handler %s exited, stopping the function",
+            type(handler).__name__,
+        )
+        self.failed = True
+        self._shutdown.set()
+        if self._halt:
+            self._halt()
+
+    def _serve(self, halt=None):
+        # Called by the foreground server in the process serving requests
+        self._halt = halt
+        self.start_background()
+
+    def start_background(self):
+        """Start every background handler in its own thread."""
+        for handler in self.background:
+            thread = threading.Thread(
+                target=self._run_background,
+                args=(handler,),
+                name=type(handler).__name__,
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop_background(self):
+        """Stop the background handlers and wait for their threads."""
+        self._shutdown.set()
+        for handler in self.background:
+            try:
+                handler.stop()
+            except Exception:
+                self.logger.exception(
+                    "Failed to stop trigger handler %s", type(handler).__name__
+                )
+        for thread in self._threads:
+            thread.join(self.grace)
+        self._threads = []
+
+    def shutdown(self):
+        """Stop the background handlers and release the per-process resources.
+
+        Runs when the serving process stops, atexit handlers do not run when
+        the server exits by re-raising the signal that stopped it.
+        """
+        self.stop_background()
+        for name in ("output_dispatcher", "dapr_client_pool"):
+            resource = getattr(self.context, name, None)
+            if resource is not None:
+                resource.close()
+        tracer.force_flush()
+
+    def _handle_signal(self, signum, frame):
+        self.logger.info("Received signal %d, shutting down", signum)
+        self._shutdown.set()
+
+    def _install_signal_handlers(self):
+        if threading.current_thread() is not threading.main_thread():
+            return
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self._handle_signal)
+
+    def run(self):
+        if self.foreground:
+            self.foreground.start(
+                self.context,
+                logger=self.logger,
+                on_ready=self._serve,
+                on_exit=self.shutdown,
+            )
+            return
+
+        if not self.background:
+            return
+
+        self._install_signal_handlers()
+        self.start_background()
+        try:
+            self._shutdown.wait()
+        finally:
+            self.shutdown()
+        if self.failed:
+            sys.exit(1)
@@ -17,6 +17,15 @@ from functions_framework.context.runtime_context import RuntimeContext
 
 
 class TriggerHandler(ABC):
+    # Whether start() has to run in the main thread, e.g. because the
+    # underlying server installs signal handlers. At most one such handler
+    # can be supervised, every other handler runs in a background thread.
+    foreground = False
+
     @abstractmethod
-    def start(self, context: RuntimeContext):
+    def start(self, context: RuntimeContext, logger=None):
+        pass
+
+    def stop(self):
+        """Stop a handler started in the background, a no-op by default."""
         pass
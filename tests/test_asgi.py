@@ -0,0 +1,214 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import json
+import sys
+import unittest
+
+from unittest import mock
+
+from functions_framework.context.runtime_context import RuntimeContext
+from functions_framework.context.user_context import UserContext
+from functions_framework.exceptions import MissingDependencyException
+from functions_framework.triggers.http_trigger._asgi import create_asgi_app
+from functions_framework.triggers.http_trigger.http import _import_asgi
+
+
+def call(app, method="GET", path="/", body=b"", headers=()):
+    """Drive one request through an ASGI app, returns (status, headers, body).
+
+    A list body is sent in several chunks.
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers],
+        "scheme": "http",
+        "server": ("testserver", 80),
+    }
+    chunks = body if isinstance(body, list) else [body]
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        # The client disconnects once the response is complete
+        while not any(
+            m["type"] == "http.response.body" and not m.get("more_body") for m in sent
+        ):
+            await asyncio.sleep(0)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = sent[0]
+    headers = {k.decode().lower(): v.decode() for k, v in start["headers"]}
+    body = b"".join(m.get("body", b"") for m in sent[1:])
+    return start["status"], headers, body
+
+
+class TestASGIApp(unittest.TestCase):
+    def test_async_function(self):
+        async def function(context: UserContext):
+            await asyncio.sleep(0)
+            return {"path": context.get_http_request().url.path}
+
+        app = create_asgi_app(RuntimeContext(), function)
+        status, headers, body = call(app, path="/a/b")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["content-type"], "application/json")
+        self.assertEqual(json.loads(body), {"path": "/a/b"})
+
+    def test_sync_function_runs_in_thread_pool(self):
+        def function(context: UserContext):
+            return "hello " + context.get_http_request().method, 201
+
+        app = create_asgi_app(RuntimeContext(), function, max_threads=1)
+        status, _, body = call(app, method="POST", body=b"data")
+
+        self.assertEqual(status, 201)
+        self.assertEqual(body, b"hello POST")
+
+    def test_crash(self):
+        def function(context: UserContext):
+            raise ValueError("boom")
+
+        app = create_asgi_app(RuntimeContext(), function)
+        status, headers, body = call(app)
+
+        self.assertEqual(status, 500)
+        self.assertEqual(headers["x-openfunction-status"], "crash")
+        self.assertEqual(body, b"boom")
+
+    def test_body_helpers_in_sync_function(self):
+        def function(context: UserContext):
+            return {"json": context.get_json(), "form": None}
+
+        app = create_asgi_app(RuntimeContext(), function)
+        _, _, body = call(app, method="POST", body=[b'{"a": ', b"[1, 2]}"])
+        self.assertEqual(json.loads(body)["json"], {"a": [1, 2]})
+
+        def form_function(context: UserContext):
+            return dict(context.get_form())
+
+        app = create_asgi_app(RuntimeContext(), form_function)
+        headers = [("Content-Type", "application/x-www-form-urlencoded")]
+        _, _, body = call(app, method="POST", body=b"a=1&b=", headers=headers)
+        self.assertEqual(json.loads(body), {"a": "1", "b": ""})
+
+    def test_body_helpers_in_async_function(self):
+        async def function(context: UserContext):
+            with self.assertRaises(Exception):
+                context.get_json()
+            self.assertEqual(await context.read_json(), {"n": 1})
+            event = await context.read_cloud_event()
+            return {"id": event["id"], "data": event.data}
+
+        app = create_asgi_app(RuntimeContext(), function)
+        headers = [
+            ("Content-Type", "application/json"),
+            ("ce-id", "1"),
+            ("ce-source", "test"),
+            ("ce-type", "order"),
+            ("ce-specversion", "1.0"),
+        ]
+        _, _, body = call(app, method="POST", body=b'{"n": 1}', headers=headers)
+        self.assertEqual(json.loads(body), {"id": "1", "data": {"n": 1}})
+
+    def test_streamed_body(self):
+        async def function(context: UserContext):
+            chunks = [chunk async for chunk in context.aiter_body()]
+            return {"chunks": len(chunks), "size": sum(map(len, chunks))}
+
+        app = create_asgi_app(RuntimeContext(), function)
+        _, _, body = call(app, method="POST", body=[b"a" * 10, b"b" * 5])
+
+        self.assertEqual(json.loads(body), {"chunks": 2, "size": 15})
+
+    def test_streamed_body_in_sync_function(self):
+        def function(context: UserContext):
+            chunks = context.iter_body(chunk_size=4)
+            first = next(chunks)
+            return {"first": first.decode(), "rest": b"".join(chunks).decode()}
+
+        app = create_asgi_app(RuntimeContext(), function)
+        _, _, body = call(app, method="POST", body=[b"abcdef", b"gh", b"ij"])
+
+        self.assertEqual(json.loads(body), {"first": "abcd", "rest": "efghij"})
+
+    def test_streamed_response(self):
+        async def function(context: UserContext):
+            async def tokens():
+                for token in ("a", "b"):
+                    await asyncio.sleep(0)
+                    yield {"token": token}
+
+            return context.sse(tokens())
+
+        def sync_function(context: UserContext):
+            return (str(i).encode() for i in range(3))
+
+        app = create_asgi_app(RuntimeContext(), function)
+        _, headers, body = call(app)
+        self.assertEqual(headers["content-type"], "text/event-stream; charset=utf-8")
+        self.assertEqual(body, b'data: {"token": "a"}\n\ndata: {"token": "b"}\n\n')
+
+        _, _, body = call(create_asgi_app(RuntimeContext(), sync_function))
+        self.assertEqual(body, b"012")
+
+    def test_function_out(self):
+        async def function(context: UserContext):
+            context.out.set_code(201)
+            context.out.set_data({"id": 1})
+
+        app = create_asgi_app(RuntimeContext(), function)
+        status, headers, body = call(app)
+
+        self.assertEqual(status, 201)
+        self.assertEqual(headers["content-type"], "application/json")
+        self.assertEqual(json.loads(body), {"id": 1})
+
+    def test_favicon_not_found(self):
+        app = create_asgi_app(RuntimeContext(), lambda context: "unused")
+        status, _, _ = call(app, path="/favicon.ico")
+
+        self.assertEqual(status, 404)
+
+
+class TestASGIDependencies(unittest.TestCase):
+    def test_missing_starlette_is_reported(self):
+        modules = {
+            "starlette": None,
+            "functions_framework.triggers.http_trigger._asgi": None,
+        }
+        with mock.patch.dict(sys.modules, modules):
+            with self.assertRaises(MissingDependencyException) as e:
+                _import_asgi()
+        self.assertIn("ofn-functions-framework[asgi]", str(e.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
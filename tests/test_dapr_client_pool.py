@@ -0,0 +1,219 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import contextvars
+import copy
+import unittest
+
+from unittest import mock
+
+from functions_framework.clients import output_dispatcher
+from functions_framework.clients.dapr_client_pool import DaprClientPool
+from functions_framework.clients.output_dispatcher import OutputDispatcher
+from functions_framework.context.function_context import Component, FunctionContext
+from functions_framework.context.runtime_context import RuntimeContext
+from functions_framework.context.user_context import UserContext
+
+
+class TestDaprClientPool(unittest.TestCase):
+    def test_clients_are_created_lazily_and_reused(self):
+        factory = mock.Mock(side_effect=lambda: mock.Mock())
+        pool = DaprClientPool(size=2, client_factory=factory)
+        factory.assert_not_called()
+
+        clients = set()
+        for _ in range(10):
+            with pool.client() as client:
+                clients.add(client)
+
+        self.assertEqual(len(clients), 2)
+        self.assertEqual(factory.call_count, 2)
+
+    def test_idle_clients_are_evicted(self):
+        factory = mock.Mock(side_effect=lambda: mock.Mock())
+        pool = DaprClientPool(size=1, idle_timeout=10, client_factory=factory)
+
+        with mock.patch("time.monotonic", return_value=100.0):
+            first = pool.get()
+        with mock.patch("time.monotonic", return_value=200.0):
+            second = pool.get()
+
+        first.close.assert_called_once()
+        self.assertIsNot(first, second)
+
+    def test_leased_clients_are_not_evicted(self):
+        factory = mock.Mock(side_effect=lambda: mock.Mock())
+        pool = DaprClientPool(size=1, idle_timeout=10, client_factory=factory)
+
+        with mock.patch("time.monotonic", return_value=100.0):
+            slot = pool.acquire()
+        with mock.patch("time.monotonic", return_value=200.0):
+            self.assertIs(pool.get(), slot.client)
+        slot.client.close.assert_not_called()
+
+    def test_close(self):
+        pool = DaprClientPool(size=1, client_factory=mock.Mock)
+        client = pool.get()
+        pool.close()
+
+        client.close.assert_called_once()
+        with self.assertRaises(RuntimeError):
+            pool.get()
+
+    def test_forked_child_drops_parent_clients(self):
+        pool = DaprClientPool(size=1, client_factory=mock.Mock)
+        parent_client = pool.get()
+
+        with mock.patch("os.getpid", return_value=-1):
+            child_client = pool.get()
+
+        self.assertIsNot(parent_client, child_client)
+        parent_client.close.assert_not_called()
+
+    def test_deepcopy_shares_pool(self):
+        pool = DaprClientPool()
+        runtime_context = RuntimeContext(FunctionContext(), None, pool).freeze()
+        self.assertIs(copy.deepcopy(runtime_context).dapr_client_pool, pool)
+
+
+OUTPUTS = {
+    "kafka": Component(
+        component_name="kafka-out",
+        component_type="bindings.kafka",
+        operation="create",
+    ),
+    "redis": Component(
+        component_name="redis-out",
+        component_type="pubsub.redis",
+        topic="events",
+    ),
+}
+
+
+def runtime_context_with(client):
+    pool = DaprClientPool(size=1, client_factory=lambda: client)
+    return RuntimeContext(
+        FunctionContext(outputs=OUTPUTS), None, pool, OutputDispatcher(workers=2)
+    )
+
+
+class TestUserContextSend(unittest.TestCase):
+    def test_send_uses_runtime_pool(self):
+        client = mock.Mock()
+        runtime_context = runtime_context_with(client)
+
+        for _ in range(3):
+            UserContext(runtime_context).send("kafka", "hello")
+
+        self.assertEqual(client.invoke_binding.call_count, 3)
+        client.invoke_binding.assert_called_with("kafka-out", "create", "hello", None)
+
+    def test_dapr_client_is_leased_until_close(self):
+        factory = mock.Mock(side_effect=lambda: mock.Mock())
+        pool = DaprClientPool(size=1, idle_timeout=10, client_factory=factory)
+        context = UserContext(RuntimeContext(FunctionContext(), None, pool))
+
+        with mock.patch("time.monotonic", return_value=100.0):
+            client = context.dapr_client
+        with mock.patch("time.monotonic", return_value=200.0):
+            self.assertIs(pool.get(), client)
+            self.assertIs(context.dapr_client, client)
+            client.close.assert_not_called()
+            context.close()
+        with mock.patch("time.monotonic", return_value=300.0):
+            self.assertIsNot(pool.get(), client)
+        client.close.assert_called_once()
+
+    def test_standalone_contexts_share_a_dispatcher(self):
+        client = mock.Mock()
+        pool = DaprClientPool(size=1, client_factory=lambda: client)
+        context = FunctionContext(outputs=OUTPUTS)
+
+        with mock.patch.object(output_dispatcher, "_default", None), mock.patch.object(
+            output_dispatcher, "OutputDispatcher", wraps=OutputDispatcher
+        ) as dispatcher_class:
+            for _ in range(3):
+                user_ctx = UserContext(RuntimeContext(context, None, pool))
+                user_ctx.send_nowait("kafka", "a")
+                user_ctx.flush()
+
+        dispatcher_class.assert_called_once()
+        self.assertEqual(client.invoke_binding.call_count, 3)
+
+    def test_send_nowait_and_flush(self):
+        client = mock.Mock()
+        client.invoke_binding.side_effect = lambda name, op, data, md: data.upper()
+        context = UserContext(runtime_context_with(client))
+
+        future = context.send_nowait("kafka", "a")
+        context.send_nowait("kafka", "b")
+
+        self.assertTrue(context.has_pending_sends())
+        self.assertEqual(context.flush(), ["A", "B"])
+        self.assertEqual(future.result(), "A")
+        self.assertFalse(context.has_pending_sends())
+
+    def test_flush_raises_failed_send(self):
+        client = mock.Mock()
+        client.invoke_binding.side_effect = RuntimeError("unavailable")
+        context = UserContext(runtime_context_with(client))
+
+        context.send_nowait("kafka", "a")
+
+        with self.assertRaises(RuntimeError):
+            context.flush()
+
+    def test_send_batch(self):
+        client = mock.Mock(spec=["invoke_binding", "publish_event", "_stub", "close"])
+        client._stub.BulkPublishEventAlpha1.return_value.failedEntries = []
+        context = UserContext(runtime_context_with(client))
+
+        results = context.send_batch(["kafka", "redis"], ["a", "b", "c"])
+        future = context.send_batch("redis", ["d"], wait=False)
+        context.flush()
+
+        self.assertEqual(len(results["kafka"]), 3)
+        self.assertEqual(client.invoke_binding.call_count, 3)
+        self.assertIsNotNone(future.result()["redis"])
+        client.publish_event.assert_not_called()
+        bulk_publish = client._stub.BulkPublishEventAlpha1
+        self.assertEqual(bulk_publish.call_count, 2)
+        request = bulk_publish.call_args_list[0][0][0]
+        self.assertEqual((request.pubsub_name, request.topic), ("redis-out", "events"))
+        self.assertEqual([e.event for e in request.entries], [b'"a"', b'"b"', b'"c"'])
+
+    def test_send_batch_raises_failed_entries(self):
+        client = mock.Mock(spec=["_stub", "close"])
+        failed = mock.Mock(entry_id="1", error="unavailable")
+        client._stub.BulkPublishEventAlpha1.return_value.failedEntries = [failed]
+        context = UserContext(runtime_context_with(client))
+
+        with self.assertRaisesRegex(Exception, "1 of 2 events"):
+            context.send_batch("redis", ["a", "b"])
+
+    def test_send_async_keeps_the_context(self):
+        request_id = contextvars.ContextVar("request_id")
+        client = mock.Mock()
+        client.invoke_binding.side_effect = lambda *args: request_id.get(None)
+        context = UserContext(runtime_context_with(client))
+
+        async def send():
+            request_id.set("r1")
+            return await context.send_async("kafka", "a")
+
+        self.assertEqual(asyncio.run(send()), "r1")
+
+
+if __name__ == "__main__":
+    unittest.main()
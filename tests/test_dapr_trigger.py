@@ -0,0 +1,212 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+import unittest
+
+from unittest import mock
+
+from cloudevents.sdk.event import v1
+from dapr.clients.grpc._response import TopicEventResponseStatus
+from dapr.ext.grpc import App, BindingRequest
+from dapr.proto.runtime.v1 import appcallback_pb2 as appcallback_v1
+
+from functions_framework.context.function_context import DaprTrigger, FunctionContext
+from functions_framework.context.runtime_context import RuntimeContext
+from functions_framework.exceptions import InvalidConfigurationException
+from functions_framework.triggers.dapr_trigger.dapr import DaprTriggerHandler
+
+
+class BlockingFunction(object):
+    """User function blocking until released, to hold events in flight."""
+
+    def __init__(self):
+        self.entered = threading.Semaphore(0)
+        self.release = threading.Event()
+        self.calls = 0
+
+    def __call__(self, context):
+        self.calls += 1
+        self.entered.release()
+        self.release.wait(5)
+
+
+def registered_handler(triggers, function, **kwargs):
+    handler = DaprTriggerHandler(0, triggers, function, **kwargs)
+    handler.register(RuntimeContext(FunctionContext()).freeze())
+    servicer = handler.app._servicer
+    return handler, servicer._topic_map, servicer._binding_map
+
+
+class TestDaprTriggerLimits(unittest.TestCase):
+    def run_saturated(self, callback, *args):
+        """Call callback while the only in-flight slot is held, return its result."""
+        thread = threading.Thread(target=callback, args=args)
+        thread.start()
+        self.function.entered.acquire(timeout=5)
+        try:
+            return callback(*args)
+        finally:
+            self.function.release.set()
+            thread.join()
+
+    def setUp(self):
+        self.function = BlockingFunction()
+
+    def test_pubsub_retry_and_drop(self):
+        for overflow, status in (
+            (None, TopicEventResponseStatus.retry),
+            ("drop", TopicEventResponseStatus.drop),
+        ):
+            self.function = BlockingFunction()
+            trigger = DaprTrigger("kafka", "pubsub.kafka", "orders", 1, overflow)
+            _, topics, _ = registered_handler([trigger], self.function)
+            callback = list(topics.values())[0]
+
+            resp = self.run_saturated(callback, v1.Event())
+
+            self.assertEqual(resp.status, status)
+            self.assertEqual(self.function.calls, 1)
+            # The slot is given back once the event is processed
+            self.function.release.set()
+            self.assertIsNone(callback(v1.Event()))
+
+    def test_slot_is_released_when_dispatch_fails(self):
+        trigger = DaprTrigger("kafka", "pubsub.kafka", "orders", 1)
+        _, topics, _ = registered_handler([trigger], self.function)
+        callback = list(topics.values())[0]
+
+        with mock.patch(
+            "functions_framework.triggers.dapr_trigger.dapr.UserContext",
+            side_effect=RuntimeError("boom"),
+        ):
+            with self.assertRaises(RuntimeError):
+                callback(v1.Event())
+
+        self.function.release.set()
+        self.assertIsNone(callback(v1.Event()))
+        self.assertEqual(self.function.calls, 1)
+
+    def test_binding_retry_raises(self):
+        trigger = DaprTrigger("cron", "bindings.cron", None)
+        _, _, bindings = registered_handler([trigger], self.function, max_in_flight=1)
+
+        with self.assertRaises(Exception):
+            self.run_saturated(bindings["cron"], BindingRequest(b"", {}))
+        self.assertEqual(self.function.calls, 1)
+
+    def test_limits_per_topic(self):
+        triggers = [
+            DaprTrigger("kafka", "pubsub.kafka", "orders", 8),
+            DaprTrigger("kafka", "pubsub.kafka", "audit", 0),
+            DaprTrigger("cron", "bindings.cron", None),
+        ]
+        handler, _, _ = registered_handler(triggers, self.function, max_in_flight=4)
+
+        limits = {key: limit.limit for key, limit in handler.limits.items()}
+        self.assertEqual(limits, {("kafka", "orders"): 8, ("cron", None): 4})
+        self.assertEqual(handler.app._server._state.thread_pool._max_workers, 14)
+
+    def test_invalid_overflow(self):
+        trigger = DaprTrigger("kafka", "pubsub.kafka", "orders", 1, "requeue")
+        with self.assertRaises(InvalidConfigurationException):
+            DaprTriggerHandler(0, [trigger])
+
+
+def bulk_request(count):
+    return appcallback_v1.TopicEventBulkRequest(
+        pubsub_name="kafka",
+        topic="orders",
+        entries=[
+            appcallback_v1.TopicEventBulkRequestEntry(
+                entry_id="entry-{}".format(i),
+                cloud_event=appcallback_v1.TopicEventCERequest(
+                    id="event-{}".format(i), data=str(i).encode()
+                ),
+            )
+            for i in range(count)
+        ],
+    )
+
+
+class TestDaprTriggerBulk(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.trigger = DaprTrigger(
+            "kafka",
+            "pubsub.kafka",
+            "orders",
+            bulk_subscribe={"enabled": True, "maxMessagesCount": 50},
+        )
+
+    def bulk_handler(self, function):
+        handler, _, _ = registered_handler([self.trigger], function)
+        return handler
+
+    def statuses(self, response):
+        status = appcallback_v1.TopicEventResponse.TopicEventResponseStatus.Name
+        return [(e.entry_id, status(e.status)) for e in response.statuses]
+
+    def test_sdk_servicer_keeps_registered_topics(self):
+        # _register_bulk marks subscriptions bulk on this private attribute,
+        # fails when an upgrade of dapr-ext-grpc drops it
+        self.assertIsInstance(App()._servicer._registered_topics, list)
+
+    def test_subscription_is_bulk(self):
+        handler = self.bulk_handler(None)
+
+        subscription = handler.app._servicer._registered_topics[0]
+        self.assertTrue(subscription.bulk_subscribe.enabled)
+        self.assertEqual(subscription.bulk_subscribe.max_messages_count, 50)
+
+    def test_batch_with_statuses(self):
+        def function(context):
+            events = context.get_topic_events()
+            self.calls.append([event.Data() for event in events])
+            context.set_topic_event_status(1, "drop")
+
+        servicer = self.bulk_handler(function).bulk_servicer
+        resp = servicer.OnBulkTopicEventAlpha1(bulk_request(3), mock.Mock())
+
+        self.assertEqual(self.calls, [[b"0", b"1", b"2"]])
+        self.assertEqual(
+            self.statuses(resp),
+            [("entry-0", "SUCCESS"), ("entry-1", "DROP"), ("entry-2", "SUCCESS")],
+        )
+
+    def test_failed_batch_is_retried(self):
+        def function(context):
+            context.set_topic_event_status(0, "success")
+            raise ValueError("boom")
+
+        servicer = self.bulk_handler(function).bulk_servicer
+        resp = servicer.OnBulkTopicEventAlpha1(bulk_request(2), mock.Mock())
+
+        self.assertEqual(
+            self.statuses(resp), [("entry-0", "SUCCESS"), ("entry-1", "RETRY")]
+        )
+
+    def test_single_event_fallback(self):
+        def function(context):
+            self.calls.append(len(context.get_topic_events()))
+            context.set_topic_event_status(0, "retry")
+
+        _, topics, _ = registered_handler([self.trigger], function)
+        resp = list(topics.values())[0](v1.Event())
+
+        self.assertEqual(self.calls, [1])
+        self.assertEqual(resp.status, TopicEventResponseStatus.retry)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+
+from unittest import mock
+
+from functions_framework.clients.input_cache import InputCache
+from functions_framework.clients.state_cache import StateCache, StateEntry
+from functions_framework.triggers.http_trigger._cache import ResponseCache
+
+
+class TestForkAware(unittest.TestCase):
+    def test_caches_start_over_after_fork(self):
+        state_cache = StateCache(8)
+        state_cache.put("store", StateEntry("key", b"value"))
+        input_cache = InputCache()
+        input_cache.put("input", "value", 60)
+        response_cache = ResponseCache(60)
+        key = response_cache.key("GET", "/", "", {})
+        response_cache.put(key, response_cache.entry(200, {}, b"body"))
+
+        with mock.patch("os.getpid", return_value=-1):
+            self.assertIsNone(state_cache.get("store", "key"))
+            self.assertIsNone(input_cache.get("input", None))
+            self.assertIsNone(response_cache.get(key))
+            self.assertFalse(state_cache._forked())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import copy
+import unittest
+
+from functions_framework.context.function_context import FunctionContext
+from functions_framework.context.runtime_context import RuntimeContext
+
+FUNC_CONTEXT = {
+    "name": "function",
+    "version": "v1",
+    "triggers": {
+        "dapr": [{"name": "kafka-in", "type": "bindings.kafka"}],
+    },
+    "outputs": {
+        "out": {
+            "componentName": "kafka-out",
+            "componentType": "bindings.kafka",
+            "operation": "create",
+            "metadata": {"key": "value"},
+        }
+    },
+}
+
+
+class TestFunctionContext(unittest.TestCase):
+    def test_from_json(self):
+        context = FunctionContext.from_json(FUNC_CONTEXT)
+
+        self.assertEqual(context.name, "function")
+        self.assertEqual(context.dapr_triggers[0].name, "kafka-in")
+        self.assertEqual(context.outputs["out"].get_type(), "bindings")
+
+    def test_frozen_runtime_context_is_read_only(self):
+        runtime_context = RuntimeContext(FunctionContext.from_json(FUNC_CONTEXT))
+        runtime_context.freeze()
+
+        with self.assertRaises(AttributeError):
+            runtime_context.context.name = "other"
+        with self.assertRaises(AttributeError):
+            runtime_context.get_outputs()["out"].operation = "delete"
+        with self.assertRaises(TypeError):
+            runtime_context.get_outputs()["out"].metadata["key"] = "other"
+        with self.assertRaises(TypeError):
+            runtime_context.get_outputs()["new"] = None
+        self.assertIsInstance(runtime_context.get_dapr_triggers(), tuple)
+
+    def test_frozen_runtime_context_is_shared_on_deepcopy(self):
+        runtime_context = RuntimeContext(FunctionContext.from_json(FUNC_CONTEXT))
+        copied = copy.deepcopy(runtime_context)
+        self.assertIsNot(copied.context, runtime_context.context)
+
+        runtime_context.freeze()
+        self.assertIs(copy.deepcopy(runtime_context), runtime_context)
+
+
+if __name__ == "__main__":
+    unittest.main()
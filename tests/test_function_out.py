@@ -0,0 +1,171 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import datetime
+import decimal
+import json
+import unittest
+
+from cloudevents.sdk.event import v1
+from dapr.clients.grpc._response import TopicEventResponseStatus
+from dapr.ext.grpc import BindingRequest
+
+from functions_framework.context.function_context import DaprTrigger, FunctionContext
+from functions_framework.context.runtime_context import RuntimeContext
+from functions_framework.context.user_context import UserContext
+from functions_framework.exceptions import MissingDependencyException
+from functions_framework.openfunction import codec
+from functions_framework.openfunction.function_out import FunctionOut
+from functions_framework.triggers.dapr_trigger.dapr import DaprTriggerHandler
+from functions_framework.triggers.http_trigger import create_app
+
+
+def serve(function, accept=None):
+    app = create_app(RuntimeContext(), "function", "main.py", function=function)
+    return app.test_client().get("/", headers={"Accept": accept} if accept else {})
+
+
+class TestCodecEncoding(unittest.TestCase):
+    def tearDown(self):
+        codec.ENCODERS.pop("application/x-test", None)
+
+    def test_encode(self):
+        self.assertEqual(codec.encode(b"raw")[0], b"raw")
+        self.assertEqual(codec.encode("é"), ("é".encode(), "text/plain; charset=utf-8"))
+        body, content_type = codec.encode({"a": [1, 2]})
+        self.assertEqual(json.loads(body), {"a": [1, 2]})
+        self.assertEqual(content_type, "application/json")
+
+    def test_negotiate(self):
+        codec.register_encoder("application/x-test", lambda obj, default: b"test")
+
+        for accept, expected in (
+            (None, "application/json"),
+            ("*/*", "application/json"),
+            ("text/html", "application/json"),
+            ("application/x-test", "application/x-test"),
+            ("application/json;q=0.5, application/x-test", "application/x-test"),
+            ("application/x-test;q=0.1, application/*", "application/json"),
+            ("application/x-test;q=0, */*;q=0.1", "application/json"),
+        ):
+            self.assertEqual(codec.negotiate(accept), expected, accept)
+
+
+class TestJSONResponses(unittest.TestCase):
+    DATA = {"b": datetime.datetime(2023, 1, 2, 3, 4, 5), "a": 2**70}
+    EXPECTED = b'{"a":1180591620717411303424,"b":"Mon, 02 Jan 2023 03:04:05 GMT"}'
+
+    def tearDown(self):
+        codec.set_json_decoder(None)
+        codec.set_json_encoder(None)
+
+    def test_flask_serializes_by_default(self):
+        resp = serve(lambda context: self.DATA)
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data.strip(), self.EXPECTED)
+
+    def test_orjson(self):
+        try:
+            codec.use_orjson()
+        except MissingDependencyException:
+            self.skipTest("orjson is not installed")
+
+        resp = serve(lambda context: self.DATA)
+        self.assertEqual((resp.status_code, resp.data), (200, self.EXPECTED))
+
+        encode = codec.json_encoder()
+        self.assertEqual(encode({"b": 1, "a": 2}), b'{"a":2,"b":1}')
+        with self.assertRaises(TypeError):
+            encode({"a": object()})
+
+
+class TestFunctionOut(unittest.TestCase):
+    def test_empty_and_success(self):
+        out = FunctionOut(0, None, "", {})
+        self.assertTrue(out.is_empty())
+        self.assertTrue(out.is_success())
+
+        out.set_code(503)
+        self.assertFalse(out.is_empty())
+        self.assertFalse(out.is_success())
+        self.assertEqual(FunctionOut(0, ValueError(), "", {}).get_status(), 500)
+
+    def test_http_response(self):
+        out = FunctionOut(201, None, {"id": 1}, {"Location": "/1"})
+
+        body, status, headers = out.to_http_response()
+
+        self.assertEqual((json.loads(body), status), ({"id": 1}, 201))
+        self.assertEqual(
+            headers, {"Location": "/1", "Content-Type": "application/json"}
+        )
+
+    def test_wsgi(self):
+        def returned(context):
+            return FunctionOut(202, None, {"price": decimal.Decimal("1.50")}, {})
+
+        def set_on_context(context):
+            context.out.set_code(418)
+            context.out.set_data("teapot")
+            context.out.set_metadata({"X-Brew": "no"})
+
+        resp = serve(returned)
+        self.assertEqual(resp.status_code, 202)
+        # Objects JSON does not know are serialized like Flask does
+        self.assertEqual(resp.get_json(), {"price": "1.50"})
+
+        resp = serve(set_on_context)
+        self.assertEqual((resp.status_code, resp.data), (418, b"teapot"))
+        self.assertEqual(resp.headers["X-Brew"], "no")
+        self.assertEqual(resp.mimetype, "text/plain")
+
+    def test_wsgi_plain_returns_are_unchanged(self):
+        def function(context):
+            context.out.set_code(500)
+            return {"a": 1}
+
+        resp = serve(function)
+        self.assertEqual((resp.status_code, resp.get_json()), (200, {"a": 1}))
+
+
+class TestDaprFunctionOut(unittest.TestCase):
+    def handler(self, trigger, function):
+        handler = DaprTriggerHandler(0, [trigger], function)
+        handler.register(RuntimeContext(FunctionContext()).freeze())
+        return handler.app._servicer
+
+    def test_topic_status_from_code(self):
+        for code, expected in (
+            (0, None),
+            (400, TopicEventResponseStatus.drop),
+            (503, TopicEventResponseStatus.retry),
+        ):
+            servicer = self.handler(
+                DaprTrigger("kafka", "pubsub.kafka", "orders"),
+                lambda context: FunctionOut(code, None, "", {}),
+            )
+            resp = list(servicer._topic_map.values())[0](v1.Event())
+            self.assertEqual(resp and resp.status, expected, code)
+
+    def test_failed_binding_raises(self):
+        def function(context: UserContext):
+            context.out.set_error("database unavailable")
+
+        servicer = self.handler(DaprTrigger("cron", "bindings.cron", None), function)
+        with self.assertRaises(Exception):
+            servicer._binding_map["cron"](BindingRequest(b"", {}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import sys
+import tempfile
+import textwrap
+import unittest
+
+from functions_framework import _function_registry
+from functions_framework.context.function_context import FunctionContext, HTTPRoute
+from functions_framework.context.runtime_context import RuntimeContext
+from functions_framework.exceptions import MissingSourceException
+from functions_framework.runner import Runner
+from functions_framework.triggers.http_trigger import create_app
+
+SOURCE = textwrap.dedent("""
+    import os
+
+    from functions_framework.context.user_context import UserContext
+
+    with open(os.path.join(os.path.dirname(__file__), "loads.txt"), "a") as f:
+        f.write("x")
+
+
+    def function(context: UserContext):
+        return "hello"
+    """)
+
+FLASK_SOURCE = textwrap.dedent("""
+    import flask
+
+    from functions_framework.context.user_context import UserContext
+    from functions_framework.triggers.http_trigger import errorhandler
+
+    APP_NAME = flask.current_app.name
+
+
+    class Teapot(Exception):
+        pass
+
+
+    @errorhandler(Teapot)
+    def handle_teapot(e):
+        return APP_NAME, 418
+
+
+    def function(context: UserContext):
+        raise Teapot()
+    """)
+
+
+class TestLoadUserFunction(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.directory.name, "counted_source.py")
+        with open(self.source, "w") as f:
+            f.write(SOURCE)
+
+    def tearDown(self):
+        _function_registry.LOADED_MODULES.pop(os.path.realpath(self.source), None)
+        sys.modules.pop("counted_source", None)
+        self.directory.cleanup()
+
+    def loads(self):
+        with open(os.path.join(self.directory.name, "loads.txt")) as f:
+            return len(f.read())
+
+    def test_source_is_executed_once(self):
+        function = _function_registry.load_user_function(self.source, "function")
+        self.assertIs(
+            _function_registry.load_user_function(self.source, "function"), function
+        )
+
+        app = create_app(target="function", source=self.source)
+        self.assertEqual(app.test_client().get("/").data, b"hello")
+        self.assertEqual(self.loads(), 1)
+        self.assertEqual(sys.path.count(os.path.dirname(self.source)), 1)
+
+    def test_source_is_executed_in_the_app(self):
+        with open(self.source, "w") as f:
+            f.write(FLASK_SOURCE)
+
+        runner = Runner(
+            FunctionContext(http_trigger=HTTPRoute()), "function", self.source
+        )
+        app = create_app(
+            RuntimeContext(),
+            "function",
+            self.source,
+            function=runner.user_function,
+            app=runner.http_app,
+        )
+
+        response = app.test_client().get("/")
+        self.assertEqual(response.status_code, 418)
+        self.assertEqual(response.data, b"function")
+
+    def test_missing_source(self):
+        with self.assertRaises(MissingSourceException):
+            _function_registry.load_user_function(
+                os.path.join(self.directory.name, "missing.py"), "function"
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import unittest
+
+from unittest import mock
+
+from functions_framework.context.runtime_context import RuntimeContext
+from functions_framework.context.user_context import UserContext
+from functions_framework.openfunction import codec
+from functions_framework.triggers.http_trigger import create_app
+
+STRUCTURED_EVENT = {
+    "specversion": "1.0",
+    "id": "1",
+    "source": "test",
+    "type": "order",
+    "datacontenttype": "application/json",
+    "data": {"n": 1},
+}
+
+
+def serve(function, *args, **kwargs):
+    app = create_app(RuntimeContext(), "function", "main.py", function=function)
+    return app.test_client().post(*args, **kwargs)
+
+
+class TestCodec(unittest.TestCase):
+    def tearDown(self):
+        codec.set_json_decoder(None)
+
+    def test_pluggable_decoder(self):
+        decoder = mock.Mock(return_value={"decoded": True})
+        codec.set_json_decoder(decoder)
+
+        self.assertEqual(codec.loads(b"{}"), {"decoded": True})
+        decoder.assert_called_once_with(b"{}")
+
+    def test_loads_or_data(self):
+        self.assertEqual(codec.loads_or_data(b"[1]"), [1])
+        self.assertEqual(codec.loads_or_data(b"plain"), b"plain")
+
+
+class TestWSGIBody(unittest.TestCase):
+    def test_json_is_parsed_once(self):
+        def function(context: UserContext):
+            return {"same": context.get_json() is context.get_json()}
+
+        with mock.patch.object(codec, "loads", wraps=codec.loads) as loads:
+            resp = serve(function, "/", data=b'{"a": 1}')
+
+        self.assertEqual(resp.get_json(), {"same": True})
+        loads.assert_called_once_with(b'{"a": 1}')
+
+    def test_form(self):
+        def function(context: UserContext):
+            return context.get_form()["name"]
+
+        resp = serve(function, "/", data={"name": "of"})
+        self.assertEqual(resp.data, b"of")
+
+    def test_cloud_event_modes(self):
+        def function(context: UserContext):
+            event = context.get_cloud_event()
+            return {"type": event["type"], "data": event.data}
+
+        structured = serve(
+            function,
+            "/",
+            data=json.dumps(STRUCTURED_EVENT),
+            content_type="application/cloudevents+json",
+        )
+        binary = serve(
+            function,
+            "/",
+            data=b'{"n": 1}',
+            content_type="application/json",
+            headers={
+                "ce-specversion": "1.0",
+                "ce-id": "1",
+                "ce-source": "test",
+                "ce-type": "order",
+            },
+        )
+
+        for resp in (structured, binary):
+            self.assertEqual(resp.get_json(), {"type": "order", "data": {"n": 1}})
+
+    def test_streamed_body_is_not_buffered(self):
+        def function(context: UserContext):
+            first = next(context.iter_body(chunk_size=4))
+            # The unread rest of the body is discarded, not cached
+            return first
+
+        with mock.patch("flask.Request.get_data") as get_data:
+            resp = serve(function, "/", data=b"x" * 1024)
+
+        self.assertEqual(resp.data, b"xxxx")
+        get_data.assert_not_called()
+
+    def test_not_an_http_invocation(self):
+        with self.assertRaises(Exception):
+            UserContext().get_body()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# Dependencies which only specific triggers or outputs need
+HEAVY_PACKAGES = {
+    "aiohttp",
+    "cloudevents",
+    "dapr",
+    "flask",
+    "grpc",
+    "gunicorn",
+    "starlette",
+    "uvicorn",
+    "werkzeug",
+}
+
+
+def import_time(module):
+    """Import module in a fresh interpreter with -X importtime.
+
+    Returns the imported top-level packages and the cumulative import time
+    of module in microseconds.
+    """
+    with tempfile.TemporaryDirectory() as cwd:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import " + module],
+            cwd=cwd,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+        created = os.listdir(cwd)
+
+    packages, cumulative = set(), None
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        name = name.strip()
+        packages.add(name.split(".")[0])
+        if name == module:
+            cumulative = int(cumulative_us)
+    return packages, cumulative, created
+
+
+class TestImportTime(unittest.TestCase):
+    def test_cli_does_not_import_trigger_dependencies(self):
+        packages, cumulative, created = import_time("functions_framework._cli")
+
+        self.assertEqual(
+            packages & HEAVY_PACKAGES,
+            set(),
+            "functions_framework._cli took {}us to import".format(cumulative),
+        )
+        # Importing the framework must not open the function log either
+        self.assertEqual(created, [])
+
+    def test_http_trigger_does_not_import_dapr_dependencies(self):
+        packages, _, _ = import_time("functions_framework.triggers.http_trigger.http")
+
+        self.assertEqual(
+            packages & HEAVY_PACKAGES,
+            {"flask", "werkzeug"},
+        )
+
+    def test_dapr_trigger_does_not_import_http_dependencies(self):
+        packages, _, _ = import_time("functions_framework.triggers.dapr_trigger.dapr")
+
+        self.assertEqual(
+            packages & {"flask", "werkzeug", "starlette", "uvicorn"}, set()
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
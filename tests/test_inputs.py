@@ -0,0 +1,172 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import threading
+import unittest
+
+from unittest import mock
+
+from functions_framework.clients.dapr_client_pool import DaprClientPool
+from functions_framework.clients.input_cache import InputCache
+from functions_framework.clients.output_dispatcher import OutputDispatcher
+from functions_framework.context.function_context import FunctionContext
+from functions_framework.context.runtime_context import RuntimeContext
+from functions_framework.context.user_context import UserContext, wrap_prefetch_inputs
+
+INPUTS = {
+    "profile": {
+        "componentName": "redis",
+        "componentType": "state.redis",
+        "key": "profile",
+    },
+    "queue": {
+        "componentName": "sqs",
+        "componentType": "bindings.aws.sqs",
+        "operation": "list",
+    },
+    "token": {
+        "componentName": "vault",
+        "componentType": "secretstores.hashicorp.vault",
+        "key": "api",
+        "ttl": 300,
+    },
+    "flags": {
+        "componentName": "config",
+        "componentType": "configuration.redis",
+        "key": ["beta"],
+    },
+}
+
+
+class FakeInputClient(object):
+    """Dapr client answering every input, counting the calls per component."""
+
+    def __init__(self, barrier=None):
+        self.calls = []
+        self.barrier = barrier
+
+    def _call(self, name):
+        self.calls.append(name)
+        if self.barrier:
+            # Only passes if all inputs are fetched at the same time
+            self.barrier.wait(5)
+
+    def get_state(self, store_name, key, state_metadata=None):
+        self._call(store_name)
+        return mock.Mock(data=("state " + key).encode())
+
+    def invoke_binding(self, name, operation, data="", binding_metadata=None):
+        self._call(name)
+        return mock.Mock(data=operation.encode())
+
+    def get_secret(self, store_name, key, secret_metadata=None):
+        self._call(store_name)
+        return mock.Mock(secret={key: "s3cr3t"})
+
+    def get_configuration(self, store_name, keys, config_metadata=None):
+        self._call(store_name)
+        return mock.Mock(items={key: mock.Mock(value="on") for key in keys})
+
+
+def user_context(client, inputs=INPUTS, cache=None):
+    context = FunctionContext.from_json({"inputs": inputs})
+    pool = DaprClientPool(size=4, client_factory=lambda: client)
+    runtime_context = RuntimeContext(
+        context, None, pool, OutputDispatcher(workers=4), None, cache
+    )
+    return UserContext(runtime_context.freeze())
+
+
+class TestInputCache(unittest.TestCase):
+    def test_ttl(self):
+        cache = InputCache()
+        with mock.patch("time.monotonic", return_value=100):
+            cache.put("token", {"api": "a"}, 10)
+        with mock.patch("time.monotonic", return_value=105):
+            self.assertEqual(cache.get("token"), {"api": "a"})
+        with mock.patch("time.monotonic", return_value=111):
+            self.assertIsNone(cache.get("token", None))
+
+
+class TestUserContextInputs(unittest.TestCase):
+    def test_get_input_per_type(self):
+        client = FakeInputClient()
+        context = user_context(client)
+
+        self.assertEqual(
+            context.get_inputs(),
+            {
+                "profile": b"state profile",
+                "queue": b"list",
+                "token": {"api": "s3cr3t"},
+                "flags": {"beta": "on"},
+            },
+        )
+        # Fetched once per invocation
+        context.get_input("profile")
+        self.assertEqual(sorted(client.calls), ["config", "redis", "sqs", "vault"])
+
+    def test_prefetch_is_concurrent(self):
+        client = FakeInputClient(threading.Barrier(len(INPUTS)))
+        context = user_context(client)
+
+        context.prefetch_inputs(timeout=10)
+
+        self.assertEqual(len(client.calls), len(INPUTS))
+        self.assertEqual(context.get_input("queue"), b"list")
+        self.assertEqual(len(client.calls), len(INPUTS))
+
+    def test_ttl_is_shared_across_invocations(self):
+        client = FakeInputClient()
+        cache = InputCache()
+
+        for _ in range(3):
+            context = user_context(client, cache=cache)
+            context.get_input("token")
+            context.get_input("profile")
+
+        self.assertEqual(client.calls.count("vault"), 1)
+        self.assertEqual(client.calls.count("redis"), 3)
+
+    def test_prefetch_errors_are_raised_by_get_input(self):
+        client = FakeInputClient()
+        client.get_secret = mock.Mock(side_effect=RuntimeError("sealed"))
+        context = user_context(client)
+
+        context.prefetch_inputs()
+
+        self.assertEqual(context.get_input("profile"), b"state profile")
+        with self.assertRaises(RuntimeError):
+            context.get_input("token")
+
+    def test_unknown_input(self):
+        with self.assertRaises(Exception):
+            user_context(FakeInputClient()).get_input("missing")
+
+    def test_wrap_prefetch_inputs(self):
+        client = FakeInputClient()
+
+        def function(context):
+            return len(client.calls)
+
+        async def async_function(context):
+            return len(client.calls)
+
+        self.assertEqual(wrap_prefetch_inputs(function)(user_context(client)), 4)
+        rv = asyncio.run(wrap_prefetch_inputs(async_function)(user_context(client)))
+        self.assertEqual(rv, 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
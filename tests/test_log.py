@@ -0,0 +1,229 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from unittest import mock
+
+from functions_framework import constants, log
+from functions_framework._tracing import Tracer, create_exporter
+from functions_framework.log import LogPipeline, _LoggingHandler
+from functions_framework.triggers.http_trigger import create_app
+
+
+def pipeline_logger(pipeline, name):
+    logger = logging.getLogger(name)
+    logger.handlers = [pipeline.handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+class TestLogPipeline(unittest.TestCase):
+    def test_records_are_written_by_the_writer_thread(self):
+        pipeline = LogPipeline()
+        stream = io.StringIO()
+        pipeline.configure(stream=stream)
+        writers = []
+        formatter = pipeline.outputs[0].formatter
+        original = formatter.format
+
+        def format(record):
+            writers.append(threading.current_thread())
+            return original(record)
+
+        formatter.format = format
+        logger = pipeline_logger(pipeline, "test_log.writer")
+
+        logger.info("hello %s", "world")
+        pipeline.shutdown()
+
+        self.assertIn("test_log.writer - INFO - hello world", stream.getvalue())
+        self.assertNotIn(threading.current_thread(), writers)
+
+    def test_full_queue_drops_records(self):
+        pipeline = LogPipeline()
+        stream = io.StringIO()
+        pipeline.configure(queue_size=2, stream=stream)
+        logger = pipeline_logger(pipeline, "test_log.dropped")
+        # Holding the lock of the output blocks the writer thread
+        pipeline.outputs[0].acquire()
+        try:
+            for i in range(10):
+                logger.info("record %d", i)
+        finally:
+            pipeline.outputs[0].release()
+        pipeline.flush()
+        logger.info("after")
+        pipeline.shutdown()
+
+        output = stream.getvalue()
+        self.assertIn("after", output)
+        self.assertIn("Dropped", output)
+        self.assertLess(output.count("record"), 10)
+
+    def test_writes_synchronously_after_shutdown(self):
+        pipeline = LogPipeline()
+        stream = io.StringIO()
+        pipeline.configure(stream=stream)
+        logger = pipeline_logger(pipeline, "test_log.shutdown")
+        logger.info("before")
+        pipeline.shutdown()
+
+        logger.info("after")
+
+        self.assertIn("after", stream.getvalue())
+
+    def test_restarts_after_fork(self):
+        pipeline = LogPipeline()
+        stream = io.StringIO()
+        pipeline.configure(stream=stream)
+        logger = pipeline_logger(pipeline, "test_log.fork")
+        logger.info("parent")
+        pipeline.flush()
+        # As if the pipeline was started before the worker was forked
+        pipeline._pid = -1
+
+        logger.info("child")
+        pipeline.shutdown()
+
+        self.assertIn("child", stream.getvalue())
+
+    def test_json_format_and_log_file(self):
+        pipeline = LogPipeline()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "function.log")
+            pipeline.configure(
+                log_file=path,
+                log_format=constants.LOG_FORMAT_JSON,
+                stream=io.StringIO(),
+            )
+            logger = pipeline_logger(pipeline, "test_log.json")
+            try:
+                raise ValueError("boom")
+            except ValueError:
+                logger.exception("failed")
+            pipeline.shutdown()
+            for output in pipeline.outputs:
+                output.close()
+
+            with open(path) as f:
+                entry = json.loads(f.readline())
+
+        self.assertEqual(entry["level"], "ERROR")
+        self.assertEqual(entry["logger"], "test_log.json")
+        self.assertEqual(entry["message"], "failed")
+        self.assertIn("ValueError: boom", entry["exception"])
+
+
+class TestLoggingHandler(unittest.TestCase):
+    def test_lines_are_buffered(self):
+        stderr = io.StringIO()
+        handler = _LoggingHandler("INFO", stderr, flush_interval=60)
+
+        print("hello", file=handler)
+        print("multi\nline", "ünïcode", file=handler, end="")
+        self.assertEqual(stderr.getvalue(), "")
+
+        handler.drain()
+        entries = [json.loads(line) for line in stderr.getvalue().splitlines()]
+        self.assertEqual(
+            entries,
+            [
+                {"severity": "INFO", "message": "hello"},
+                {"severity": "INFO", "message": "multi"},
+                {"severity": "INFO", "message": "line ünïcode"},
+            ],
+        )
+
+    def test_written_when_full_or_flushed(self):
+        stderr = io.StringIO()
+        handler = _LoggingHandler("INFO", stderr, buffer_size=100, flush_interval=60)
+
+        handler.write("short\n")
+        self.assertEqual(stderr.getvalue(), "")
+        handler.write("x" * 100 + "\n")
+        self.assertEqual(len(stderr.getvalue().splitlines()), 2)
+
+        handler.write("flushed\n")
+        handler.flush()
+        self.assertEqual(len(stderr.getvalue().splitlines()), 3)
+
+    def test_written_when_due(self):
+        stderr = io.StringIO()
+        handler = _LoggingHandler("INFO", stderr, flush_interval=0.01)
+
+        handler.write("due\n")
+
+        deadline = time.monotonic() + 5
+        while not stderr.getvalue() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(json.loads(stderr.getvalue())["message"], "due")
+        handler.close()
+
+    def test_errors_are_not_buffered(self):
+        stderr = io.StringIO()
+        handler = _LoggingHandler("ERROR", stderr, flush_interval=60)
+
+        handler.write("failed\n")
+
+        self.assertEqual(json.loads(stderr.getvalue())["message"], "failed")
+
+    def test_request_ids(self):
+        stderr = io.StringIO()
+        tracer = Tracer().configure(
+            {"enabled": True}, "function", exporter=create_exporter({"name": "memory"})
+        )
+        app = create_app(
+            None,
+            "function",
+            "main.py",
+            function=lambda context: print("in function") or "OK",
+        )
+
+        with mock.patch.object(sys, "stdout", _LoggingHandler("INFO", stderr)):
+            with mock.patch(
+                "functions_framework.triggers.http_trigger.tracer", tracer
+            ), mock.patch.object(log, "tracer", tracer):
+                resp = app.test_client().get(
+                    "/", headers={"Function-Execution-Id": "abc"}
+                )
+
+        self.assertEqual(resp.status_code, 200)
+        entry = json.loads(stderr.getvalue())
+        self.assertEqual(entry["message"], "in function")
+        self.assertEqual(entry["execution_id"], "abc")
+        self.assertEqual(len(entry["trace_id"]), 32)
+        self.assertEqual(len(entry["span_id"]), 16)
+
+
+class TestInitializeLogger(unittest.TestCase):
+    def test_idempotent(self):
+        logger = log.initialize_logger("test_log.idempotent", logging.INFO)
+        again = log.initialize_logger("test_log.idempotent", logging.DEBUG)
+
+        self.assertIs(logger, again)
+        self.assertEqual(logger.handlers, [log.pipeline.handler])
+        self.assertEqual(logger.level, logging.DEBUG)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+import unittest
+
+from unittest import mock
+
+from functions_framework import _metrics
+from functions_framework._metrics import Metrics, Registry
+from functions_framework.context.runtime_context import RuntimeContext
+from functions_framework.triggers.http_trigger import create_app
+
+
+class TestRegistry(unittest.TestCase):
+    def test_counts_from_many_threads(self):
+        registry = Registry()
+        counter = registry.counter("requests_total", "Requests.", ("kind",))
+
+        def work():
+            for _ in range(1000):
+                counter.inc(("http",))
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        counter.inc(("http",))
+        for thread in threads:
+            thread.join()
+
+        # Shards of the exited threads are retired, not lost
+        self.assertEqual(registry.collect(), {("requests_total", ("http",)): 8001})
+        self.assertEqual(len(registry._shards), 1)
+
+    def test_render_histogram(self):
+        registry = Registry()
+        histogram = registry.histogram(
+            "latency_seconds", "Latency.", ("trigger",), (0.1, 1.0)
+        )
+        histogram.observe(0.05, ("a",))
+        histogram.observe(0.5, ("a",))
+        histogram.observe(5, ("a",))
+
+        self.assertEqual(
+            registry.render().splitlines(),
+            [
+                "# HELP latency_seconds Latency.",
+                "# TYPE latency_seconds histogram",
+                'latency_seconds_bucket{trigger="a",le="0.1"} 1',
+                'latency_seconds_bucket{trigger="a",le="1.0"} 2',
+                'latency_seconds_bucket{trigger="a",le="+Inf"} 3',
+                'latency_seconds_sum{trigger="a"} 5.55',
+                'latency_seconds_count{trigger="a"} 3',
+            ],
+        )
+
+
+class TestMetrics(unittest.TestCase):
+    def test_disabled_metrics_record_nothing(self):
+        metrics = Metrics()
+        with metrics.invocation("http", "http") as invocation:
+            self.assertEqual(invocation.call(lambda x: x + 1, 1), 2)
+        with metrics.send("out"):
+            pass
+
+        self.assertEqual(metrics.registry.collect(), {})
+
+    def test_invocation(self):
+        metrics = Metrics()
+        metrics.enable()
+
+        with metrics.invocation("binding", "cron") as invocation:
+            invocation.call(lambda: None)
+        with self.assertRaises(ValueError):
+            with metrics.invocation("binding", "cron") as invocation:
+                invocation.call(mock.Mock(side_effect=ValueError))
+
+        values = metrics.registry.collect()
+        labels = ("binding", "cron")
+        self.assertEqual(values[("function_invocations_total", labels)], 2)
+        self.assertEqual(values[("function_invocation_errors_total", labels)], 1)
+        self.assertEqual(values[("function_invocations_in_flight", labels)], 0)
+        for name in (
+            "function_invocation_duration_seconds",
+            "function_user_duration_seconds",
+            "function_framework_overhead_seconds",
+        ):
+            # The last value of a histogram state is its sum
+            self.assertEqual(sum(values[(name, labels)][:-1]), 2)
+
+    def test_http_metrics_route(self):
+        metrics = Metrics()
+        metrics.enable()
+
+        with mock.patch.object(_metrics, "metrics", metrics), mock.patch(
+            "functions_framework.triggers.http_trigger.metrics", metrics
+        ):
+            app = create_app(
+                RuntimeContext(),
+                "function",
+                "main.py",
+                function=lambda context: "OK",
+                metrics_path="/metrics",
+            )
+            client = app.test_client()
+            client.get("/")
+            resp = client.get("/metrics")
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn(
+            'function_invocations_total{kind="http",trigger="http"} 1',
+            resp.get_data(as_text=True),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
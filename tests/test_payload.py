@@ -0,0 +1,100 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+
+from unittest import mock
+
+from cloudevents.sdk.event import v1
+from dapr.ext.grpc import BindingRequest
+
+from functions_framework.context.user_context import UserContext
+from functions_framework.openfunction import codec
+from functions_framework.openfunction.payload import Payload
+
+DATA = b'{"order": 42, "items": ["a", "b"]}'
+
+
+def topic_event(data=DATA):
+    event = v1.Event()
+    event.SetData(data)
+    event.SetContentType("application/json")
+    return event
+
+
+class TestPayload(unittest.TestCase):
+    def test_view_does_not_copy(self):
+        payload = Payload(DATA)
+
+        self.assertIs(payload.view.obj, DATA)
+        self.assertTrue(payload.view.readonly)
+        self.assertIs(payload.tobytes(), DATA)
+        self.assertEqual(len(payload), len(DATA))
+
+    def test_lazy_decoding(self):
+        payload = Payload(DATA)
+
+        with mock.patch.object(codec, "loads", wraps=codec.loads) as loads:
+            self.assertEqual(payload.json()["order"], 42)
+            self.assertIs(payload.json(), payload.json())
+        loads.assert_called_once()
+        self.assertIs(payload.text, payload.text)
+        self.assertEqual(Payload("été").text, "été")
+
+    def test_bytearray_is_read_only(self):
+        data = bytearray(b"abc")
+        payload = Payload(data)
+
+        with self.assertRaises(TypeError):
+            payload.view[0] = 0
+        self.assertEqual(bytes(payload), b"abc")
+
+
+class TestUserContextPayload(unittest.TestCase):
+    def test_binding_request(self):
+        request = BindingRequest(DATA, {})
+        context = UserContext(binding_request=request)
+
+        self.assertIs(context.get_payload().view.obj, request.data)
+        self.assertIs(context.get_binding_request(copy=False), request)
+        copied = context.get_binding_request()
+        self.assertIsNot(copied, request)
+        self.assertEqual(copied.data, DATA)
+
+    def test_topic_event(self):
+        event = topic_event()
+        context = UserContext(topic_event=event)
+
+        payload = context.get_payload()
+        self.assertEqual(payload.content_type, "application/json")
+        self.assertEqual(payload.json()["items"], ["a", "b"])
+        self.assertIs(context.get_topic_event(copy=False), event)
+        self.assertIsNot(context.get_topic_event(), event)
+
+    def test_topic_events(self):
+        events = [topic_event(b"1"), topic_event(b"2")]
+        context = UserContext(topic_events=events)
+
+        self.assertEqual([p.json() for p in context.get_payloads()], [1, 2])
+        self.assertIs(context.get_topic_events(copy=False)[1], events[1])
+        self.assertEqual(UserContext(topic_event=events[0]).get_payloads()[0].text, "1")
+
+    def test_http_invocation(self):
+        context = UserContext(http_request=mock.Mock())
+
+        self.assertIsNone(context.get_payload())
+        self.assertEqual(context.get_payloads(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import unittest
+
+from functions_framework.exceptions import InvalidConfigurationException
+from functions_framework.openfunction.plugin import (
+    PLUGINS,
+    HookPipeline,
+    Plugin,
+    TimingPlugin,
+    register_plugin,
+)
+
+CALLS = []
+
+
+@register_plugin
+class RecordingPlugin(Plugin):
+    name = "recording"
+
+    def pre_hook(self, context):
+        CALLS.append(("pre", context))
+        return "state"
+
+    def post_hook(self, context, state, error):
+        CALLS.append(("post", context, state, error))
+
+
+class PostOnlyPlugin(Plugin):
+    name = "post-only"
+
+    def post_hook(self, context, state, error):
+        CALLS.append(("post-only", state))
+
+
+class TestHookPipeline(unittest.TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_no_hooks_returns_function(self):
+        def function(context):
+            pass
+
+        self.assertIs(HookPipeline().wrap(function), function)
+        # Hooks a plugin does not override are never called
+        self.assertFalse(HookPipeline(pre_hooks=[__name__ + ":PostOnlyPlugin"]))
+
+    def test_hooks_run_in_order(self):
+        pipeline = HookPipeline(
+            pre_hooks=["recording"],
+            post_hooks=[__name__ + ":PostOnlyPlugin", "recording"],
+        )
+        function = pipeline.wrap(lambda context: context * 2)
+
+        self.assertEqual(function(21), 42)
+        self.assertEqual(
+            CALLS,
+            [("pre", 21), ("post-only", None), ("post", 21, "state", None)],
+        )
+
+    def test_post_hooks_see_errors(self):
+        error = ValueError("boom")
+
+        def function(context):
+            raise error
+
+        function = HookPipeline(["recording"], ["recording"]).wrap(function)
+
+        with self.assertRaises(ValueError):
+            function("ctx")
+        self.assertEqual(CALLS[-1], ("post", "ctx", "state", error))
+
+    def test_coroutine_function(self):
+        async def function(context):
+            return context
+
+        function = HookPipeline(["recording"], ["recording"]).wrap(function)
+
+        self.assertEqual(asyncio.run(function("ctx")), "ctx")
+        self.assertEqual(len(CALLS), 2)
+
+    def test_plugins_are_instantiated_once(self):
+        pipeline = HookPipeline(["timing"], ["timing"])
+
+        self.assertEqual(list(pipeline.plugins), ["timing"])
+        self.assertIsInstance(pipeline.plugins["timing"], TimingPlugin)
+        self.assertIn("timing", PLUGINS)
+
+    def test_unknown_plugin(self):
+        with self.assertRaises(InvalidConfigurationException):
+            HookPipeline(["missing"])
+        with self.assertRaises(InvalidConfigurationException):
+            HookPipeline(["missing_module:Plugin"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,244 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import threading
+import unittest
+
+from unittest import mock
+
+from functions_framework._metrics import Metrics
+from functions_framework.context.function_context import FunctionContext
+from functions_framework.context.runtime_context import RuntimeContext
+from functions_framework.exceptions import InvalidConfigurationException
+from functions_framework.openfunction import codec
+from functions_framework.triggers.http_trigger import create_app
+from functions_framework.triggers.http_trigger._asgi import create_asgi_app
+from functions_framework.triggers.http_trigger._cache import ResponseCache
+from tests.test_asgi import call
+
+
+class CountingFunction(object):
+    def __init__(self, rv="hello"):
+        self.rv = rv
+        self.calls = 0
+
+    def __call__(self, context):
+        self.calls += 1
+        return self.rv
+
+
+def wsgi_client(function, cache):
+    app = create_app(
+        RuntimeContext(), "function", "main.py", function=function, response_cache=cache
+    )
+    return app.test_client()
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_from_config(self):
+        context = FunctionContext.from_json(
+            {"triggers": {"http": {"cache": {"ttl": 30, "headers": ["Accept"]}}}}
+        )
+        cache = ResponseCache.from_config(context.http_trigger.cache)
+
+        self.assertEqual((cache.ttl, cache.headers), (30, ("accept",)))
+        self.assertIsNone(ResponseCache.from_config(None))
+        with self.assertRaises(InvalidConfigurationException):
+            ResponseCache.from_config({"size": 10})
+
+    def test_lru_and_ttl(self):
+        cache = ResponseCache(ttl=10, size=2)
+        with mock.patch("time.monotonic", return_value=100):
+            for key in ("a", "b"):
+                cache.put(key, cache.entry(200, [], key.encode()))
+            cache.get("a")
+            cache.put("c", cache.entry(200, [], b"c"))
+            self.assertIsNone(cache.get("b"))
+            self.assertIsNotNone(cache.get("a"))
+        with mock.patch("time.monotonic", return_value=111):
+            self.assertIsNone(cache.get("a"))
+
+    def test_uncacheable_responses(self):
+        cache = ResponseCache(ttl=10)
+
+        self.assertIsNone(cache.entry(500, [], b""))
+        self.assertIsNone(cache.entry(200, [("Set-Cookie", "a=b")], b""))
+        self.assertIsNone(cache.entry(200, [("Cache-Control", "private")], b""))
+        self.assertIsNone(cache.entry(200, [("Vary", "Accept, Cookie")], b""))
+        self.assertIsNone(cache.entry(200, [("Vary", "*")], b""))
+        self.assertIsNotNone(cache.entry(200, [("Vary", "Accept")], b""))
+        entry = cache.entry(200, [("Content-Length", "2"), ("ETag", '"v1"')], b"ok")
+        self.assertEqual(entry.headers, [("ETag", '"v1"')])
+        self.assertTrue(entry.not_modified('"v0", W/"v1"'))
+
+    def test_credentials_bypass_the_cache(self):
+        cache = ResponseCache(ttl=10)
+
+        self.assertFalse(cache.accepts("GET", {"authorization": "Bearer x"}))
+        self.assertFalse(cache.accepts("POST", {}))
+        cache = ResponseCache(ttl=10, headers=["Authorization"])
+        self.assertTrue(cache.accepts("GET", {"authorization": "Bearer x"}))
+
+    def test_concurrent_misses_are_coalesced(self):
+        cache = ResponseCache(ttl=10)
+        entered, release = threading.Event(), threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            entered.set()
+            release.wait(5)
+            return cache.entry(200, [], b"ok"), "response"
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(cache.get_or_compute("k", compute))
+            )
+            for _ in range(4)
+        ]
+        threads[0].start()
+        entered.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(r[1] or "" for r in results), ["", "", "", "response"])
+        self.assertEqual({r[0].body for r in results}, {b"ok"})
+
+    def test_async_misses_are_coalesced(self):
+        cache = ResponseCache(ttl=10)
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return cache.entry(200, [], b"ok"), "response"
+
+        async def main():
+            return await asyncio.gather(
+                *(cache.get_or_compute_async("k", compute) for _ in range(4))
+            )
+
+        results = asyncio.run(main())
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual({r[0].body for r in results}, {b"ok"})
+
+    def test_metrics(self):
+        metrics = Metrics()
+        metrics.enable()
+        cache = ResponseCache(ttl=10)
+        with mock.patch(
+            "functions_framework.triggers.http_trigger._cache.metrics", metrics
+        ):
+            for _ in range(3):
+                cache.get_or_compute("k", lambda: (cache.entry(200, [], b""), None))
+
+        rendered = metrics.render()
+        self.assertIn(
+            'function_response_cache_requests_total{result="hit"} 2', rendered
+        )
+        self.assertIn(
+            'function_response_cache_requests_total{result="miss"} 1', rendered
+        )
+
+
+class TestWSGIResponseCache(unittest.TestCase):
+    def test_responses_are_cached(self):
+        function = CountingFunction({"value": 1})
+        client = wsgi_client(function, ResponseCache(ttl=10))
+
+        first = client.get("/items?id=1")
+        second = client.get("/items?id=1")
+        client.get("/items?id=2")
+
+        self.assertEqual(function.calls, 2)
+        self.assertEqual(second.get_json(), {"value": 1})
+        self.assertEqual(second.headers["Content-Type"], "application/json")
+        self.assertEqual(first.headers["ETag"], second.headers["ETag"])
+
+    def test_not_modified(self):
+        client = wsgi_client(CountingFunction(), ResponseCache(ttl=10))
+        etag = client.get("/").headers["ETag"]
+
+        resp = client.get("/", headers={"If-None-Match": etag})
+
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.data, b"")
+        self.assertEqual(resp.headers["ETag"], etag)
+
+    def test_keyed_on_headers_and_body(self):
+        def function(context):
+            function.calls += 1
+            accept = context.get_http_request().headers.get("Accept", "")
+            return accept + b"".join(context.iter_body()).decode()
+
+        function.calls = 0
+        cache = ResponseCache(ttl=10, headers=["Accept"], methods=["POST"])
+        client = wsgi_client(function, cache)
+
+        for accept, body in (("a", b"1"), ("a", b"1"), ("b", b"1"), ("a", b"2")):
+            resp = client.post("/", data=body, headers={"Accept": accept})
+        self.assertEqual(function.calls, 3)
+        self.assertEqual(resp.data, b"a2")
+
+    def test_keyed_on_accept(self):
+        def function(context):
+            function.calls += 1
+            context.out.set_data({"value": 1})
+            return context.out
+
+        function.calls = 0
+        client = wsgi_client(function, ResponseCache(ttl=10))
+        encoders = {"text/csv": lambda obj, default=None: b"value\n1\n"}
+
+        with mock.patch.dict(codec.ENCODERS, encoders):
+            for accept in ("application/json", "text/csv", "application/json"):
+                resp = client.get("/", headers={"Accept": accept})
+                self.assertEqual(resp.content_type, accept)
+        self.assertEqual(function.calls, 2)
+
+    def test_errors_are_not_cached(self):
+        function = CountingFunction(("failed", 500))
+        client = wsgi_client(function, ResponseCache(ttl=10))
+
+        client.get("/")
+        client.get("/")
+
+        self.assertEqual(function.calls, 2)
+
+
+class TestASGIResponseCache(unittest.TestCase):
+    def test_responses_are_cached(self):
+        function = CountingFunction("hello")
+        app = create_asgi_app(
+            RuntimeContext(), function, response_cache=ResponseCache(ttl=10)
+        )
+
+        _, headers, _ = call(app)
+        status, cached_headers, body = call(app)
+        not_modified, _, _ = call(app, headers=[("If-None-Match", headers["etag"])])
+
+        self.assertEqual(function.calls, 1)
+        self.assertEqual((status, body), (200, b"hello"))
+        self.assertEqual(cached_headers["content-type"], headers["content-type"])
+        self.assertEqual(not_modified, 304)
+
+
+if __name__ == "__main__":
+    unittest.main()
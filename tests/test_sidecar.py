@@ -0,0 +1,171 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import unittest
+
+import grpc
+
+from dapr.proto.runtime.v1 import appcallback_pb2 as appcallback_v1
+
+from functions_framework.context.function_context import DaprTrigger, FunctionContext
+from functions_framework.context.user_context import UserContext
+from functions_framework.testing.sidecar import BindingCall, FakeDaprSidecar
+from functions_framework.triggers.dapr_trigger.dapr import DaprTriggerHandler
+
+FUNC_CONTEXT = {
+    "outputs": {
+        "kafka": {
+            "componentName": "kafka-out",
+            "componentType": "bindings.kafka",
+            "operation": "create",
+        },
+        "orders": {
+            "componentName": "pubsub",
+            "componentType": "pubsub.redis",
+            "topic": "orders",
+        },
+    },
+    "states": {"cache": {"componentName": "redis", "componentType": "state.redis"}},
+    "inputs": {
+        "password": {
+            "componentName": "vault",
+            "componentType": "secretstores.local.file",
+            "key": "db",
+        },
+        "flags": {
+            "componentName": "config",
+            "componentType": "configuration.redis",
+            "key": ["beta"],
+        },
+    },
+}
+
+
+class TestFakeDaprSidecar(unittest.TestCase):
+    def setUp(self):
+        self.sidecar = FakeDaprSidecar().start()
+        self.addCleanup(self.sidecar.stop)
+        self.runtime_context = self.sidecar.runtime_context(
+            FunctionContext.from_json(FUNC_CONTEXT)
+        )
+
+    def user_context(self):
+        return UserContext(runtime_context=self.runtime_context)
+
+    def test_sends_are_recorded(self):
+        self.sidecar.binding_responses["kafka-out"] = b"ack"
+        context = self.user_context()
+
+        resp = context.send("kafka", b"payload")
+        context.send("orders", {"id": 1})
+
+        self.assertEqual(resp.data, b"ack")
+        self.assertEqual(
+            self.sidecar.bindings,
+            [BindingCall("kafka-out", "create", b"payload", {})],
+        )
+        published = self.sidecar.published[0]
+        self.assertEqual((published.pubsub_name, published.topic), ("pubsub", "orders"))
+        self.assertEqual(json.loads(published.data), {"id": 1})
+
+    def test_bulk_publishes_are_recorded(self):
+        self.user_context().send_batch("orders", [{"id": 1}, {"id": 2}])
+
+        self.assertEqual(
+            [json.loads(event.data) for event in self.sidecar.published],
+            [{"id": 1}, {"id": 2}],
+        )
+        self.assertEqual(
+            {(event.pubsub_name, event.topic) for event in self.sidecar.published},
+            {("pubsub", "orders")},
+        )
+
+    def test_states(self):
+        context = self.user_context()
+        context.save_state("cache", "k", b"v1")
+        entry = context.get_state_entry("cache", "k")
+
+        with self.assertRaises(grpc.RpcError) as raised:
+            context.save_state("cache", "k", b"v2", etag="stale")
+        self.assertEqual(raised.exception.code(), grpc.StatusCode.ABORTED)
+
+        context.save_state("cache", "k", b"v2", etag=entry.etag)
+        context.save_bulk_state("cache", {"other": b"v3"})
+        entries = context.get_bulk_state("cache", ["k", "other", "missing"])
+        self.assertEqual(
+            {key: entry.data for key, entry in entries.items()},
+            {"k": b"v2", "other": b"v3", "missing": b""},
+        )
+
+        context.delete_state("cache", "k")
+        self.assertEqual(list(self.sidecar.states), [("redis", "other")])
+
+    def test_inputs(self):
+        self.sidecar.secrets["vault", "db"] = {"password": "secret"}
+        self.sidecar.configuration["config", "beta"] = "on"
+        self.sidecar.configuration["config", "other"] = "off"
+
+        inputs = self.user_context().get_inputs()
+
+        self.assertEqual(inputs["password"], {"password": "secret"})
+        self.assertEqual(inputs["flags"], {"beta": "on"})
+
+    def test_delivers_events_to_the_app(self):
+        received = []
+
+        def function(context):
+            received.append(context.get_payload().tobytes())
+
+        handler = DaprTriggerHandler(
+            0,
+            [
+                DaprTrigger("kafka-in", "bindings.kafka", None),
+                DaprTrigger("pubsub", "pubsub.redis", "events"),
+            ],
+            function,
+        )
+        self.sidecar.serve_app(handler, self.runtime_context)
+
+        self.assertEqual(self.sidecar.list_input_bindings(), ["kafka-in"])
+        self.assertEqual(
+            [s.topic for s in self.sidecar.list_subscriptions()], ["events"]
+        )
+        self.sidecar.send_binding_event("kafka-in", b"binding")
+        resp = self.sidecar.publish_to_app("pubsub", "events", b"topic")
+        self.assertEqual(resp.status, appcallback_v1.TopicEventResponse.SUCCESS)
+        self.assertEqual(received, [b"binding", b"topic"])
+
+    def test_delivers_bulk_events_to_the_app(self):
+        received = []
+
+        def function(context):
+            received.extend(p.tobytes() for p in context.get_payloads())
+
+        trigger = DaprTrigger(
+            "pubsub", "pubsub.redis", "events", bulk_subscribe={"enabled": True}
+        )
+        handler = DaprTriggerHandler(0, [trigger], function)
+        self.sidecar.serve_app(handler, self.runtime_context)
+
+        resp = self.sidecar.publish_bulk_to_app("pubsub", "events", [b"1", b"2"])
+
+        self.assertEqual(received, [b"1", b"2"])
+        self.assertEqual(
+            [s.status for s in resp.statuses],
+            [appcallback_v1.TopicEventResponse.SUCCESS] * 2,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
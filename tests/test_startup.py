@@ -0,0 +1,67 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+from unittest import mock
+
+from functions_framework._startup import StartupTimeline
+
+
+class TestStartupTimeline(unittest.TestCase):
+    def test_disabled_timeline_records_nothing(self):
+        timeline = StartupTimeline(time.perf_counter())
+        with timeline.phase("phase"), timeline.trace_imports():
+            pass
+        timeline.request_served()
+
+        self.assertEqual(timeline.phases, [])
+
+    def test_report_after_first_request(self):
+        with tempfile.TemporaryDirectory() as directory:
+            report_path = os.path.join(directory, "report.json")
+            with open(os.path.join(directory, "slow_module.py"), "w") as f:
+                f.write("import time\ntime.sleep(0.01)\n")
+
+            timeline = StartupTimeline(time.perf_counter())
+            timeline.enable(report_path)
+            timeline.logger = mock.Mock()
+            sys.path.insert(0, directory)
+            try:
+                with timeline.phase("user_module_import"), timeline.trace_imports():
+                    import slow_module  # noqa: F401
+            finally:
+                sys.path.remove(directory)
+                sys.modules.pop("slow_module", None)
+
+            timeline.request_served()
+            timeline.request_served()
+
+            with open(report_path) as f:
+                reports = [json.loads(line) for line in f]
+
+        self.assertEqual(len(reports), 1)
+        timeline.logger.info.assert_called_once()
+        phases = [phase["name"] for phase in reports[0]["phases"]]
+        self.assertEqual(phases, ["user_module_import", "first_request_served"])
+        self.assertEqual(reports[0]["imports"][0]["module"], "slow_module")
+        self.assertGreaterEqual(reports[0]["imports"][0]["duration"], 0.01)
+
+
+if __name__ == "__main__":
+    unittest.main()
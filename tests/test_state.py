@@ -0,0 +1,164 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+
+from unittest import mock
+
+from functions_framework.clients.dapr_client_pool import DaprClientPool
+from functions_framework.clients.state_cache import StateCache, StateEntry
+from functions_framework.context.function_context import FunctionContext
+from functions_framework.context.runtime_context import RuntimeContext
+from functions_framework.context.user_context import UserContext
+
+
+class FakeStateClient(object):
+    """Dapr client keeping states in a dict, with an ETag per write."""
+
+    def __init__(self):
+        self.states = {}
+        self.reads = 0
+
+    def get_state(self, store_name, key, state_metadata=None):
+        self.reads += 1
+        data, etag = self.states.get((store_name, key), (b"", ""))
+        return mock.Mock(data=data, etag=etag)
+
+    def get_bulk_state(self, store_name, keys, parallelism=1, states_metadata=None):
+        self.reads += 1
+        items = []
+        for key in keys:
+            data, etag = self.states.get((store_name, key), (b"", ""))
+            items.append(mock.Mock(key=key, data=data, etag=etag, error=""))
+        return mock.Mock(items=items)
+
+    def save_state(self, store_name, key, value, etag=None, state_metadata=None):
+        current = self.states.get((store_name, key))
+        if etag and current and current[1] != etag:
+            raise RuntimeError("possible etag mismatch")
+        version = int(current[1]) + 1 if current else 1
+        self.states[(store_name, key)] = (value, str(version))
+
+    def save_bulk_state(self, store_name, states):
+        for item in states:
+            self.save_state(store_name, item.key, item.value, item.etag)
+
+    def delete_state(self, store_name, key, etag=None, state_metadata=None):
+        self.states.pop((store_name, key), None)
+
+
+def user_context(client, cache=None):
+    context = FunctionContext.from_json(
+        {
+            "states": {
+                "cache": {"componentName": "redis", "componentType": "state.redis"}
+            }
+        }
+    )
+    pool = DaprClientPool(size=1, client_factory=lambda: client)
+    return UserContext(RuntimeContext(context, None, pool, None, cache).freeze())
+
+
+class TestStateCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = StateCache(size=2)
+        for key in ("a", "b"):
+            cache.put("store", StateEntry(key, key.encode()))
+        cache.get("store", "a")
+        cache.put("store", StateEntry("c", b"c"))
+
+        self.assertIsNone(cache.get("store", "b"))
+        self.assertEqual(cache.get("store", "a").data, b"a")
+        self.assertEqual(len(cache), 2)
+
+    def test_ttl(self):
+        cache = StateCache(size=2, ttl=10)
+        with mock.patch("time.monotonic", return_value=100):
+            cache.put("store", StateEntry("a", b"a"))
+        with mock.patch("time.monotonic", return_value=105):
+            self.assertIsNotNone(cache.get("store", "a"))
+        with mock.patch("time.monotonic", return_value=111):
+            self.assertIsNone(cache.get("store", "a"))
+
+
+class TestUserContextState(unittest.TestCase):
+    def test_states_are_components(self):
+        states = user_context(None).runtime_context.get_states()
+
+        self.assertEqual(states["cache"].component_name, "redis")
+        self.assertEqual(states["cache"].get_type(), "state")
+
+    def test_reads_without_cache(self):
+        client = FakeStateClient()
+        context = user_context(client)
+
+        context.save_state("cache", "k", b"v")
+        self.assertEqual(context.get_state("cache", "k"), b"v")
+        self.assertEqual(context.get_state("cache", "k"), b"v")
+        self.assertEqual(client.reads, 2)
+
+    def test_read_through_cache(self):
+        client = FakeStateClient()
+        cache = StateCache(size=16)
+        context = user_context(client, cache)
+        client.states[("redis", "a")] = (b"1", "7")
+
+        for _ in range(3):
+            entry = user_context(client, cache).get_state_entry("cache", "a")
+        self.assertEqual((entry.data, entry.etag), (b"1", "7"))
+        self.assertEqual(client.reads, 1)
+
+        # Only the keys missing from the cache are read, in one request
+        entries = context.get_bulk_state("cache", ["a", "b", "c"])
+        self.assertEqual(list(entries), ["a", "b", "c"])
+        self.assertEqual(client.reads, 2)
+        context.get_bulk_state("cache", ["a", "b", "c"])
+        self.assertEqual(client.reads, 2)
+
+    def test_writes_invalidate_the_cache(self):
+        client = FakeStateClient()
+        context = user_context(client, StateCache(size=16))
+
+        context.save_state("cache", "k", b"v1")
+        entry = context.get_state_entry("cache", "k")
+        context.save_state("cache", "k", b"v2", etag=entry.etag)
+        self.assertEqual(context.get_state("cache", "k"), b"v2")
+
+        context.save_bulk_state("cache", {"k": b"v3"})
+        self.assertEqual(context.get_state("cache", "k"), b"v3")
+
+        context.delete_state("cache", "k")
+        self.assertEqual(context.get_state("cache", "k"), b"")
+
+    def test_etag_mismatch_drops_the_stale_entry(self):
+        client = FakeStateClient()
+        context = user_context(client, StateCache(size=16))
+        context.save_state("cache", "k", b"v1")
+        stale = context.get_state_entry("cache", "k")
+        # Written by another worker, the cached entry is now stale
+        client.save_state("redis", "k", b"v2")
+
+        with self.assertRaises(RuntimeError):
+            context.save_state("cache", "k", b"v3", etag=stale.etag)
+
+        entry = context.get_state_entry("cache", "k")
+        self.assertEqual(entry.data, b"v2")
+        context.save_state("cache", "k", b"v3", etag=entry.etag)
+
+    def test_unknown_state_store(self):
+        with self.assertRaises(Exception):
+            user_context(FakeStateClient()).get_state("missing", "k")
+
+
+if __name__ == "__main__":
+    unittest.main()
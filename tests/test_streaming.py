@@ -0,0 +1,91 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import unittest
+
+from functions_framework.context.runtime_context import RuntimeContext
+from functions_framework.context.user_context import UserContext
+from functions_framework.openfunction.streaming import ServerSentEvent
+from functions_framework.triggers.http_trigger import create_app
+
+
+def client(function):
+    app = create_app(RuntimeContext(), "function", "main.py", function=function)
+    return app.test_client()
+
+
+class TestServerSentEvent(unittest.TestCase):
+    def test_encode(self):
+        event = ServerSentEvent("a\nb", event="token", id=3, retry=1000)
+
+        self.assertEqual(
+            event.encode(), b"event: token\nid: 3\nretry: 1000\ndata: a\ndata: b\n\n"
+        )
+        self.assertEqual(ServerSentEvent({"n": 1}).encode(), b'data: {"n": 1}\n\n')
+
+
+class TestWSGIStreaming(unittest.TestCase):
+    def test_chunks_are_produced_on_demand(self):
+        produced = []
+
+        def function(context: UserContext):
+            def chunks():
+                for i in range(1000):
+                    produced.append(i)
+                    # The request context outlives the function
+                    yield "{} {}\n".format(context.get_http_request().path, i)
+
+            return context.stream(chunks(), content_type="text/plain")
+
+        resp = client(function).get("/file", buffered=False)
+        body = iter(resp.response)
+
+        self.assertEqual(next(body), b"/file 0\n")
+        self.assertEqual(len(produced), 1)
+        self.assertTrue(resp.is_streamed)
+        self.assertEqual(resp.content_type, "text/plain")
+        self.assertEqual(sum(1 for _ in body), 999)
+        resp.close()
+
+    def test_generator(self):
+        def function(context: UserContext):
+            yield b"a"
+            yield b"b"
+
+        self.assertEqual(client(function).get("/").data, b"ab")
+
+    def test_sse_from_async_generator(self):
+        async def tokens():
+            for token in ("Hello", "world"):
+                await asyncio.sleep(0)
+                yield ServerSentEvent(token, event="token")
+            yield "[DONE]"
+
+        def function(context: UserContext):
+            return context.sse(tokens())
+
+        resp = client(function).get("/")
+
+        self.assertEqual(resp.mimetype, "text/event-stream")
+        self.assertEqual(resp.headers["Cache-Control"], "no-cache")
+        self.assertEqual(
+            resp.data,
+            b"event: token\ndata: Hello\n\n"
+            b"event: token\ndata: world\n\n"
+            b"data: [DONE]\n\n",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
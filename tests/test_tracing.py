@@ -0,0 +1,223 @@
+# Copyright 2023 The OpenFunction Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import collections
+import unittest
+
+from unittest import mock
+
+from functions_framework import _tracing
+from functions_framework._tracing import Tracer, create_exporter
+from functions_framework.clients.dapr_client_pool import DaprClientPool
+from functions_framework.clients.output_dispatcher import OutputDispatcher
+from functions_framework.clients.trace_interceptor import TraceContextInterceptor
+from functions_framework.context.function_context import Component, FunctionContext
+from functions_framework.context.runtime_context import RuntimeContext
+from functions_framework.exceptions import InvalidConfigurationException
+from functions_framework.triggers.http_trigger import create_app
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+TRACEPARENT = "00-{}-{}-01".format(TRACE_ID, PARENT_ID)
+
+CallDetails = collections.namedtuple(
+    "CallDetails",
+    ["method", "timeout", "metadata", "credentials", "wait_for_ready", "compression"],
+)
+
+trace = _tracing.trace
+requires_sdk = unittest.skipIf(trace is None, "the OpenTelemetry SDK is not installed")
+
+
+def enabled_tracer(ratio=1.0):
+    exporter = create_exporter({"name": "memory"})
+    tracer = Tracer().configure(
+        {"enabled": True, "sampleRatio": ratio}, "function", exporter=exporter
+    )
+    return tracer, exporter
+
+
+def finished_spans(tracer, exporter):
+    tracer.force_flush()
+    return {span.name: span for span in exporter.get_finished_spans()}
+
+
+def traceparent(span_context):
+    return "00-{:032x}-{:016x}-{:02x}".format(
+        span_context.trace_id, span_context.span_id, span_context.trace_flags
+    )
+
+
+class TestTracer(unittest.TestCase):
+    def test_disabled_tracer(self):
+        tracer = Tracer()
+
+        def function(context):
+            pass
+
+        self.assertIs(tracer.instrument(function), function)
+        with tracer.start_span("span"):
+            self.assertEqual(tracer.inject({}), {})
+            self.assertIsNone(tracer.current_span_context())
+        self.assertIsNone(tracer.extract({"traceparent": TRACEPARENT}))
+
+    def test_without_sdk(self):
+        with mock.patch.object(_tracing, "trace", None), mock.patch.object(
+            _tracing.logger, "warning"
+        ) as warning:
+            tracer = Tracer().configure({"enabled": True}, "function")
+
+        warning.assert_called_once()
+        self.assertFalse(tracer.enabled)
+        with tracer.start_span("span"):
+            pass
+
+    @requires_sdk
+    def test_child_spans(self):
+        tracer, exporter = enabled_tracer()
+        function = tracer.instrument(lambda context: tracer.inject({}))
+
+        parent = tracer.extract({"traceparent": TRACEPARENT})
+        with tracer.start_span("dispatch", _tracing.SERVER, parent):
+            headers = function(None)
+
+        spans = finished_spans(tracer, exporter)
+        dispatch, user = spans["dispatch"], spans["function <lambda>"]
+        self.assertEqual(dispatch.context.trace_id, int(TRACE_ID, 16))
+        self.assertEqual(dispatch.parent.span_id, int(PARENT_ID, 16))
+        self.assertEqual(dispatch.kind, trace.SpanKind.SERVER)
+        self.assertEqual(dispatch.resource.attributes["service.name"], "function")
+        self.assertEqual(user.parent.span_id, dispatch.context.span_id)
+        self.assertEqual(headers["traceparent"], traceparent(user.context))
+
+    @requires_sdk
+    def test_extract_invalid(self):
+        tracer, _ = enabled_tracer()
+
+        for value in (
+            "garbage",
+            "ff-{}-{}-01".format(TRACE_ID, PARENT_ID),
+            "00-{}-{}-01".format("0" * 32, PARENT_ID),
+            "00-{}-{}-zz".format(TRACE_ID, PARENT_ID),
+        ):
+            self.assertIsNone(tracer.extract({"traceparent": value}), value)
+
+    @requires_sdk
+    def test_errors_are_recorded(self):
+        tracer, exporter = enabled_tracer()
+
+        with self.assertRaises(ValueError):
+            with tracer.start_span("span"):
+                raise ValueError("boom")
+
+        span = finished_spans(tracer, exporter)["span"]
+        self.assertEqual(span.status.status_code, trace.StatusCode.ERROR)
+        self.assertEqual(span.status.description, "ValueError: boom")
+
+    @requires_sdk
+    def test_sampling(self):
+        tracer, exporter = enabled_tracer(ratio=0.0)
+
+        with tracer.start_span("dropped") as span:
+            headers = tracer.inject({})
+        # A sampled parent is followed whatever the ratio
+        parent = tracer.extract({"traceparent": TRACEPARENT})
+        with tracer.start_span("kept", parent=parent):
+            pass
+
+        self.assertFalse(int(headers["traceparent"][-2:], 16) & 1)
+        self.assertFalse(span.get_span_context().trace_flags.sampled)
+        self.assertEqual(list(finished_spans(tracer, exporter)), ["kept"])
+
+    @requires_sdk
+    def test_invalid_configuration(self):
+        for config in (
+            {"enabled": True, "provider": {"name": "skywalking"}},
+            {"enabled": True, "sampleRatio": 2},
+            {"enabled": True, "provider": {"exporter": {"name": "zipkin"}}},
+            {"enabled": True, "provider": {"exporter": {"protocol": "http/json"}}},
+        ):
+            with self.assertRaises(InvalidConfigurationException):
+                Tracer().configure(config)
+
+    @requires_sdk
+    def test_otlp_exporter(self):
+        with mock.patch(
+            "opentelemetry.exporter.otlp.proto.http.trace_exporter.OTLPSpanExporter"
+        ) as exporter:
+            create_exporter(
+                {"endpoint": "http://collector:4318", "headers": "x-token=abc"}
+            )
+
+        exporter.assert_called_once_with(
+            "http://collector:4318/v1/traces", headers={"x-token": "abc"}, timeout=10
+        )
+
+
+@requires_sdk
+class TestPropagation(unittest.TestCase):
+    def test_http_request_and_sends(self):
+        tracer, exporter = enabled_tracer()
+        client = mock.Mock()
+        pool = DaprClientPool(size=1, client_factory=lambda: client)
+        context = FunctionContext(
+            outputs={
+                "kafka": Component(
+                    component_name="kafka-out",
+                    component_type="bindings.kafka",
+                    operation="create",
+                )
+            }
+        )
+        runtime_context = RuntimeContext(context, None, pool, OutputDispatcher())
+
+        def function(context):
+            context.send("kafka", "a")
+            context.send_nowait("kafka", "b")
+            return "OK"
+
+        with mock.patch(
+            "functions_framework.triggers.http_trigger.tracer", tracer
+        ), mock.patch("functions_framework.context.user_context.tracer", tracer):
+            app = create_app(runtime_context, "function", "main.py", function=function)
+            resp = app.test_client().get("/", headers={"traceparent": TRACEPARENT})
+
+        self.assertEqual(resp.status_code, 200)
+        tracer.force_flush()
+        spans = exporter.get_finished_spans()
+        dispatch = [s for s in spans if s.name == "http GET"][0]
+        sends = [s for s in spans if s.name == "send kafka"]
+        self.assertEqual(dispatch.parent.span_id, int(PARENT_ID, 16))
+        self.assertEqual(len(sends), 2)
+        for send in sends:
+            self.assertEqual(send.parent.span_id, dispatch.context.span_id)
+            self.assertEqual(send.kind, trace.SpanKind.CLIENT)
+
+    def test_interceptor_adds_traceparent(self):
+        tracer, _ = enabled_tracer()
+        details = CallDetails("/method", None, [("a", "b")], None, None, None)
+
+        with mock.patch("functions_framework.clients.trace_interceptor.tracer", tracer):
+            interceptor = TraceContextInterceptor()
+            self.assertIs(interceptor._intercept_call(details), details)
+            with tracer.start_span("send") as span:
+                intercepted = interceptor._intercept_call(details)
+
+        self.assertEqual(
+            intercepted.metadata,
+            [("a", "b"), ("traceparent", traceparent(span.get_span_context()))],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,17 +11,31 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import os
+import signal
 import threading
 import time
 import unittest
 
+from unittest import mock
 from unittest.mock import MagicMock, Mock
 
+from functions_framework.exceptions import InvalidConfigurationException
 from src.functions_framework.context.function_context import DaprTrigger
 from src.functions_framework.context.runtime_context import RuntimeContext
 from src.functions_framework.triggers.dapr_trigger.dapr import DaprTriggerHandler
 from src.functions_framework.triggers.http_trigger import _http
 from src.functions_framework.triggers.http_trigger.http import HTTPTriggerHandler
+from src.functions_framework.triggers.supervisor import TriggerSupervisor
+from src.functions_framework.triggers.trigger import TriggerHandler
+
+try:
+    import gunicorn
+except ImportError:
+    # Not installed on Windows, where it cannot run either
+    gunicorn = None
+
+requires_gunicorn = unittest.skipIf(gunicorn is None, "gunicorn is not installed")
 
 
 class TestHttpTrigger(unittest.TestCase):
@@ -30,8 +44,62 @@ class TestHttpTrigger(unittest.TestCase):
         server = _http.create_server(app, debug=True)
         self.assertIsNotNone(server)
 
+    @requires_gunicorn
+    def test_http_server_options(self):
+        server = _http.create_server(MagicMock(), debug=False, workers="3", threads=8)
+        self.assertEqual(server.server_class.__name__, "GunicornApplication")
+        self.assertEqual(server.options, {"workers": 3, "threads": 8})
+
+        server = _http.create_server(MagicMock(), debug=False, asgi=True, workers=2)
+        self.assertEqual(server.server_class.__name__, "GunicornApplication")
+        self.assertEqual(server.options["worker_class"], "uvicorn")
+
+        server = _http.create_server(MagicMock(), debug=False, asgi=True)
+        self.assertEqual(server.server_class.__name__, "UvicornApplication")
+
+        with self.assertRaises(Exception):
+            _http.create_server(MagicMock(), debug=False, worker_class="uvicorn")
+        with self.assertRaises(Exception):
+            _http.create_server(MagicMock(), debug=False, workers="many")
+
+    @requires_gunicorn
+    def test_gunicorn_worker_class(self):
+        from src.functions_framework.triggers.http_trigger._http.gunicorn import (
+            GunicornApplication,
+        )
+
+        server = GunicornApplication(MagicMock(), "0.0.0.0", 0, False)
+        self.assertEqual(server.cfg.worker_class_str, "gthread")
+        self.assertEqual(server.cfg.threads, 1024)
+
+        server = GunicornApplication(
+            MagicMock(), "0.0.0.0", 0, False, worker_class="sync"
+        )
+        self.assertEqual(server.cfg.worker_class_str, "sync")
+        self.assertEqual(server.cfg.threads, 1)
+
+        with self.assertRaises(Exception):
+            _http.create_server(
+                MagicMock(), debug=False, worker_class="sync", threads=8
+            )
+
+    def test_auto_workers_follow_cgroup_quota(self):
+        cpu_max = mock.mock_open(read_data="150000 100000\n")
+        with mock.patch(
+            "os.sched_getaffinity", return_value=set(range(8)), create=True
+        ), mock.patch("builtins.open", cpu_max):
+            self.assertEqual(_http.resolve_workers("auto"), 2)
+
+        cpu_max = mock.mock_open(read_data="max 100000\n")
+        with mock.patch(
+            "os.sched_getaffinity", return_value=set(range(8)), create=True
+        ), mock.patch("builtins.open", cpu_max):
+            self.assertEqual(_http.resolve_workers("auto"), 8)
+
     def test_http_trigger_handler_start(self):
-        trigger = HTTPTriggerHandler(port=0, trigger=MagicMock(), user_function=MagicMock())
+        trigger = HTTPTriggerHandler(
+            port=0, trigger=MagicMock(), user_function=MagicMock()
+        )
         context = MagicMock()
         with self.assertRaises(Exception):
             trigger.start(context)
@@ -54,7 +122,9 @@ class TestDaprTrigger(unittest.TestCase):
         dapr_handler = DaprTriggerHandler(port=50055, triggers=[dapr_trigger])
 
         # Start the Dapr trigger handler in a separate thread
-        dapr_thread = threading.Thread(target=dapr_handler.start, args=(context, logger))
+        dapr_thread = threading.Thread(
+            target=dapr_handler.start, args=(context, logger)
+        )
         dapr_thread.start()
 
         # Wait for 5 seconds
@@ -67,5 +137,111 @@ class TestDaprTrigger(unittest.TestCase):
         dapr_thread.join()
 
 
-if __name__ == '__main__':
+class _BlockingHandler(TriggerHandler):
+    def __init__(self, foreground=False):
+        self.foreground = foreground
+        self.started = threading.Event()
+        self.stopped = threading.Event()
+
+    def start(self, context, logger=None, on_ready=None, on_exit=None):
+        self.started.set()
+        if self.foreground:
+            on_ready()
+            on_exit()
+        else:
+            self.stopped.wait()
+
+    def stop(self):
+        self.stopped.set()
+
+
+class TestTriggerSupervisor(unittest.TestCase):
+    def test_foreground_handler_drives_background_handlers(self):
+        http_handler = _BlockingHandler(foreground=True)
+        dapr_handler = _BlockingHandler()
+
+        TriggerSupervisor(MagicMock(), [http_handler, dapr_handler]).run()
+
+        self.assertTrue(http_handler.started.is_set())
+        self.assertTrue(dapr_handler.started.wait(5))
+        self.assertTrue(dapr_handler.stopped.is_set())
+
+    def test_background_handlers_stop_together(self):
+        first, second = _BlockingHandler(), _BlockingHandler()
+        supervisor = TriggerSupervisor(MagicMock(), [first, second])
+
+        exits = []
+
+        def run():
+            try:
+                supervisor.run()
+            except SystemExit as e:
+                exits.append(e.code)
+
+        supervisor_thread = threading.Thread(target=run)
+        supervisor_thread.start()
+        self.assertTrue(first.started.wait(5))
+        self.assertTrue(second.started.wait(5))
+
+        # One handler exiting shuts the others down as well, as a failure
+        first.stop()
+        supervisor_thread.join(5)
+
+        self.assertFalse(supervisor_thread.is_alive())
+        self.assertTrue(second.stopped.is_set())
+        self.assertEqual(exits, [1])
+
+    def test_background_handler_exit_halts_foreground(self):
+        halted = threading.Event()
+
+        class _Server(_BlockingHandler):
+            def start(self, context, logger=None, on_ready=None, on_exit=None):
+                on_ready(halted.set)
+                halted.wait(5)
+                on_exit()
+
+        http_handler, dapr_handler = _Server(foreground=True), _BlockingHandler()
+        dapr_handler.stop()
+        supervisor = TriggerSupervisor(MagicMock(), [http_handler, dapr_handler])
+
+        supervisor.run()
+
+        self.assertTrue(halted.is_set())
+        self.assertTrue(supervisor.failed)
+
+    @requires_gunicorn
+    def test_halted_gunicorn_exits_with_error(self):
+        from src.functions_framework.triggers.http_trigger._http.gunicorn import (
+            GunicornApplication,
+        )
+
+        server = GunicornApplication(MagicMock(), "0.0.0.0", 0, False)
+        server.cfg.on_exit(MagicMock())
+
+        with mock.patch("os.kill") as kill:
+            server.halt()
+        kill.assert_called_once_with(os.getppid(), signal.SIGTERM)
+        with self.assertRaises(SystemExit) as e:
+            server.cfg.on_exit(MagicMock())
+        self.assertEqual(e.exception.code, 1)
+
+    def test_single_foreground_handler(self):
+        with self.assertRaises(Exception):
+            TriggerSupervisor(
+                MagicMock(),
+                [_BlockingHandler(foreground=True), _BlockingHandler(foreground=True)],
+            )
+
+    def test_handlers_on_the_same_port(self):
+        http_handler = _BlockingHandler(foreground=True)
+        dapr_handler = _BlockingHandler()
+        http_handler.port = dapr_handler.port = 8080
+
+        with self.assertRaises(InvalidConfigurationException):
+            TriggerSupervisor(MagicMock(), [http_handler, dapr_handler])
+        dapr_handler.port = 50051
+        TriggerSupervisor(MagicMock(), [http_handler, dapr_handler])
+
+
+if __name__ == "__main__":
     unittest.main()